@@ -0,0 +1,5 @@
+#!/usr/bin/bash
+
+python3 -m src.bench.parser_regex
+python3 -m src.bench.memory
+python3 -m src.bench.suite
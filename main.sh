@@ -1,4 +1,3 @@
 #!/usr/bin/bash
 
-python3 -m src.main
-cd public && python3 -m http.server 8888
+python3 -m src.server --port 8888
@@ -0,0 +1,170 @@
+from __future__ import annotations
+import argparse
+import random
+from pathlib import Path
+from typing import Dict, List
+from src.parsers.markdown import BlockType
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog ring bearer shire river forest mountain road "
+    "elves dwarves wizard tower song journey shadow light ancient kingdom lore legend"
+).split()
+
+DEFAULT_BLOCK_MIX: Dict[BlockType, float] = {
+    BlockType.PARAGRAPH: 0.5,
+    BlockType.HEADING: 0.15,
+    BlockType.UNORDERED_LIST: 0.1,
+    BlockType.ORDERED_LIST: 0.1,
+    BlockType.CODE: 0.075,
+    BlockType.QUOTE: 0.075,
+}
+
+def parse_block_mix(text: str) -> Dict[BlockType, float]:
+    # "paragraph=5,heading=1,code=1": block types missing from the list are not generated.
+    block_mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        block_mix[BlockType[name.strip().upper()]] = float(weight)
+
+    return block_mix
+
+SHARED_POOL_SIZE = 20
+
+class CorpusSpec:
+    def __init__(
+        self,
+        pages: int = 200,
+        sections: int = 10,
+        blocks_per_page: int = 30,
+        block_mix: Dict[BlockType, float] | None = None,
+        inline_density: float = 0.1,
+        links_per_block: float = 0.5,
+        images_per_block: float = 0.1,
+        seed: int = 1,
+        shared_blocks: float = 0.0,
+    ):
+        self.pages = pages
+        self.sections = sections
+        self.blocks_per_page = blocks_per_page
+        self.block_mix = block_mix if block_mix is not None else dict(DEFAULT_BLOCK_MIX)
+        self.inline_density = inline_density
+        self.links_per_block = links_per_block
+        self.images_per_block = images_per_block
+        self.seed = seed
+        # Fraction of blocks drawn from a small pool repeated across pages: footers, callouts, link lists.
+        self.shared_blocks = shared_blocks
+
+    def to_json(self) -> Dict:
+        return {
+            "pages": self.pages,
+            "sections": self.sections,
+            "blocks_per_page": self.blocks_per_page,
+            "block_mix": {block_type.name.lower(): weight for block_type, weight in self.block_mix.items()},
+            "inline_density": self.inline_density,
+            "links_per_block": self.links_per_block,
+            "images_per_block": self.images_per_block,
+            "seed": self.seed,
+            "shared_blocks": self.shared_blocks,
+        }
+
+class CorpusGenerator:
+    def __init__(self, spec: CorpusSpec):
+        self.spec = spec
+        self.random = random.Random(spec.seed)
+        # The pool has its own generator, so corpora without shared blocks stay as they were.
+        pool_random, self.random = self.random, random.Random(spec.seed + 1)
+        block_types = list(spec.block_mix.keys())
+        self.shared = [self.block(block_type) for block_type in self.random.choices(block_types, list(spec.block_mix.values()), k=SHARED_POOL_SIZE)]
+        self.random = pool_random
+
+    def page_path(self, index: int) -> Path:
+        return Path(f"section{index % self.spec.sections}") / f"page{index}" / "index.md"
+
+    def words(self, count: int) -> str:
+        return " ".join(self.random.choice(WORDS) for _ in range(count))
+
+    def count(self, mean: float) -> int:
+        # Whole part always, fractional part with matching probability.
+        return int(mean) + (1 if self.random.random() < mean - int(mean) else 0)
+
+    def inline_text(self, word_count: int) -> str:
+        parts = []
+        for _ in range(word_count):
+            word = self.random.choice(WORDS)
+            if self.random.random() < self.spec.inline_density:
+                delimiter = self.random.choice(("**", "_", "`"))
+                word = f"{delimiter}{word}{delimiter}"
+            parts.append(word)
+
+        for _ in range(self.count(self.spec.links_per_block)):
+            target = self.page_path(self.random.randrange(self.spec.pages)).parent.as_posix()
+            parts.insert(self.random.randrange(len(parts) + 1), f"[{self.words(2)}](/{target})")
+
+        for _ in range(self.count(self.spec.images_per_block)):
+            parts.insert(self.random.randrange(len(parts) + 1), f"![{self.words(2)}](/images/image{self.random.randrange(20)}.png)")
+
+        return " ".join(parts)
+
+    def block(self, block_type: BlockType) -> str:
+        match block_type:
+            case BlockType.HEADING:
+                return f"{'#' * self.random.randint(2, 4)} {self.inline_text(4)}"
+            case BlockType.UNORDERED_LIST:
+                return "\n".join(f"- {self.inline_text(6)}" for _ in range(self.random.randint(2, 6)))
+            case BlockType.ORDERED_LIST:
+                return "\n".join(f"{i}. {self.inline_text(6)}" for i in range(1, self.random.randint(2, 6) + 1))
+            case BlockType.CODE:
+                lines = [f"value_{i} = '{self.words(3)}'" for i in range(self.random.randint(2, 8))]
+                return "```\n" + "\n".join(lines) + "\n```"
+            case BlockType.QUOTE:
+                return "\n".join(f"> {self.inline_text(8)}" for _ in range(self.random.randint(1, 3)))
+            case _:
+                return "\n".join(self.inline_text(12) for _ in range(self.random.randint(2, 5)))
+
+    def page(self, index: int) -> str:
+        block_types = list(self.spec.block_mix.keys())
+        weights = list(self.spec.block_mix.values())
+        blocks = [f"# Page {index}: {self.words(3)}"]
+        for block_type in self.random.choices(block_types, weights, k=self.spec.blocks_per_page):
+            if self.spec.shared_blocks > 0 and self.random.random() < self.spec.shared_blocks:
+                blocks.append(self.random.choice(self.shared))
+            else:
+                blocks.append(self.block(block_type))
+
+        return "\n\n".join(blocks) + "\n"
+
+    def pages(self) -> List[str]:
+        return [self.page(index) for index in range(self.spec.pages)]
+
+    def write(self, content_dir: Path) -> List[Path]:
+        paths = []
+        for index in range(self.spec.pages):
+            path = content_dir / self.page_path(index)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(self.page(index))
+            paths.append(path)
+
+        return paths
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(prog="python3 -m src.bench.corpus")
+    arg_parser.add_argument("output", type=Path, help="directory the generated content/ tree is written to")
+    arg_parser.add_argument("--pages", type=int, default=200)
+    arg_parser.add_argument("--sections", type=int, default=10)
+    arg_parser.add_argument("--blocks", type=int, default=30, help="blocks per page")
+    arg_parser.add_argument("--mix", type=parse_block_mix, default=None, help="block weights, e.g. paragraph=5,heading=1,code=1")
+    arg_parser.add_argument("--inline-density", type=float, default=0.1, help="fraction of words wrapped in inline markup")
+    arg_parser.add_argument("--links", type=float, default=0.5, help="mean links per text block")
+    arg_parser.add_argument("--images", type=float, default=0.1, help="mean images per text block")
+    arg_parser.add_argument("--seed", type=int, default=1)
+    arg_parser.add_argument("--shared", type=float, default=0.0, help="fraction of blocks repeated from a shared pool")
+    args = arg_parser.parse_args()
+
+    spec = CorpusSpec(args.pages, args.sections, args.blocks, args.mix, args.inline_density, args.links, args.images, args.seed, args.shared)
+    paths = CorpusGenerator(spec).write(args.output)
+    print(f"Wrote {len(paths)} pages to {args.output}")
+
+
+if __name__ == "__main__":
+
+    main()
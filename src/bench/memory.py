@@ -0,0 +1,73 @@
+import argparse
+import gc
+import resource
+import time
+import tracemalloc
+from pathlib import Path
+from typing import List
+from src.htmlnode import HTMLNode
+from src.parsers.markdown import MarkdownParser
+
+NODE_MODULES = ("htmlnode.py", "textnode.py")
+
+def load_pages(content_dir: Path, count: int) -> List[str]:
+    sources = [path.read_text() for path in sorted(content_dir.rglob("*.md"))]
+    if len(sources) == 0:
+        raise FileNotFoundError(f"No markdown files found in: {content_dir}")
+
+    return [sources[i % len(sources)] for i in range(count)]
+
+def parse_pages(parser: MarkdownParser, pages: List[str]) -> List[HTMLNode]:
+    # Trees are kept alive on purpose, so the retained size reflects the size of the node objects.
+    return [parser.markdown_to_html_code(page) for page in pages]
+
+def peak_rss_kib() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(prog="python3 -m src.bench.memory")
+    arg_parser.add_argument("--pages", type=int, default=1000)
+    arg_parser.add_argument("--content", type=Path, default=Path("content"))
+    args = arg_parser.parse_args()
+
+    pages = load_pages(args.content, args.pages)
+    parser = MarkdownParser()
+    scale = 1000 / args.pages
+
+    gc.collect()
+    rss_before = peak_rss_kib()
+    start = time.perf_counter()
+    trees = parse_pages(parser, pages)
+    elapsed = time.perf_counter() - start
+    rss_after = peak_rss_kib()
+    del trees
+    gc.collect()
+
+    # Allocation counts come from a second, traced run so tracing overhead does not skew peak RSS.
+    tracemalloc.start()
+    trees = parse_pages(parser, pages)
+    snapshot = tracemalloc.take_snapshot()
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total_blocks = total_bytes = node_blocks = node_bytes = 0
+    for stat in snapshot.statistics("filename"):
+        total_blocks += stat.count
+        total_bytes += stat.size
+        # Instance dicts and props are attributed to the node constructors.
+        if stat.traceback[0].filename.endswith(NODE_MODULES):
+            node_blocks += stat.count
+            node_bytes += stat.size
+
+    print(f"pages parsed:              {args.pages}")
+    print(f"parse time per 1k pages:   {elapsed * scale:.3f}s")
+    print(f"peak RSS:                  {rss_after / 1024:.1f} MiB (+{(rss_after - rss_before) * scale / 1024:.1f} MiB per 1k pages)")
+    print(f"traced peak per 1k pages:  {traced_peak * scale / 1024 / 1024:.1f} MiB")
+    print(f"retained per 1k pages:     {total_blocks * scale:.0f} blocks, {total_bytes * scale / 1024 / 1024:.1f} MiB")
+    print(f"  in node constructors:    {node_blocks * scale:.0f} blocks, {node_bytes * scale / 1024 / 1024:.1f} MiB")
+    del trees
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,80 @@
+import argparse
+import io
+import time
+from pathlib import Path
+from typing import Callable, List, Tuple
+from src import main as build
+from src.bench.corpus import CorpusGenerator, CorpusSpec
+from src.minify import minify_css, minify_html, use_minify
+from src.parsers.markdown import MarkdownParser
+
+def render_pages(spec: CorpusSpec) -> List[str]:
+    parser = MarkdownParser()
+    pages = []
+    for page in CorpusGenerator(spec).pages():
+        sink = io.StringIO()
+        build.render_markdown_page(sink, page, parser, "/base/")
+        pages.append(sink.getvalue())
+
+    return pages
+
+def best_seconds(function: Callable[[], object], repeat: int) -> float:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        runs.append(time.perf_counter() - start)
+
+    return min(runs)
+
+def streamed(pages: List[str], chunk_size: int) -> Callable[[], List[str]]:
+    # Minifies each page the way the build does, from the chunks the template and renderer write.
+    def run() -> List[str]:
+        outputs = []
+        for page in pages:
+            sink = io.StringIO()
+            with build.minified(sink) as output:
+                for i in range(0, len(page), chunk_size):
+                    output.write(page[i:i + chunk_size])
+            outputs.append(sink.getvalue())
+        return outputs
+
+    return run
+
+def report(name: str, sources: List[str], minified: List[str], seconds: float) -> str:
+    size = sum(len(source.encode("utf-8")) for source in sources)
+    minified_size = sum(len(output.encode("utf-8")) for output in minified)
+    saved = size - minified_size
+    return (
+        f"{name:<14}{size / 1024:>10.1f} KiB -> {minified_size / 1024:>8.1f} KiB  "
+        f"saved {saved / 1024:>8.1f} KiB ({saved / size * 100:4.1f}%)  {size / seconds / 1e6:>7.2f} MB/s"
+    )
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(prog="python3 -m src.bench.minify")
+    arg_parser.add_argument("--pages", type=int, default=200)
+    arg_parser.add_argument("--blocks", type=int, default=30, help="blocks per page")
+    arg_parser.add_argument("--seed", type=int, default=1)
+    arg_parser.add_argument("--chunk-size", type=int, default=64, help="size of the chunks written to the streaming minifier")
+    arg_parser.add_argument("--css", type=Path, default=Path("static/index.css"))
+    arg_parser.add_argument("--css-copies", type=int, default=200, help="times the stylesheet is minified per run")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    pages = render_pages(CorpusSpec(pages=args.pages, blocks_per_page=args.blocks, seed=args.seed))
+    stylesheets = [args.css.read_text()] * args.css_copies
+    use_minify(True)
+
+    runs: List[Tuple[str, List[str], Callable[[], List[str]]]] = [
+        ("html", pages, lambda: [minify_html(page) for page in pages]),
+        ("html_streamed", pages, streamed(pages, args.chunk_size)),
+        ("css", stylesheets, lambda: [minify_css(stylesheet) for stylesheet in stylesheets]),
+    ]
+    for name, sources, run in runs:
+        seconds = best_seconds(run, args.repeat)
+        print(report(name, sources, run(), seconds))
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,98 @@
+import argparse
+import re
+import timeit
+from typing import Callable, Dict, List, Tuple
+from src.parsers.markdown import BlockType, MarkdownParser, get_split_pattern
+
+# Pattern strings as the parser used them before the compiled registry, rebuilt on every call.
+def legacy_block_to_block_type(block: str) -> BlockType | None:
+    regex_to_block_type: Dict[str, BlockType] = {
+        r"^#{1,6}\s": BlockType.HEADING,
+        r"^```": BlockType.CODE,
+        r"^>": BlockType.QUOTE,
+        r"^\d+\.\s": BlockType.ORDERED_LIST,
+        r"^[-*+]\s": BlockType.UNORDERED_LIST,
+        r".*": BlockType.PARAGRAPH,
+    }
+
+    first_line = block.split("\n", 1)[0]
+    for regex, block_type in regex_to_block_type.items():
+        if re.match(regex, first_line):
+            return block_type
+
+    return None
+
+def legacy_split(text: str, delimiter: str) -> List[str]:
+    d = re.escape(delimiter)
+    return re.split(rf'(?<!{d}){d}(?!{d})', text)
+
+def legacy_extract_links(text: str) -> List[Tuple[str, str]]:
+    return re.findall(rf'(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)', text)
+
+def legacy_extract_images(text: str) -> List[Tuple[str, str]]:
+    return re.findall(rf'!\[([^\[\]]*)\]\(([^\(\)]*)\)', text)
+
+BLOCKS = [
+    "# Heading",
+    "## Second level heading with `code`",
+    "```\nprint('hello')\n```",
+    "> quote\n> more quote",
+    "- item\n- item",
+    "* item\n* item",
+    "1. first\n2. second",
+    "A paragraph that starts with a letter and goes on for a while.",
+    "**Bold** start of a paragraph",
+    "12 monkeys is not a list",
+]
+
+INLINE_TEXT = (
+    "Some **bold** text, an _italic_ word, `inline code`, a [link](https://example.com/page) "
+    "and an ![image](/images/example.png) in the middle of an ordinary sentence."
+)
+
+def measure(function: Callable[[], object], number: int, repeat: int) -> float:
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number * 1e9
+
+def run(number: int, repeat: int) -> List[Tuple[str, float, float]]:
+    parser = MarkdownParser()
+    split_pattern = get_split_pattern("**")
+
+    cases: List[Tuple[str, Callable[[], object], Callable[[], object]]] = [
+        (
+            "block_to_block_type",
+            lambda: [legacy_block_to_block_type(block) for block in BLOCKS],
+            lambda: [parser.block_to_block_type(block) for block in BLOCKS],
+        ),
+        (
+            "split on '**'",
+            lambda: legacy_split(INLINE_TEXT, "**"),
+            lambda: split_pattern.split(INLINE_TEXT),
+        ),
+        (
+            "extract_markdown_links",
+            lambda: legacy_extract_links(INLINE_TEXT),
+            lambda: parser.extract_markdown_links(INLINE_TEXT),
+        ),
+        (
+            "extract_markdown_images",
+            lambda: legacy_extract_images(INLINE_TEXT),
+            lambda: parser.extract_markdown_images(INLINE_TEXT),
+        ),
+    ]
+
+    return [(name, measure(legacy, number, repeat), measure(compiled, number, repeat)) for name, legacy, compiled in cases]
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(prog="python3 -m src.bench.parser_regex")
+    arg_parser.add_argument("--number", type=int, default=20000)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    print(f"{'case':<26}{'uncompiled ns':>15}{'compiled ns':>15}{'speedup':>10}")
+    for name, legacy_ns, compiled_ns in run(args.number, args.repeat):
+        print(f"{name:<26}{legacy_ns:>15.0f}{compiled_ns:>15.0f}{legacy_ns / compiled_ns:>9.2f}x")
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,129 @@
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+from src import main as build
+from src.bench.corpus import CorpusGenerator, CorpusSpec, parse_block_mix
+from src.parsers.markdown import MarkdownParser
+from src.render_cache import RenderCache
+
+def measure(function: Callable[[], object], repeat: int) -> List[float]:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        runs.append(time.perf_counter() - start)
+
+    return runs
+
+@contextlib.contextmanager
+def working_directory(path: Path):
+    previous = Path.cwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+def run_build(argv: List[str]) -> None:
+    with contextlib.redirect_stdout(io.StringIO()):
+        build.main(argv)
+
+def run_suite(spec: CorpusSpec, repeat: int, jobs: int) -> Dict[str, List[float]]:
+    pages = CorpusGenerator(spec).pages()
+    parser = MarkdownParser()
+    trees = [parser.markdown_to_html_code(page) for page in pages]
+    bodies = [tree.to_html() for tree in trees]
+
+    def substitute_templates() -> None:
+        for body in bodies:
+            sink = io.StringIO()
+            build.write_document(sink, "Title", lambda write: write(body), "/base/")
+
+    def parse_cached() -> None:
+        cached_parser = MarkdownParser(cache=RenderCache())
+        for page in pages:
+            cached_parser.markdown_to_html_code(page)
+
+    results = {
+        "parse": measure(lambda: [parser.markdown_to_html_code(page) for page in pages], repeat),
+        "parse_cached": measure(parse_cached, repeat),
+        "render": measure(lambda: [tree.to_html() for tree in trees], repeat),
+        "template": measure(substitute_templates, repeat),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp, working_directory(Path(tmp)):
+        CorpusGenerator(spec).write(Path("content"))
+        Path("static").mkdir()
+        Path("static/index.css").write_text("body {}\n")
+
+        results["build_full"] = measure(lambda: run_build(["/base/"]), repeat)
+        results["build_full_pipeline"] = measure(lambda: run_build(["/base/", "--pipeline"]), repeat)
+        results["build_incremental_noop"] = measure(lambda: run_build(["/base/", "--incremental"]), repeat)
+        # After the no-op build: minified pages do not match the manifest of plain ones.
+        results["build_full_minify"] = measure(lambda: run_build(["/base/", "--minify"]), repeat)
+        if jobs > 1:
+            results[f"build_full_jobs{jobs}"] = measure(lambda: run_build(["/base/", "--jobs", str(jobs)]), repeat)
+
+    return results
+
+def summarize(results: Dict[str, List[float]], spec: CorpusSpec) -> Dict:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "spec": spec.to_json(),
+        "results": {
+            name: {"best_seconds": min(runs), "per_page_us": min(runs) / spec.pages * 1e6, "runs": runs}
+            for name, runs in results.items()
+        },
+    }
+
+def format_report(summary: Dict, baseline: Dict | None = None) -> str:
+    lines = [f"{'benchmark':<28}{'best s':>10}{'us/page':>12}" + (f"{'vs baseline':>14}" if baseline else "")]
+    for name, result in summary["results"].items():
+        line = f"{name:<28}{result['best_seconds']:>10.4f}{result['per_page_us']:>12.1f}"
+        previous = (baseline or {}).get("results", {}).get(name)
+        if previous is not None:
+            line += f"{(result['best_seconds'] / previous['best_seconds'] - 1) * 100:>+13.1f}%"
+        lines.append(line)
+
+    return "\n".join(lines)
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(prog="python3 -m src.bench.suite")
+    arg_parser.add_argument("--pages", type=int, default=200)
+    arg_parser.add_argument("--blocks", type=int, default=30, help="blocks per page")
+    arg_parser.add_argument("--mix", type=parse_block_mix, default=None, help="block weights, e.g. paragraph=5,heading=1,code=1")
+    arg_parser.add_argument("--inline-density", type=float, default=0.1)
+    arg_parser.add_argument("--links", type=float, default=0.5)
+    arg_parser.add_argument("--images", type=float, default=0.1)
+    arg_parser.add_argument("--seed", type=int, default=1)
+    arg_parser.add_argument("--shared", type=float, default=0.0, help="fraction of blocks repeated from a shared pool")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--jobs", type=int, default=1, help="also benchmark a parallel build with this many workers")
+    arg_parser.add_argument("--output", type=Path, help="write results as JSON to this file")
+    arg_parser.add_argument("--compare", type=Path, help="JSON results of an earlier run to compare against")
+    args = arg_parser.parse_args()
+
+    spec = CorpusSpec(pages=args.pages, blocks_per_page=args.blocks, block_mix=args.mix, inline_density=args.inline_density, links_per_block=args.links, images_per_block=args.images, seed=args.seed, shared_blocks=args.shared)
+    summary = summarize(run_suite(spec, args.repeat, args.jobs), spec)
+
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    print(format_report(summary, baseline))
+
+    if args.output:
+        args.output.write_text(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,215 @@
+from __future__ import annotations
+import gzip
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+from src.manifest import hash_bytes, remove_outputs
+from src.outputs import record_change, temp_path
+from src.static_sync import format_bytes
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_VERSION = 1
+# Outputs served with gzip_static / brotli_static: sidecars are written next to them as page.html.gz.
+COMPRESSED_SUFFIXES = frozenset((".html", ".css", ".js", ".svg"))
+# A sidecar is only kept when it is at most this fraction of the output's size; others would
+# make clients download about as much and decompress it too.
+MAX_RATIO = 0.9
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+# (relative path, content hash, encodings written, output size, total sidecar size)
+CompressResult = Tuple[str, str, List[str], int, int]
+
+def available_encodings() -> Tuple[str, ...]:
+    # Brotli is optional; gzip is always there.
+    return ("gz",) if brotli is None else ("gz", "br")
+
+def sidecar_path(output: Path, encoding: str) -> Path:
+    return output.with_name(f"{output.name}.{encoding}")
+
+def compress_bytes(data: bytes, encoding: str) -> bytes:
+    if encoding == "gz":
+        # Without a timestamp, identical content gives an identical sidecar.
+        return gzip.compress(data, GZIP_LEVEL, mtime=0)
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+def compress_output(key: str, output: Path, recorded_hash: Optional[str], encodings: Sequence[str], max_ratio: float) -> Optional[CompressResult]:
+    # Runs in a worker process. Returns None when the content hash is the recorded one, so the
+    # sidecars written for it are still current.
+    data = output.read_bytes()
+    digest = hash_bytes(data)
+    if digest == recorded_hash:
+        return None
+
+    written: List[str] = []
+    compressed_size = 0
+    for encoding in encodings:
+        sidecar = sidecar_path(output, encoding)
+        compressed = compress_bytes(data, encoding)
+        if len(compressed) > len(data) * max_ratio:
+            sidecar.unlink(missing_ok=True)
+            continue
+
+        tmp = temp_path(sidecar)
+        tmp.write_bytes(compressed)
+        os.replace(tmp, sidecar)
+        written.append(encoding)
+        compressed_size += len(compressed)
+
+    return key, digest, written, len(data), compressed_size
+
+class CompressionStats:
+    def __init__(self):
+        self.compressed = 0
+        self.skipped = 0
+        self.unchanged = 0
+        self.reused = 0
+        self.removed = 0
+        self.input_bytes = 0
+        self.output_bytes = 0
+
+    def __str__(self) -> str:
+        return (
+            f"Compression: compressed {self.compressed} outputs ({format_bytes(self.input_bytes)} -> {format_bytes(self.output_bytes)}), "
+            f"skipped {self.skipped}, unchanged {self.unchanged}, reused {self.reused}, removed {self.removed}"
+        )
+
+class CompressionStore:
+    # Precompressed sidecars of the text outputs. Outputs are keyed by their path relative to the output
+    # directory; an output whose size and mtime are the recorded ones is not read, and one whose
+    # content hash is the recorded one is not compressed again.
+    def __init__(self, path: Optional[Path] = None, encodings: Sequence[str] = available_encodings(), max_ratio: float = MAX_RATIO):
+        self.path = path
+        self.encodings = tuple(encodings)
+        self.max_ratio = max_ratio
+        # relative path -> [size, mtime_ns, hash, encodings with a sidecar]
+        self.entries: Dict[str, List] = {}
+        self.stats = CompressionStats()
+        self.dirty = False
+
+    @staticmethod
+    def load(path: Path, encodings: Sequence[str] = available_encodings(), max_ratio: float = MAX_RATIO) -> CompressionStore:
+        store = CompressionStore(path, encodings, max_ratio)
+        if not path.exists():
+            return store
+
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return store
+
+        if data.get("version") != COMPRESSION_VERSION:
+            return store
+
+        # Sidecars written with other encodings or another ratio are all redone, but stay recorded
+        # until then so they can still be removed.
+        store.entries = data.get("outputs", {})
+        if data.get("encodings") != list(store.encodings) or data.get("max_ratio") != store.max_ratio:
+            for entry in store.entries.values():
+                entry[0] = -1
+                entry[2] = ""
+
+        return store
+
+    def save(self) -> None:
+        if self.path is None or not self.dirty:
+            return
+
+        data = {
+            "version": COMPRESSION_VERSION,
+            "encodings": list(self.encodings),
+            "max_ratio": self.max_ratio,
+            "outputs": dict(sorted(self.entries.items())),
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(data, indent=1))
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def __scan(self, dst_dir: Path) -> Dict[str, Path]:
+        outputs: Dict[str, Path] = {}
+        for dirpath, _, filenames in os.walk(dst_dir):
+            for filename in filenames:
+                # Temporary files of outputs being written start with a dot.
+                output = Path(dirpath) / filename
+                if output.suffix in COMPRESSED_SUFFIXES and not filename.startswith("."):
+                    outputs[output.relative_to(dst_dir).as_posix()] = output
+        return outputs
+
+    def __has_sidecars(self, output: Path, entry: Optional[List]) -> bool:
+        return entry is not None and all(sidecar_path(output, encoding).exists() for encoding in entry[3])
+
+    def update(self, dst_dir: Path, jobs: int = 1) -> None:
+        outputs = self.__scan(dst_dir)
+        pending: List[Tuple[str, Path, Optional[str], Sequence[str], float]] = []
+        stats: Dict[str, os.stat_result] = {}
+        for key, output in sorted(outputs.items()):
+            stat = output.stat()
+            entry = self.entries.get(key)
+            # A missing sidecar is written again even when the content did not change.
+            has_sidecars = self.__has_sidecars(output, entry)
+            if has_sidecars and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+                self.stats.reused += 1
+                continue
+
+            stats[key] = stat
+            pending.append((key, output, entry[2] if has_sidecars else None, self.encodings, self.max_ratio))
+
+        if len(pending) > 0:
+            if jobs > 1 and len(pending) > 1:
+                with ProcessPoolExecutor(max_workers=min(jobs, len(pending))) as pool:
+                    chunksize = max(1, len(pending) // (jobs * 4))
+                    results = list(pool.map(compress_output, *zip(*pending), chunksize=chunksize))
+            else:
+                results = [compress_output(*arguments) for arguments in pending]
+
+            for (key, output, _, _, _), result in zip(pending, results):
+                stat = stats[key]
+                if result is None:
+                    # Rewritten with the same content: only the recorded stat changes.
+                    self.entries[key][:2] = [stat.st_size, stat.st_mtime_ns]
+                    self.stats.unchanged += 1
+                else:
+                    _, digest, written, size, compressed_size = result
+                    entry = self.entries.get(key)
+                    if entry is not None:
+                        # Sidecars of encodings that are no longer written.
+                        remove_outputs([sidecar_path(output, encoding) for encoding in entry[3] if encoding not in written], dst_dir)
+                    self.entries[key] = [stat.st_size, stat.st_mtime_ns, digest, written]
+                    for encoding in written:
+                        record_change(sidecar_path(output, encoding))
+                    if len(written) == 0:
+                        self.stats.skipped += 1
+                    else:
+                        self.stats.compressed += 1
+                        self.stats.input_bytes += size
+                        self.stats.output_bytes += compressed_size
+                self.dirty = True
+
+        # Sidecars of outputs that are gone.
+        stale = [key for key in self.entries if key not in outputs]
+        for key in stale:
+            entry = self.entries.pop(key)
+            remove_outputs([sidecar_path(dst_dir / key, encoding) for encoding in entry[3]], dst_dir)
+            self.stats.removed += 1
+            self.dirty = True
+
+    def unpublish(self, dst_dir: Path) -> None:
+        # With compression turned off, sidecars of an earlier build would keep serving the old content.
+        for key, entry in self.entries.items():
+            remove_outputs([sidecar_path(dst_dir / key, encoding) for encoding in entry[3]], dst_dir)
+            self.stats.removed += 1
+        self.dirty = self.dirty or len(self.entries) > 0
+        self.entries = {}
+
+    def __repr__(self) -> str:
+        return f'CompressionStore({self.path}, {len(self.entries)})'
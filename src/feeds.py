@@ -0,0 +1,96 @@
+from __future__ import annotations
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from pathlib import Path
+from typing import List, Optional, Sequence
+from src.listings import LISTING_SECTION, Post, page_url
+from src.outputs import AtomicOutput
+from src.page_index import PageIndex
+from src.sitemap import XmlWriter, absolute_url, w3c_datetime
+
+ATOM_NAMESPACE = "http://www.w3.org/2005/Atom"
+ATOM_FILE = "atom.xml"
+RSS_FILE = "rss.xml"
+FEED_SIZE = 20
+
+def post_datetime(date: str) -> datetime:
+    moment = datetime.fromisoformat(date.replace("Z", "+00:00"))
+    return moment if moment.tzinfo is not None else moment.replace(tzinfo=timezone.utc)
+
+def feed_posts(index: PageIndex, section: str = LISTING_SECTION, size: int = FEED_SIZE, drafts: bool = False) -> List[Post]:
+    # Only dated posts make it into feeds; the index already has them newest first.
+    posts = [
+        (key, meta) for key, meta in index.pages(drafts)
+        if key.startswith(f"{section}/") and key != f"{section}/index.md" and meta.date is not None
+    ]
+    return posts[:size]
+
+def feed_updated(index: PageIndex, posts: Sequence[Post], drafts: bool = False) -> Optional[datetime]:
+    # The newest post dates the feed; without posts, the newest page the index recorded does.
+    if posts and posts[0][1].date:
+        return post_datetime(posts[0][1].date)
+    mtimes = [entry.mtime_ns for entry in index.entries.values() if drafts or not entry.meta.draft]
+    return datetime.fromtimestamp(max(mtimes) / 1e9, timezone.utc) if mtimes else None
+
+def write_atom(path: Path, site_url: str, title: str, posts: Sequence[Post], author: Optional[str] = None, updated: Optional[datetime] = None) -> None:
+    if updated is None:
+        updated = post_datetime(posts[0][1].date) if posts and posts[0][1].date else datetime.now(timezone.utc)
+
+    with AtomicOutput(path) as sink:
+        writer = XmlWriter(sink)
+        writer.declaration()
+        writer.start("feed", {"xmlns": ATOM_NAMESPACE})
+        writer.element("title", title)
+        writer.element("id", absolute_url(site_url, "/"))
+        writer.element("link", attributes={"href": absolute_url(site_url, "/")})
+        writer.element("link", attributes={"rel": "self", "href": absolute_url(site_url, f"/{ATOM_FILE}")})
+        writer.element("updated", w3c_datetime(updated))
+        # Atom requires an author on the feed or on every entry; the site title stands in for a missing one.
+        writer.start("author")
+        writer.element("name", author or title)
+        writer.end()
+
+        for key, meta in posts:
+            assert meta.date is not None
+            url = absolute_url(site_url, page_url(key))
+            writer.start("entry")
+            writer.element("title", meta.title or key)
+            writer.element("id", url)
+            writer.element("link", attributes={"href": url})
+            writer.element("updated", w3c_datetime(post_datetime(meta.date)))
+            for tag in meta.tags:
+                writer.element("category", attributes={"term": tag})
+            writer.end()
+
+        writer.close()
+
+def write_rss(path: Path, site_url: str, title: str, posts: Sequence[Post], description: Optional[str] = None) -> None:
+    with AtomicOutput(path) as sink:
+        writer = XmlWriter(sink)
+        writer.declaration()
+        writer.start("rss", {"version": "2.0"})
+        writer.start("channel")
+        writer.element("title", title)
+        writer.element("link", absolute_url(site_url, "/"))
+        writer.element("description", description or title)
+
+        for key, meta in posts:
+            assert meta.date is not None
+            url = absolute_url(site_url, page_url(key))
+            writer.start("item")
+            writer.element("title", meta.title or key)
+            writer.element("link", url)
+            writer.element("guid", url)
+            writer.element("pubDate", format_datetime(post_datetime(meta.date)))
+            for tag in meta.tags:
+                writer.element("category", tag)
+            writer.end()
+
+        writer.close()
+
+def write_feeds(dst_dir: Path, site_url: str, title: str, index: PageIndex, section: str = LISTING_SECTION, size: int = FEED_SIZE, drafts: bool = False, author: Optional[str] = None) -> List[Path]:
+    posts = feed_posts(index, section, size, drafts)
+    write_atom(dst_dir / ATOM_FILE, site_url, title, posts, author, feed_updated(index, posts, drafts))
+    write_rss(dst_dir / RSS_FILE, site_url, title, posts)
+
+    return [dst_dir / ATOM_FILE, dst_dir / RSS_FILE]
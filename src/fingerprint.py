@@ -0,0 +1,171 @@
+from __future__ import annotations
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+from src.manifest import hash_file, hash_text, remove_outputs
+from src.outputs import record_change, write_if_changed
+from src.static_sync import AssetTransform, link_or_copy
+
+FINGERPRINT_VERSION = 1
+FINGERPRINT_LENGTH = 10
+# Deploy manifest written next to the outputs: every asset's URL, fingerprinted URL and content hash.
+ASSET_MANIFEST_FILE = "asset-manifest.json"
+
+def fingerprinted_path(relative_path: str, digest: str) -> str:
+    # images/tom.png -> images/tom.<hash>.png; dotfiles and files without a suffix get it appended.
+    directory, _, name = relative_path.rpartition("/")
+    stem, dot, suffix = name.rpartition(".")
+    if not stem:
+        stem, dot, suffix = name, "", ""
+    name = f"{stem}.{digest[:FINGERPRINT_LENGTH]}{dot}{suffix}"
+
+    return f"{directory}/{name}" if directory else name
+
+class AssetEntry:
+    __slots__ = ("size", "mtime_ns", "digest")
+
+    def __init__(self, size: int, mtime_ns: int, digest: str):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.digest = digest
+
+    def to_json(self) -> Dict:
+        return {"size": self.size, "mtime_ns": self.mtime_ns, "hash": self.digest}
+
+    @staticmethod
+    def from_json(data: Dict) -> AssetEntry:
+        return AssetEntry(data["size"], data["mtime_ns"], data["hash"])
+
+class FingerprintStats:
+    def __init__(self):
+        self.hashed = 0
+        self.reused = 0
+        self.written = 0
+        self.removed = 0
+
+    def __str__(self) -> str:
+        return f"Fingerprints: hashed {self.hashed} assets, reused {self.reused}, wrote {self.written} copies, removed {self.removed}"
+
+class AssetFingerprints:
+    # Content hashes of the static assets, keyed by their path relative to the static directory. An
+    # asset is only hashed again when its size or mtime changed, like pages in the build manifest.
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path
+        self.entries: Dict[str, AssetEntry] = {}
+        # Fingerprinted copies written to the output directory, saved with the hashes so copies left by
+        # an earlier run are removed by write_copies() once they are no longer current.
+        self.written: List[str] = []
+        self.stats = FingerprintStats()
+        self.dirty = False
+
+    @staticmethod
+    def load(path: Path) -> AssetFingerprints:
+        fingerprints = AssetFingerprints(path)
+        if not path.exists():
+            return fingerprints
+
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return fingerprints
+
+        if data.get("version") == FINGERPRINT_VERSION:
+            fingerprints.entries = {key: AssetEntry.from_json(entry) for key, entry in data.get("assets", {}).items()}
+            fingerprints.written = data.get("written", [])
+
+        return fingerprints
+
+    def save(self) -> None:
+        if self.path is None or not self.dirty:
+            return
+
+        data = {
+            "version": FINGERPRINT_VERSION,
+            "assets": {key: entry.to_json() for key, entry in sorted(self.entries.items())},
+            "written": self.written,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(data, indent=1))
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def update(self, static_dir: Path) -> None:
+        if not static_dir.exists():
+            raise FileNotFoundError(f"Static directory not found: {static_dir}")
+
+        seen: Set[str] = set()
+        for dirpath, _, filenames in os.walk(static_dir):
+            for filename in filenames:
+                source = Path(dirpath) / filename
+                key = source.relative_to(static_dir).as_posix()
+                stat = source.stat()
+                seen.add(key)
+
+                entry = self.entries.get(key)
+                if entry is not None and entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+                    self.stats.reused += 1
+                    continue
+
+                digest = hash_file(source)
+                self.stats.hashed += 1
+                self.entries[key] = AssetEntry(stat.st_size, stat.st_mtime_ns, digest)
+                self.dirty = True
+
+        for key in [key for key in self.entries if key not in seen]:
+            del self.entries[key]
+            self.dirty = True
+
+    def urls(self) -> Dict[str, str]:
+        return {f"/{key}": f"/{fingerprinted_path(key, entry.digest)}" for key, entry in sorted(self.entries.items())}
+
+    def hash(self) -> str:
+        return hash_text(json.dumps(self.urls()))
+
+    def write_copies(self, static_dir: Path, dst_dir: Path, hardlink: bool = True, transforms: Optional[Dict[str, AssetTransform]] = None) -> None:
+        # Copies are named by their content, so one that exists with the right size is up to date.
+        # Assets with a transform are named by their source too, and rewritten only when the result changed.
+        for key, entry in sorted(self.entries.items()):
+            output = dst_dir / fingerprinted_path(key, entry.digest)
+            transform = None if transforms is None else transforms.get(output.suffix)
+            if transform is not None:
+                output.parent.mkdir(parents=True, exist_ok=True)
+                if write_if_changed(output, transform((static_dir / key).read_text())):
+                    self.stats.written += 1
+                continue
+            if output.exists() and output.stat().st_size == entry.size:
+                continue
+
+            output.parent.mkdir(parents=True, exist_ok=True)
+            link_or_copy(static_dir / key, output, hardlink)
+            record_change(output)
+            self.stats.written += 1
+
+        live = sorted(fingerprinted_path(key, entry.digest) for key, entry in self.entries.items())
+        stale = [dst_dir / path for path in set(self.written).difference(live)]
+        remove_outputs(stale, dst_dir)
+        self.stats.removed += len(stale)
+        if self.written != live:
+            self.written = live
+            self.dirty = True
+
+    def write_manifest(self, dst_dir: Path) -> bool:
+        assets = {
+            f"/{key}": {"url": f"/{fingerprinted_path(key, entry.digest)}", "hash": entry.digest, "size": entry.size}
+            for key, entry in sorted(self.entries.items())
+        }
+        return write_if_changed(dst_dir / ASSET_MANIFEST_FILE, json.dumps(assets, indent=1) + "\n")
+
+    def unpublish(self, dst_dir: Path) -> None:
+        # With fingerprinting turned off, the copies and the deploy manifest are removed. The hashes
+        # stay, so turning it on again does not hash every asset again.
+        current = {fingerprinted_path(key, entry.digest) for key, entry in self.entries.items()}
+        copies = [dst_dir / path for path in current.union(self.written)]
+        remove_outputs([*copies, dst_dir / ASSET_MANIFEST_FILE], dst_dir)
+        self.stats.removed += len(copies)
+        self.written = []
+        self.dirty = True
+
+    def __repr__(self) -> str:
+        return f'AssetFingerprints({self.path}, {len(self.entries)})'
@@ -0,0 +1,159 @@
+from __future__ import annotations
+import re
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+Value = Union[str, bool, List[str]]
+
+# A page may open with a YAML-style (---, "key: value") or TOML-style (+++, "key = value") block.
+FRONT_MATTER_FENCES = {"---": ":", "+++": "="}
+# The fences, the block between them and any blank lines before the body.
+FRONT_MATTER_PATTERN = re.compile(r'\A(---|\+\+\+)[ \t]*\r?\n(.*?)^\1[ \t]*(?:\r?\n|\Z)(?:[ \t]*\r?\n)*', re.DOTALL | re.MULTILINE)
+
+def page_title(text: str) -> str:
+    # Only the first line is split, however large the page is.
+    newline = text.find("\n")
+    lines = (text if newline == -1 else text[:newline]).splitlines()
+
+    return lines[0].lstrip("#").strip() if lines else ""
+
+class PageMeta:
+    __slots__ = ("title", "date", "tags", "draft", "template")
+
+    def __init__(self, title: str = "", date: Optional[str] = None, tags: Optional[List[str]] = None, draft: bool = False, template: Optional[str] = None):
+        self.title = title
+        self.date = date
+        self.tags = tags if tags is not None else []
+        self.draft = draft
+        self.template = template
+
+    def to_json(self) -> Dict:
+        return {"title": self.title, "date": self.date, "tags": self.tags, "draft": self.draft, "template": self.template}
+
+    @staticmethod
+    def from_json(data: Dict) -> PageMeta:
+        return PageMeta(data["title"], data["date"], data["tags"], data["draft"], data["template"])
+
+    def __eq__(self, other):
+        if not isinstance(other, PageMeta):
+            return NotImplemented
+        return self.to_json() == other.to_json()
+
+    def __repr__(self) -> str:
+        return f'PageMeta({self.title}, {self.date}, {self.tags}, {self.draft}, {self.template})'
+
+def parse_value(text: str) -> Value:
+    text = text.strip()
+    if text.startswith("[") and text.endswith("]"):
+        return [str(parse_value(item)) for item in text[1:-1].split(",") if item.strip()]
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'":
+        return text[1:-1]
+    if text in ("true", "false"):
+        return text == "true"
+
+    return text
+
+def parse_fields(lines: List[str], separator: str) -> Dict[str, Value]:
+    fields: Dict[str, Value] = {}
+    list_key: Optional[str] = None
+
+    for line in lines:
+        stripped = line.strip()
+        if stripped == "" or stripped.startswith("#"):
+            continue
+
+        # YAML block lists: "tags:" followed by "- item" lines.
+        if list_key is not None and stripped.startswith("- "):
+            items = fields[list_key]
+            assert isinstance(items, list)
+            items.append(str(parse_value(stripped[2:])))
+            continue
+
+        key, found, value = stripped.partition(separator)
+        if not found or key.strip() == "":
+            raise ValueError(f"Invalid front matter line: {stripped}")
+
+        key = key.strip()
+        if value.strip() == "":
+            fields[key] = []
+            list_key = key
+        else:
+            fields[key] = parse_value(value)
+            list_key = None
+
+    return fields
+
+def fields_to_meta(fields: Dict[str, Value], title: str) -> PageMeta:
+    # Pages without a title field keep the title of their first line.
+    meta = PageMeta(title)
+
+    value = fields.get("title")
+    if value is not None:
+        if not isinstance(value, str):
+            raise ValueError(f"Front matter title must be a string: {value}")
+        meta.title = value
+
+    value = fields.get("date")
+    if value is not None:
+        if not isinstance(value, str):
+            raise ValueError(f"Front matter date must be a string: {value}")
+        # Validated but kept as written; ISO dates in one format sort as strings.
+        datetime.fromisoformat(value.replace("Z", "+00:00"))
+        meta.date = value
+
+    value = fields.get("tags")
+    if value is not None:
+        meta.tags = [value] if isinstance(value, str) else [str(tag) for tag in value]
+
+    value = fields.get("draft")
+    if value is not None:
+        if not isinstance(value, bool):
+            raise ValueError(f"Front matter draft must be true or false: {value}")
+        meta.draft = value
+
+    value = fields.get("template")
+    if value is not None:
+        if not isinstance(value, str):
+            raise ValueError(f"Front matter template must be a string: {value}")
+        meta.template = value
+
+    return meta
+
+def split_front_matter(content: str) -> Tuple[PageMeta, str]:
+    if not content.startswith(tuple(FRONT_MATTER_FENCES)):
+        return PageMeta(page_title(content)), content
+
+    match = FRONT_MATTER_PATTERN.match(content)
+    if match is None:
+        fence = page_title(content)
+        if fence in FRONT_MATTER_FENCES:
+            raise ValueError(f"Front matter opened with {fence} is never closed")
+        return PageMeta(fence), content
+
+    body = content[match.end():]
+    fields = parse_fields(match.group(2).splitlines(), FRONT_MATTER_FENCES[match.group(1)])
+
+    return fields_to_meta(fields, page_title(body)), body
+
+def read_front_matter(lines: Iterator[str]) -> Tuple[PageMeta, str]:
+    # Consumes the front matter and the first line of the body, which is returned along with the
+    # metadata, so neither the page index nor streamed pages have to read the rest of the body.
+    first_line = next(lines, "")
+    fence = first_line.rstrip()
+    separator = FRONT_MATTER_FENCES.get(fence)
+    if separator is None:
+        return PageMeta(page_title(first_line)), first_line
+
+    block: List[str] = []
+    for line in lines:
+        if line.rstrip() == fence:
+            break
+        block.append(line)
+    else:
+        raise ValueError(f"Front matter opened with {fence} is never closed")
+
+    first_line = next(lines, "")
+    while first_line.strip() == "" and first_line != "":
+        first_line = next(lines, "")
+
+    return fields_to_meta(parse_fields(block, separator), page_title(first_line)), first_line
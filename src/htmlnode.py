@@ -1,6 +1,8 @@
 from __future__ import annotations
-from typing import List, Dict, Optional
+from types import MappingProxyType
+from typing import Callable, List, Dict, Mapping, Optional, Sequence, TextIO, Tuple
 from enum import Enum
+from src.urls import URL_ATTRIBUTES, URL_LIST_ATTRIBUTES, resolve_srcset, resolve_url
 
 class HTMLTag(Enum):
     PARAGRAPH = 'p',
@@ -12,13 +14,48 @@ class HTMLTag(Enum):
     CODE = 'code'
 
 class HTMLNode:
+    # Parsing a large site creates millions of nodes, so they carry no per-instance __dict__
+    # and their props are a read-only view over a private copy.
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag: Optional[str] = None, value: Optional[str] = None, children: Optional[List[HTMLNode]] = None, props: Optional[Dict[str, str]] = None):
         self.tag = tag
         self.value = value
         self.children = children
-        self.props = props
+        self.props: Optional[Mapping[str, str]] = None if props is None else MappingProxyType(dict(props))
+
+    def to_html(self) -> str:
+        parts: List[str] = []
+        self.render(parts.append)
+        return "".join(parts)
+
+    def write_html(self, sink: TextIO) -> None:
+        self.render(sink.write)
+
+    def render(self, write: Callable[[str], object]) -> None:
+        # Walks the tree with an explicit stack of child iterators instead of recursion: every chunk
+        # is written exactly once, so deep trees are neither re-copied per ancestor nor limited by
+        # the recursion limit.
+        opening, children, closing = self.html_parts()
+        write(opening)
 
-    def to_html(self):
+        stack = [(iter(children), closing)]
+        while stack:
+            children_iter, closing = stack[-1]
+            for child in children_iter:
+                opening, grandchildren, child_closing = child.html_parts()
+                write(opening)
+                if grandchildren:
+                    stack.append((iter(grandchildren), child_closing))
+                    break
+                if child_closing:
+                    write(child_closing)
+            else:
+                stack.pop()
+                if closing:
+                    write(closing)
+
+    def html_parts(self) -> Tuple[str, Sequence[HTMLNode], str]:
         raise NotImplementedError()
 
     def props_to_html(self):
@@ -27,37 +64,47 @@ class HTMLNode:
             for key, value in self.props.items():
                 if value is None:
                     continue
+                if key in URL_ATTRIBUTES:
+                    value = resolve_url(value)
+                elif key in URL_LIST_ATTRIBUTES:
+                    value = resolve_srcset(value)
                 props_string += f"{key}='{value}' "
             props_string = props_string.rstrip()
 
         return props_string if len(props_string) == 0 else f" {props_string}"
 
     def __repr__(self) -> str:
-        return f'HTMLNode({self.tag}, {self.value}, {self.children}, {self.props})'
+        props = None if self.props is None else dict(self.props)
+        return f'HTMLNode({self.tag}, {self.value}, {self.children}, {props})'
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, value: str, tag: Optional[str] = None, props: Optional[Dict[str, str]] = None):
         super().__init__(tag=tag, value=value, children=None, props=props)
 
-    def to_html(self):
+    def html_parts(self) -> Tuple[str, Sequence[HTMLNode], str]:
         if self.value is None:
             print(self.value, self.tag, self.props)
             raise ValueError("LeafNode must have a value")
 
         if not self.tag:
-            return self.value
+            return self.value, (), ""
 
-        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>", (), ""
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag: str, children: List[HTMLNode], props: Optional[Dict[str, str]] = None):
         super().__init__(tag=tag, value=None, children=children, props=props)
     
-    def to_html(self):
+    def html_parts(self) -> Tuple[str, Sequence[HTMLNode], str]:
         if not self.tag:
             raise ValueError(f"{self.__class__} must have a tag")
 
         if not self.children:
             raise ValueError(f"{self.__class__} must have children")
 
-        return f"<{self.tag}{self.props_to_html()}>{"".join([child.to_html() for child in self.children])}</{self.tag}>"
+        return f"<{self.tag}{self.props_to_html()}>", self.children, f"</{self.tag}>"
+
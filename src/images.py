@@ -0,0 +1,539 @@
+from __future__ import annotations
+import json
+import os
+import struct
+import sys
+import zlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from operator import itemgetter
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from src.manifest import hash_file, hash_text, remove_outputs
+from src.outputs import record_change
+from src.static_sync import link_or_copy
+from src.urls import use_image_attributes
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+IMAGES_VERSION = 1
+IMAGE_SUFFIXES = frozenset((".png", ".jpg", ".jpeg", ".gif", ".webp"))
+VARIANT_WIDTHS = (480, 960)
+FINGERPRINT_LENGTH = 10
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Samples per pixel of the PNG colour types: greyscale, RGB, palette, greyscale + alpha, RGBA.
+PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+PNG_COLOR_TYPES = {1: 0, 2: 4, 3: 2, 4: 6}
+# JPEG start-of-frame markers, which carry the image size (C4, C8 and CC are other segments).
+JPEG_FRAME_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# (width, height) of a resized variant
+Variant = Tuple[int, int]
+
+class PngImage:
+    # 8-bit samples, rows stored one after another without their filter bytes.
+    __slots__ = ("width", "height", "channels", "pixels")
+
+    def __init__(self, width: int, height: int, channels: int, pixels: bytearray):
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.pixels = pixels
+
+    def __repr__(self) -> str:
+        return f'PngImage({self.width}x{self.height}, {self.channels})'
+
+def _png_chunks(data: bytes) -> List[Tuple[bytes, bytes]]:
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("Not a PNG file")
+
+    chunks: List[Tuple[bytes, bytes]] = []
+    position = len(PNG_SIGNATURE)
+    while position + 8 <= len(data):
+        length, kind = struct.unpack(">I4s", data[position:position + 8])
+        chunks.append((kind, data[position + 8:position + 8 + length]))
+        position += length + 12
+        if kind == b"IEND":
+            break
+
+    return chunks
+
+def _swar_masks(size: int) -> Tuple[int, int]:
+    return int.from_bytes(b"\x7f" * size, "big"), int.from_bytes(b"\x80" * size, "big")
+
+def _add_rows(row: bytes, previous: bytes) -> bytes:
+    # Bytewise (row + previous) mod 256 in a few big-integer operations instead of a loop per byte:
+    # the low seven bits are added without carrying into the next byte and the top bit is xored in.
+    low, high = _swar_masks(len(row))
+    a, b = int.from_bytes(row, "big"), int.from_bytes(previous, "big")
+    return (((a & low) + (b & low)) ^ ((a ^ b) & high)).to_bytes(len(row), "big")
+
+def _subtract_rows(row: bytes, previous: bytes) -> bytes:
+    # Bytewise (row - previous) mod 256, the inverse of _add_rows.
+    low, high = _swar_masks(len(row))
+    a, b = int.from_bytes(row, "big"), int.from_bytes(previous, "big")
+    return (((a | high) - (b & low)) ^ ((a ^ b ^ high) & high)).to_bytes(len(row), "big")
+
+def _unfilter(data: bytes, stride: int, height: int, bpp: int) -> bytearray:
+    pixels = bytearray(stride * height)
+    previous = bytes(stride)
+    position = 0
+
+    for y in range(height):
+        kind = data[position]
+        row = bytearray(data[position + 1:position + 1 + stride])
+        position += stride + 1
+
+        if kind == 1:
+            for i in range(bpp, stride):
+                row[i] = (row[i] + row[i - bpp]) & 0xFF
+        elif kind == 2:
+            row = bytearray(_add_rows(row, previous))
+        elif kind == 3:
+            for i in range(stride):
+                left = row[i - bpp] if i >= bpp else 0
+                row[i] = (row[i] + ((left + previous[i]) >> 1)) & 0xFF
+        elif kind == 4:
+            for i in range(stride):
+                if i >= bpp:
+                    left, upper_left = row[i - bpp], previous[i - bpp]
+                else:
+                    left = upper_left = 0
+                up = previous[i]
+                estimate = left + up - upper_left
+                distance_left, distance_up, distance_upper_left = abs(estimate - left), abs(estimate - up), abs(estimate - upper_left)
+                if distance_left <= distance_up and distance_left <= distance_upper_left:
+                    predictor = left
+                elif distance_up <= distance_upper_left:
+                    predictor = up
+                else:
+                    predictor = upper_left
+                row[i] = (row[i] + predictor) & 0xFF
+        elif kind != 0:
+            raise ValueError(f"Unknown PNG filter type {kind}")
+
+        pixels[y * stride:(y + 1) * stride] = row
+        previous = bytes(row)
+
+    return pixels
+
+def read_png(path: Path) -> PngImage:
+    # Pure-Python decoder for what sites usually ship: 8-bit, non-interlaced greyscale, RGB, palette
+    # and alpha images. Anything else, and truncated or corrupt files, raise ValueError and are left
+    # at their original size.
+    try:
+        return _decode_png(path.read_bytes())
+    except (zlib.error, struct.error, IndexError) as error:
+        raise ValueError(f"Corrupt PNG file: {error}") from error
+
+def _decode_png(data: bytes) -> PngImage:
+    chunks = _png_chunks(data)
+    if len(chunks) == 0 or chunks[0][0] != b"IHDR":
+        raise ValueError("PNG file without IHDR chunk")
+
+    width, height, bit_depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", chunks[0][1])
+    if bit_depth != 8 or interlace != 0 or color_type not in PNG_CHANNELS:
+        raise ValueError(f"Unsupported PNG format (bit depth {bit_depth}, colour type {color_type}, interlace {interlace})")
+
+    channels = PNG_CHANNELS[color_type]
+    data = zlib.decompress(b"".join(body for kind, body in chunks if kind == b"IDAT"))
+    if len(data) < (width * channels + 1) * height:
+        raise ValueError(f"Truncated PNG image data ({len(data)} bytes for {width}x{height})")
+    pixels = _unfilter(data, width * channels, height, channels)
+    if color_type != 3:
+        return PngImage(width, height, channels, pixels)
+
+    # Palette images are expanded to RGB, or RGBA when the palette has transparency.
+    palette = next((body for kind, body in chunks if kind == b"PLTE"), b"")
+    alpha = next((body for kind, body in chunks if kind == b"tRNS"), None)
+    colors = [palette[i:i + 3] for i in range(0, len(palette), 3)]
+    if alpha is not None:
+        colors = [color + bytes((alpha[i] if i < len(alpha) else 0xFF,)) for i, color in enumerate(colors)]
+    return PngImage(width, height, 3 if alpha is None else 4, bytearray(b"".join(colors[index] for index in pixels)))
+
+def _png_chunk(kind: bytes, body: bytes) -> bytes:
+    return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+
+def write_png(path: Path, image: PngImage) -> None:
+    # Rows use the Up filter, which needs no per-byte Python loop and compresses photos reasonably.
+    stride = image.width * image.channels
+    rows: List[bytes] = []
+    previous = bytes(stride)
+    for y in range(image.height):
+        row = bytes(image.pixels[y * stride:(y + 1) * stride])
+        rows.append(b"\x02" + _subtract_rows(row, previous))
+        previous = row
+
+    header = struct.pack(">IIBBBBB", image.width, image.height, 8, PNG_COLOR_TYPES[image.channels], 0, 0, 0)
+    path.write_bytes(PNG_SIGNATURE + _png_chunk(b"IHDR", header) + _png_chunk(b"IDAT", zlib.compress(b"".join(rows))) + _png_chunk(b"IEND", b""))
+
+def _spans(size: int, target: int) -> List[Tuple[int, int]]:
+    # Source ranges averaged into each target pixel; every range covers at least one source pixel.
+    spans: List[Tuple[int, int]] = []
+    for index in range(target):
+        start = index * size // target
+        spans.append((start, max(start + 1, (index + 1) * size // target)))
+    return spans
+
+def _widen(row: bytes) -> int:
+    # Every byte in its own little-endian 16-bit lane, so up to 257 rows can be added without carries.
+    wide = bytearray(2 * len(row))
+    wide[::2] = row
+    return int.from_bytes(wide, "little")
+
+def resize_png(image: PngImage, width: int) -> PngImage:
+    # Box filter, vertically and then horizontally. Rows are summed as big integers with a 16-bit lane
+    # per sample and columns are gathered through precomputed itemgetters, so the per-sample work
+    # stays inside C builtins.
+    height = max(1, round(image.height * width / image.width))
+    channels = image.channels
+    stride = image.width * channels
+    rows = [bytes(image.pixels[y * stride:(y + 1) * stride]) for y in range(image.height)]
+    wide_rows: List[Optional[int]] = [None] * image.height
+
+    scaled_rows: List[bytes] = []
+    for start, end in _spans(image.height, height):
+        count = end - start
+        if count == 1:
+            scaled_rows.append(rows[start])
+            continue
+        for y in range(start, end):
+            if wide_rows[y] is None:
+                wide_rows[y] = _widen(rows[y])
+        lanes = array("H", sum(wide_rows[start:end]).to_bytes(2 * stride, "little"))
+        if sys.byteorder == "big":
+            lanes.byteswap()
+        scaled_rows.append(bytes(map(int.__floordiv__, map(int.__add__, lanes, repeat(count // 2)), repeat(count))))
+
+    # getters[j] picks the j-th source sample of every target sample; shorter spans pick the zero byte
+    # appended to each row. The trailing extra index keeps itemgetter returning a tuple.
+    columns = _spans(image.width, width)
+    getters = [
+        itemgetter(*[(start + j) * channels + channel if start + j < end else stride for start, end in columns for channel in range(channels)], stride)
+        for j in range(max(end - start for start, end in columns))
+    ]
+    counts = [end - start for start, end in columns for _ in range(channels)]
+    halves = [count // 2 for count in counts]
+
+    pixels = bytearray()
+    for row in scaled_rows:
+        row += b"\0"
+        sums: Iterable[int] = halves
+        for getter in getters:
+            sums = map(int.__add__, sums, getter(row))
+        pixels += bytes(map(int.__floordiv__, sums, counts))
+
+    return PngImage(width, height, channels, pixels)
+
+def _jpeg_size(source: BinaryIO) -> Optional[Tuple[int, int]]:
+    source.seek(2)
+    while True:
+        marker = source.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        length = struct.unpack(">H", source.read(2))[0]
+        if marker[1] in JPEG_FRAME_MARKERS:
+            height, width = struct.unpack(">xHH", source.read(5))
+            return width, height
+        source.seek(length - 2, os.SEEK_CUR)
+
+def image_size(path: Path) -> Optional[Tuple[int, int]]:
+    # PNG, GIF and JPEG sizes are read from their headers; other formats need Pillow.
+    with path.open("rb") as source:
+        header = source.read(26)
+        if header.startswith(PNG_SIGNATURE) and header[12:16] == b"IHDR":
+            return struct.unpack(">II", header[16:24])
+        if header[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", header[6:10])
+        if header.startswith(b"\xff\xd8"):
+            try:
+                return _jpeg_size(source)
+            except struct.error:
+                return None
+
+    if Image is not None:
+        with Image.open(path) as image:
+            return image.size
+    return None
+
+def variant_name(digest: str, width: int, suffix: str) -> str:
+    return f"{digest}-{width}w{suffix}"
+
+def variant_path(relative_path: str, digest: str, width: int) -> str:
+    # images/tom.png -> images/tom-480w.<hash>.png: named by content, so variants can be cached forever.
+    stem, dot, suffix = relative_path.rpartition(".")
+    return f"{stem}-{width}w.{digest[:FINGERPRINT_LENGTH]}{dot}{suffix}"
+
+def _resize(source: Path, outputs: Sequence[Tuple[int, Path]]) -> List[Variant]:
+    # The source is decoded once for all of its variants.
+    variants: List[Variant] = []
+    if Image is not None:
+        with Image.open(source) as image:
+            for width, output in outputs:
+                tmp = output.with_name(f".{output.name}.{os.getpid()}.tmp")
+                height = max(1, round(image.height * width / image.width))
+                image.resize((width, height), Image.LANCZOS).save(tmp, format=image.format)
+                os.replace(tmp, output)
+                variants.append((width, height))
+        return variants
+
+    # Without Pillow, each variant is scaled down from the next larger one, which is much cheaper
+    # than starting from the full-size image every time.
+    image = read_png(source)
+    for width, output in sorted(outputs, reverse=True):
+        tmp = output.with_name(f".{output.name}.{os.getpid()}.tmp")
+        image = resize_png(image, width)
+        write_png(tmp, image)
+        os.replace(tmp, output)
+        variants.append((width, image.height))
+    return sorted(variants)
+
+def process_image(source: Path, digest: str, cache_dir: Path, widths: Sequence[int]) -> Tuple[str, Optional[Tuple[int, int]], List[Variant]]:
+    # Runs in a worker process. Variants go to the cache directory under the source hash, so an image
+    # moved or copied elsewhere in the site is not resized again.
+    size = image_size(source)
+    if size is None or (Image is None and source.suffix.lower() != ".png"):
+        return digest, size, []
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # Variants already in the cache only have their size read, so the source is decoded for the missing ones alone.
+    variants: List[Variant] = []
+    missing: List[Tuple[int, Path]] = []
+    for width in sorted(set(widths)):
+        if width < size[0]:
+            output = cache_dir / variant_name(digest, width, source.suffix.lower())
+            cached = image_size(output) if output.exists() else None
+            if cached is None:
+                missing.append((width, output))
+            else:
+                variants.append(cached)
+    if len(missing) == 0:
+        return digest, size, variants
+
+    try:
+        return digest, size, sorted([*variants, *_resize(source, missing)])
+    except ValueError:
+        # Formats the pure-Python decoder does not handle, and corrupt files, keep their dimensions but get no variants.
+        return digest, size, []
+
+class ImageInfo:
+    __slots__ = ("width", "height", "variants")
+
+    def __init__(self, width: int, height: int, variants: List[Tuple[str, int]]):
+        self.width = width
+        self.height = height
+        # (URL, width) of every resized variant, smallest first.
+        self.variants = variants
+
+    def attributes(self, url: str) -> Dict[str, str]:
+        # Width and height reserve the image's space before it loads, so the page does not shift.
+        attributes = {"width": str(self.width), "height": str(self.height), "loading": "lazy", "decoding": "async"}
+        if len(self.variants) > 0:
+            attributes["srcset"] = ", ".join(f"{variant} {width}w" for variant, width in [*self.variants, (url, self.width)])
+            attributes["sizes"] = f"(max-width: {self.width}px) 100vw, {self.width}px"
+        return attributes
+
+    def __eq__(self, other):
+        if not isinstance(other, ImageInfo):
+            return NotImplemented
+        return (self.width, self.height, self.variants) == (other.width, other.height, other.variants)
+
+    def __repr__(self) -> str:
+        return f'ImageInfo({self.width}x{self.height}, {self.variants})'
+
+# Images of the site by root-relative URL. Image nodes look up their attributes in the registry in
+# src.urls, so creating nodes does not depend on this module.
+_images: Dict[str, ImageInfo] = {}
+
+def use_images(images: Dict[str, ImageInfo]) -> None:
+    global _images
+    _images = dict(images)
+    use_image_attributes({url: info.attributes(url) for url, info in _images.items()})
+
+def get_images() -> Dict[str, ImageInfo]:
+    return _images
+
+class ImageStats:
+    def __init__(self):
+        self.hashed = 0
+        self.processed = 0
+        self.reused = 0
+        self.written = 0
+        self.removed = 0
+
+    def __str__(self) -> str:
+        return (
+            f"Images: processed {self.processed}, reused {self.reused} ({self.hashed} hashed), "
+            f"wrote {self.written} variants, removed {self.removed}"
+        )
+
+class ImageStore:
+    # Dimensions and resized variants of the static images. Sources are keyed by their path relative
+    # to the static directory and hashed again only when their size or mtime changed; results are
+    # keyed by that hash, so an image is only ever processed once.
+    def __init__(self, path: Optional[Path] = None, cache_dir: Optional[Path] = None, widths: Sequence[int] = VARIANT_WIDTHS):
+        self.path = path
+        self.cache_dir = cache_dir if cache_dir is not None else Path(".cache") / "images"
+        self.widths = tuple(widths)
+        # relative path -> [size, mtime_ns, hash]
+        self.sources: Dict[str, List] = {}
+        # hash -> {"size": [width, height], "variants": [[width, height], ...]}
+        self.results: Dict[str, Dict] = {}
+        # Variant outputs published by the last build, relative to the output directory.
+        self.outputs: List[str] = []
+        self.stats = ImageStats()
+        self.dirty = False
+
+    @staticmethod
+    def load(path: Path, cache_dir: Optional[Path] = None, widths: Sequence[int] = VARIANT_WIDTHS) -> ImageStore:
+        store = ImageStore(path, cache_dir, widths)
+        if not path.exists():
+            return store
+
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return store
+
+        # Results for other variant widths are of no use; sources are still worth their hashes.
+        if data.get("version") == IMAGES_VERSION:
+            store.sources = data.get("sources", {})
+            store.outputs = data.get("outputs", [])
+            if data.get("widths") == list(store.widths):
+                store.results = data.get("results", {})
+
+        return store
+
+    def save(self) -> None:
+        if self.path is None or not self.dirty:
+            return
+
+        data = {
+            "version": IMAGES_VERSION,
+            "widths": list(self.widths),
+            "sources": dict(sorted(self.sources.items())),
+            "results": dict(sorted(self.results.items())),
+            "outputs": sorted(self.outputs),
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(data, indent=1))
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def __scan(self, static_dir: Path) -> Dict[str, Path]:
+        images: Dict[str, Path] = {}
+        for dirpath, _, filenames in os.walk(static_dir):
+            for filename in filenames:
+                source = Path(dirpath) / filename
+                if source.suffix.lower() in IMAGE_SUFFIXES:
+                    images[source.relative_to(static_dir).as_posix()] = source
+        return images
+
+    def __hash(self, key: str, source: Path) -> str:
+        stat = source.stat()
+        recorded = self.sources.get(key)
+        if recorded is not None and recorded[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return recorded[2]
+
+        digest = hash_file(source)
+        self.stats.hashed += 1
+        self.sources[key] = [stat.st_size, stat.st_mtime_ns, digest]
+        self.dirty = True
+        return digest
+
+    def __variants_cached(self, digest: str, suffix: str) -> bool:
+        result = self.results.get(digest)
+        return result is not None and all((self.cache_dir / variant_name(digest, width, suffix)).exists() for width, _ in result["variants"])
+
+    def update(self, static_dir: Path, jobs: int = 1) -> None:
+        if not static_dir.exists():
+            raise FileNotFoundError(f"Static directory not found: {static_dir}")
+
+        images = self.__scan(static_dir)
+        pending: Dict[str, Path] = {}
+        for key, source in sorted(images.items()):
+            digest = self.__hash(key, source)
+            if self.__variants_cached(digest, source.suffix.lower()):
+                self.stats.reused += 1
+            else:
+                pending.setdefault(digest, source)
+
+        if len(pending) > 0:
+            arguments = [(source, digest, self.cache_dir, self.widths) for digest, source in pending.items()]
+            if jobs > 1 and len(pending) > 1:
+                with ProcessPoolExecutor(max_workers=min(jobs, len(pending))) as pool:
+                    results = list(pool.map(process_image, *zip(*arguments)))
+            else:
+                results = [process_image(*argument) for argument in arguments]
+
+            for digest, size, variants in results:
+                self.results[digest] = {"size": None if size is None else list(size), "variants": [list(variant) for variant in variants]}
+                self.stats.processed += 1
+            self.dirty = True
+
+        for key in [key for key in self.sources if key not in images]:
+            del self.sources[key]
+            self.dirty = True
+
+        # Results and cached variants of images that are gone from the site.
+        live = {recorded[2] for recorded in self.sources.values()}
+        for digest in [digest for digest in self.results if digest not in live]:
+            for stale in self.cache_dir.glob(f"{digest}-*"):
+                stale.unlink()
+            del self.results[digest]
+            self.dirty = True
+
+    def infos(self) -> Dict[str, ImageInfo]:
+        infos: Dict[str, ImageInfo] = {}
+        for key, (_, _, digest) in sorted(self.sources.items()):
+            result = self.results.get(digest)
+            if result is None or result["size"] is None:
+                continue
+            variants = [(f"/{variant_path(key, digest, width)}", width) for width, _ in result["variants"]]
+            infos[f"/{key}"] = ImageInfo(result["size"][0], result["size"][1], variants)
+        return infos
+
+    def hash(self) -> str:
+        return hash_text(json.dumps({url: [info.width, info.height, info.variants] for url, info in self.infos().items()}))
+
+    def publish(self, dst_dir: Path, hardlink: bool = True) -> None:
+        # Variants are linked or copied from the cache; being named by content, existing ones are current.
+        published: Set[str] = set()
+        for key, (_, _, digest) in sorted(self.sources.items()):
+            result = self.results.get(digest)
+            if result is None:
+                continue
+            suffix = Path(key).suffix.lower()
+            for width, _ in result["variants"]:
+                relative_path = variant_path(key, digest, width)
+                published.add(relative_path)
+                output = dst_dir / relative_path
+                if output.exists():
+                    continue
+                output.parent.mkdir(parents=True, exist_ok=True)
+                link_or_copy(self.cache_dir / variant_name(digest, width, suffix), output, hardlink)
+                record_change(output)
+                self.stats.written += 1
+
+        stale = [dst_dir / relative_path for relative_path in self.outputs if relative_path not in published]
+        remove_outputs(stale, dst_dir)
+        self.stats.removed += len(stale)
+        if sorted(published) != sorted(self.outputs):
+            self.outputs = sorted(published)
+            self.dirty = True
+
+    def unpublish(self, dst_dir: Path) -> None:
+        # With the image stage turned off, the variants it published are removed; the cache stays.
+        remove_outputs([dst_dir / relative_path for relative_path in self.outputs], dst_dir)
+        self.stats.removed += len(self.outputs)
+        self.dirty = self.dirty or len(self.outputs) > 0
+        self.outputs = []
+
+    def __repr__(self) -> str:
+        return f'ImageStore({self.path}, {len(self.sources)}, {len(self.results)})'
@@ -0,0 +1,149 @@
+from __future__ import annotations
+import json
+import math
+import re
+from pathlib import Path
+from string import Template
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from src.front_matter import PageMeta
+from src.htmlnode import HTMLNode, LeafNode, ParentNode
+from src.manifest import BuildManifest, hash_text, remove_outputs
+from src.page_index import PageIndex
+from src.page_templates import TemplateSet
+
+LISTING_SECTION = "blog"
+TAGS_ROOT = "tags"
+ARCHIVE_ROOT = "archive"
+PAGE_SIZE = 10
+
+Post = Tuple[str, PageMeta]
+WritePage = Callable[[Path, str, HTMLNode, Template], None]
+
+def page_url(relative_path: str) -> str:
+    # content/blog/tom/index.md is served as /blog/tom/, content/contact.md as /contact.html.
+    if relative_path == "index.md" or relative_path.endswith("/index.md"):
+        return "/" + relative_path[:-len("index.md")]
+    return "/" + relative_path[:-len(".md")] + ".html"
+
+def slugify(text: str) -> str:
+    return re.sub(r'[^a-z0-9]+', "-", text.lower()).strip("-") or "-"
+
+def tag_slugs(tags: Iterable[str]) -> Dict[str, str]:
+    # Tags with the same slug ("C" and "C++") are numbered in tag order, so no listing overwrites another.
+    slugs: Dict[str, str] = {}
+    used = set()
+    for tag in sorted(tags):
+        slug = base = slugify(tag)
+        number = 2
+        while slug in used:
+            slug = f"{base}-{number}"
+            number += 1
+        used.add(slug)
+        slugs[tag] = slug
+
+    return slugs
+
+class ListingPage:
+    # One page of a paginated listing. root is the listing's directory relative to the output
+    # ("blog", "tags/python"); page 1 is root/index.html and page n is root/page/n/index.html.
+    __slots__ = ("title", "root", "posts", "number", "count")
+
+    def __init__(self, title: str, root: str, posts: Sequence[Post], number: int, count: int):
+        self.title = title
+        self.root = root
+        self.posts = posts
+        self.number = number
+        self.count = count
+
+    def url(self, number: int) -> str:
+        return f"/{self.root}/" if number == 1 else f"/{self.root}/page/{number}/"
+
+    @property
+    def output(self) -> str:
+        return self.url(self.number)[1:] + "index.html"
+
+    @property
+    def page_title(self) -> str:
+        return self.title if self.number == 1 else f"{self.title} (page {self.number} of {self.count})"
+
+    def signature(self) -> str:
+        # Everything the rendered page depends on, so unchanged pages can be skipped.
+        posts = [[page_url(key), meta.title, meta.date] for key, meta in self.posts]
+        return hash_text(json.dumps([self.title, self.number, self.count, posts]))
+
+    def to_html_node(self) -> ParentNode:
+        items: List[HTMLNode] = []
+        for key, meta in self.posts:
+            children: List[HTMLNode] = [LeafNode(tag="a", value=meta.title or key, props={"href": page_url(key)})]
+            if meta.date is not None:
+                children.append(LeafNode(tag="time", value=meta.date[:10], props={"datetime": meta.date}))
+            items.append(ParentNode("li", children))
+
+        children: List[HTMLNode] = [LeafNode(tag="h1", value=self.page_title), ParentNode("ul", items)]
+        links: List[HTMLNode] = []
+        if self.number > 1:
+            links.append(LeafNode(tag="a", value="Newer posts", props={"href": self.url(self.number - 1), "rel": "prev"}))
+        if self.number < self.count:
+            links.append(LeafNode(tag="a", value="Older posts", props={"href": self.url(self.number + 1), "rel": "next"}))
+        if len(links) > 0:
+            children.append(ParentNode("nav", links))
+
+        return ParentNode("div", children)
+
+    def __repr__(self) -> str:
+        return f'ListingPage({self.root}, {self.number}/{self.count}, {len(self.posts)})'
+
+def paginate(title: str, root: str, posts: Sequence[Post], page_size: int) -> List[ListingPage]:
+    count = max(1, math.ceil(len(posts) / page_size))
+    return [ListingPage(title, root, posts[(number - 1) * page_size:number * page_size], number, count) for number in range(1, count + 1)]
+
+def collect_listings(index: PageIndex, section: str = LISTING_SECTION, page_size: int = PAGE_SIZE, drafts: bool = False) -> List[ListingPage]:
+    # Built from the page index alone: posts are the pages below the section, newest first.
+    posts = [(key, meta) for key, meta in index.pages(drafts) if key.startswith(f"{section}/") and key != f"{section}/index.md"]
+    if len(posts) == 0:
+        return []
+
+    tags: Dict[str, List[Post]] = {}
+    years: Dict[str, List[Post]] = {}
+    for post in posts:
+        for tag in post[1].tags:
+            tags.setdefault(tag, []).append(post)
+        if post[1].date is not None:
+            years.setdefault(post[1].date[:4], []).append(post)
+
+    listings = paginate(section.capitalize(), section, posts, page_size)
+    slugs = tag_slugs(tags)
+    for tag, tagged in sorted(tags.items()):
+        listings.extend(paginate(f"Posts tagged {tag}", f"{TAGS_ROOT}/{slugs[tag]}", tagged, page_size))
+    for year, dated in sorted(years.items(), reverse=True):
+        listings.extend(paginate(f"Posts from {year}", f"{ARCHIVE_ROOT}/{year}", dated, page_size))
+
+    return listings
+
+def build_listings(content_dir: Path, dst_dir: Path, index: PageIndex, write_page: WritePage, template: Template, manifest: Optional[BuildManifest] = None, templates: Optional[TemplateSet] = None, section: str = LISTING_SECTION, page_size: int = PAGE_SIZE, drafts: bool = False) -> List[Path]:
+    # Only listing pages whose signature changed are written again, so editing one post rewrites
+    # the few pages that list it instead of every listing of the site.
+    signatures: Dict[str, str] = {}
+    written: List[Path] = []
+
+    for listing in collect_listings(index, section, page_size, drafts):
+        # A content page with the same output (content/blog/index.md) takes precedence.
+        if index.get(Path(listing.output).with_suffix(".md")) is not None:
+            continue
+
+        signature = listing.signature()
+        signatures[listing.output] = signature
+        output_file = dst_dir / listing.output
+        if manifest is not None and manifest.listings.get(listing.output) == signature and output_file.exists():
+            continue
+
+        # Listings pick their template like a page in their directory would.
+        listing_template = template if templates is None else templates.select(content_dir / listing.output)
+        write_page(output_file, listing.page_title, listing.to_html_node(), listing_template)
+        written.append(output_file)
+
+    if manifest is not None:
+        remove_outputs([dst_dir / output for output in manifest.listings if output not in signatures], dst_dir)
+        manifest.listings = signatures
+
+    return written
@@ -1,54 +1,402 @@
+import argparse
+import itertools
+import os
 import shutil
+import time
+from functools import partial
 from pathlib import Path
+from src.front_matter import PageMeta, page_title, read_front_matter, split_front_matter
+from src.htmlnode import HTMLNode
+from src.images import VARIANT_WIDTHS, ImageStore, use_images
+from src.manifest import BuildManifest, hash_text, remove_outputs
+from src.minify import asset_transforms, minified, minify_enabled, use_minify
+from src.feeds import ATOM_FILE, RSS_FILE, write_feeds
+from src.compress import MAX_RATIO, CompressionStore
+from src.fingerprint import AssetFingerprints
+from src.listings import PAGE_SIZE, build_listings
+from src.outputs import AtomicOutput, PageBuffer, drain_changes, write_bytes_if_changed
+from src.page_index import PageIndex
+from src.page_templates import TemplateSet, compile_template
+from src.parallel import WorkerReport, render_parallel, resolve_jobs
 from src.parsers.markdown import MarkdownParser
+from src.pipeline import BuildPipeline, PipelineStats
+from src.profiler import NULL_PROFILER, BuildProfiler, Profiler
+from src.render_cache import RenderCache, fragment_sources_hash
+from src.sitemap import sitemap_entries, write_sitemaps
+from src.static_sync import sync_static
+from src.urls import use_assets, use_base_path, using_base_path
+from src.watch import Change, ChangeType, PollingWatcher
 from string import Template
-import sys
-
-HTML_TEMPLATE = Template("""
-<!doctype html>
-<html>
-  <head>
-    <meta charset='utf-8' />
-    <meta name='viewport' content='width=device-width, initial-scale=1' />
-    <title>$title</title>
-    <link href='/index.css' rel='stylesheet' />
-  </head>
-  <body>
-    <article>$content</article>
-  </body>
-</html>
-""")
-
-def generate_html_file(src_file: Path, dst_file: Path, parser: MarkdownParser, base_path: str) -> None:
-    content = src_file.read_text()
-    first_line = content.splitlines()[0]
-    title = first_line.lstrip("#").strip()
-    html_content = parser.markdown_to_html_code(content).to_html()
-    
-    dst_file.parent.mkdir(parents=True, exist_ok=True)
-    file_content = HTML_TEMPLATE.substitute(title=title, content=html_content)
-    file_content =  file_content.replace("href='/", f"href='{base_path}")
-    file_content =  file_content.replace("src='/", f"src='{base_path}")
-
-    dst_file.write_text(file_content)
-
-def copy_static_files(src: Path, dst: Path) -> None:
-    if not src.exists():
-        raise FileNotFoundError(f"Static directory not found: {src}")
-    shutil.copytree(src, dst, dirs_exist_ok=True)
-
-
-def build_content(src_dir: Path, dst_dir: Path, parser: MarkdownParser, base_path: str) -> None:
+from typing import Callable, Iterable, List, Optional, TextIO, Tuple, Union
+
+
+CACHE_DIR = Path(".cache")
+MANIFEST_PATH = CACHE_DIR / "build-manifest.json"
+PROFILE_PATH = CACHE_DIR / "build-profile.json"
+PAGE_INDEX_PATH = CACHE_DIR / "page-index.json"
+CHANGED_FILES_PATH = CACHE_DIR / "changed-files.txt"
+FINGERPRINTS_PATH = CACHE_DIR / "asset-fingerprints.json"
+IMAGES_PATH = CACHE_DIR / "images.json"
+IMAGE_CACHE_DIR = CACHE_DIR / "images"
+COMPRESSION_PATH = CACHE_DIR / "compression.json"
+RENDER_CACHE_PATH = CACHE_DIR / "render-cache.sqlite"
+
+# The built-in page template. It is also the root template of the default templates/ directory.
+TEMPLATE_SOURCE = Path(__file__).resolve().parent.parent / "templates" / "default.html"
+
+# Sources at least this large are parsed and written block by block instead of being read whole.
+STREAM_THRESHOLD = 16 * 1024 * 1024
+
+def read_html_template(source: Path) -> Template:
+    return Template(source.read_text())
+
+HTML_TEMPLATE = read_html_template(TEMPLATE_SOURCE)
+
+def page_template(source: Path, meta: PageMeta, template: Template, templates: Optional[TemplateSet]) -> Template:
+    # A template named in the front matter wins over the page's section template.
+    if templates is None:
+        return template
+    return templates.select(source, meta.template)
+
+def write_page(sink: TextIO, title: str, html_node: HTMLNode, base_path: str, template: Template = HTML_TEMPLATE, profiler: Profiler = NULL_PROFILER) -> None:
+    write_document(sink, title, html_node.render, base_path, template, profiler)
+
+def write_document(sink: TextIO, title: str, render_body: Callable[[Callable[[str], object]], None], base_path: str, template: Template = HTML_TEMPLATE, profiler: Profiler = NULL_PROFILER) -> None:
+    # The template is compiled once per base path into static chunks and slots, and the page body is
+    # streamed into its content slot chunk by chunk instead of being substituted in as one large string.
+    compiled = profiler.call("template", compile_template, template.template, base_path, template.pattern)
+
+    # Links and images in the body resolve their URLs against the base path as they are rendered, and
+    # with --minify the chunks are minified on their way to the sink.
+    with using_base_path(base_path), minified(sink) as output:
+        write = profiler.wrap("write", output.write)
+        profiler.start()
+        compiled.render(write, {"title": title}, render_body)
+        profiler.stop("render")
+
+def write_listing(output_file: Path, title: str, html_node: HTMLNode, template: Template, base_path: str) -> None:
+    sink = PageBuffer()
+    write_page(sink, title, html_node, base_path, template)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    write_bytes_if_changed(output_file, sink.getvalue())
+
+def render_markdown_page(sink: TextIO, content: str, parser: MarkdownParser, base_path: str, template: Template = HTML_TEMPLATE, title: Optional[str] = None) -> None:
+    if title is None:
+        title = page_title(content)
+    html_node = parser.markdown_to_html_code(content)
+    parser.profiler.count_nodes(html_node)
+
+    write_page(sink, title, html_node, base_path, template, parser.profiler)
+
+def render_markdown_stream(sink: TextIO, lines: Iterable[str], parser: MarkdownParser, base_path: str, title: str, template: Template = HTML_TEMPLATE) -> None:
+    # Lines are read, parsed into blocks and written out as they come, so memory use is bounded by
+    # the largest block rather than by the size of the page.
+    profiler = parser.profiler
+    html_nodes = parser.blocks_to_html_nodes(parser.iter_line_blocks(lines))
+
+    def render_body(write: Callable[[str], object]) -> None:
+        # The same wrapper markdown_to_html_code puts around the blocks.
+        write("<div>")
+        for html_node in html_nodes:
+            profiler.count_nodes(html_node)
+            html_node.render(write)
+        write("</div>")
+
+    write_document(sink, title, render_body, base_path, template, profiler)
+
+def generate_html_file(src_file: Path, dst_file: Path, parser: MarkdownParser, base_path: str, template: Template = HTML_TEMPLATE, stream_threshold: int = STREAM_THRESHOLD, templates: Optional[TemplateSet] = None) -> bool:
+    # Returns whether the output changed; identical outputs are not written again.
+    # Cached blocks are rendered while parsing, so the base path is in place before the page is parsed.
+    with using_base_path(base_path):
+        profiler = parser.profiler
+        profiler.begin_page(src_file)
+
+        if src_file.stat().st_size >= stream_threshold:
+            with src_file.open() as source:
+                meta, first_line = read_front_matter(source)
+                template = page_template(src_file, meta, template, templates)
+                dst_file.parent.mkdir(parents=True, exist_ok=True)
+                output = AtomicOutput(dst_file)
+                with output as sink:
+                    render_markdown_stream(sink, itertools.chain((first_line,), source), parser, base_path, meta.title, template)
+            profiler.end_page()
+            return output.changed
+
+        content = profiler.call("read", src_file.read_text)
+        meta, body = profiler.call("front_matter", split_front_matter, content)
+        template = page_template(src_file, meta, template, templates)
+
+        sink = PageBuffer()
+        render_markdown_page(sink, body, parser, base_path, template, meta.title)
+
+        profiler.start()
+        dst_file.parent.mkdir(parents=True, exist_ok=True)
+        profiler.stop("open")
+        changed = profiler.call("write", write_bytes_if_changed, dst_file, sink.getvalue())
+        profiler.end_page()
+
+    return changed
+
+def render_html_source(src_file: Path, content: str, parser: MarkdownParser, base_path: str, template: Template = HTML_TEMPLATE, templates: Optional[TemplateSet] = None) -> bytes:
+    # The render stage of the pipelined build: sources arrive already read and the page is handed
+    # over to the writer thread as encoded bytes.
+    with using_base_path(base_path):
+        profiler = parser.profiler
+        profiler.begin_page(src_file)
+        meta, body = profiler.call("front_matter", split_front_matter, content)
+        sink = PageBuffer()
+        render_markdown_page(sink, body, parser, base_path, page_template(src_file, meta, template, templates), meta.title)
+        profiler.end_page()
+
+    return sink.getvalue()
+
+def build_content(src_dir: Path, dst_dir: Path, parser: MarkdownParser, base_path: str, manifest: Optional[BuildManifest] = None, jobs: int = 1, template: Template = HTML_TEMPLATE, templates: Optional[TemplateSet] = None, index: Optional[PageIndex] = None, drafts: bool = False, pipeline: bool = False) -> Tuple[List[Path], Optional[Union[WorkerReport, PipelineStats]]]:
+    pages = []
+    sources = []
+    indexed = []
+    if index is None:
+        index = PageIndex()
+
     for md_file in src_dir.rglob("*.md"):
         relative_path = md_file.relative_to(src_dir)
         output_file = (dst_dir / relative_path).with_suffix(".html")
-        generate_html_file(md_file, output_file, parser, base_path)
+        indexed.append(relative_path)
+
+        # Drafts stay in the index but are not published, so their earlier outputs get pruned.
+        if index.update(md_file, relative_path).draft and not drafts:
+            continue
+        sources.append(relative_path)
+
+        if manifest is not None and not manifest.needs_render(md_file, relative_path, output_file):
+            continue
+
+        pages.append((md_file, output_file))
+
+    report = None
+    if jobs > 1 and len(pages) > 1:
+        start = time.perf_counter()
+        profiler = parser.profiler if isinstance(parser.profiler, BuildProfiler) else None
+        stats = render_parallel(pages, partial(generate_html_file, base_path=base_path, template=template, templates=templates), jobs, profiler=profiler, cache=parser.cache)
+        report = WorkerReport(stats, time.perf_counter() - start)
+    elif pipeline and len(pages) > 1:
+        render_source = partial(render_html_source, parser=parser, base_path=base_path, template=template, templates=templates)
+        render_file = partial(generate_html_file, parser=parser, base_path=base_path, template=template, templates=templates)
+        report = BuildPipeline(render_source, render_file, STREAM_THRESHOLD).run(pages)
+    else:
+        for md_file, output_file in pages:
+            generate_html_file(md_file, output_file, parser, base_path, template, templates=templates)
+
+    if manifest is not None:
+        for md_file, output_file in pages:
+            manifest.record(md_file, md_file.relative_to(src_dir), output_file)
+        remove_outputs(manifest.prune(sources), dst_dir)
+    index.prune(indexed)
+
+    return [output_file for _, output_file in pages], report
+
+
+def write_site_files(target_dir: Path, site_url: str, index: PageIndex, manifest: BuildManifest, drafts: bool = False, author: Optional[str] = None) -> List[Path]:
+    # The sitemap and feeds are written from the page index and the manifest's listings, both
+    # already in memory after a build, instead of walking the output directory.
+    home = index.get(Path("index.md"))
+    title = home.title if home is not None and home.title else site_url
+    written = write_sitemaps(target_dir, site_url, sitemap_entries(index, manifest.listings, drafts), previous=manifest.sitemaps)
+    manifest.sitemaps = [path.relative_to(target_dir).as_posix() for path in written]
+    written.extend(write_feeds(target_dir, site_url, title, index, drafts=drafts, author=author))
+
+    return written
 
 
-def main() -> None:
-    base_path = '/'
-    if len(sys.argv) >= 1:
-        base_path = sys.argv[1]
+def remove_site_files(target_dir: Path, manifest: BuildManifest) -> None:
+    # The sitemap and feeds of an earlier build with --site-url; feeds are written whenever sitemaps are.
+    remove_outputs([target_dir / name for name in [*manifest.sitemaps, ATOM_FILE, RSS_FILE]], target_dir)
+    manifest.sitemaps = []
+
+
+def save_changed_files(target_dir: Path, path: Path = CHANGED_FILES_PATH) -> int:
+    # Outputs created or replaced by the last build, one per line relative to the output directory,
+    # so a deploy only has to upload those.
+    changed = sorted({output.relative_to(target_dir).as_posix() for output in drain_changes()})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text("".join(f"{output}\n" for output in changed))
+    os.replace(tmp_path, path)
+    return len(changed)
+
+
+def asset_stages_key(fingerprints: Optional[AssetFingerprints] = None, images: Optional[ImageStore] = None) -> str:
+    return "".join(f"\x00{stage.hash()}" for stage in (fingerprints, images) if stage is not None)
+
+
+def outputs_hash(template_hash: str, fingerprints: Optional[AssetFingerprints] = None, images: Optional[ImageStore] = None) -> str:
+    # Pages link to the fingerprinted names of assets and describe their images, so they depend on
+    # the asset stages like on their templates.
+    # Minified pages differ from the plain ones too.
+    key = asset_stages_key(fingerprints, images) + ("\x00minify" if minify_enabled() else "")
+    return template_hash if not key else hash_text(f"{template_hash}{key}")
+
+
+def cache_namespace(base_path: str, fingerprints: Optional[AssetFingerprints] = None, images: Optional[ImageStore] = None, single_pass: bool = True) -> str:
+    # Cached fragments have their URLs resolved already, so they are only valid for one base path and asset map,
+    # and the two inline parsers do not render every block the same way.
+    mode = "single-pass" if single_pass else "multi-pass"
+    return hash_text(f"{fragment_sources_hash()}\x00{base_path}{asset_stages_key(fingerprints, images)}\x00{mode}")
+
+
+def write_fingerprints(fingerprints: AssetFingerprints, static_dir: Path, target_dir: Path, hardlink: bool = True) -> None:
+    fingerprints.write_copies(static_dir, target_dir, hardlink, asset_transforms())
+    fingerprints.write_manifest(target_dir)
+    fingerprints.save()
+
+
+def rebuild_changes(changes: List[Change], static_dir: Path, content_dir: Path, target_dir: Path, parser: MarkdownParser, manifest: BuildManifest, template: Template, template_source: Path = TEMPLATE_SOURCE, hardlink: bool = True, templates: Optional[TemplateSet] = None, index: Optional[PageIndex] = None, drafts: bool = False, page_size: int = PAGE_SIZE, fingerprints: Optional[AssetFingerprints] = None, images: Optional[ImageStore] = None) -> Tuple[List[Path], Template]:
+    rebuilt: List[Path] = []
+    templates_changed = False
+    content_changed = any(change.root == content_dir for change in changes)
+    # Listings need the metadata of every page, so they are only regenerated from a complete index.
+    listings = index is not None and page_size > 0
+    if index is None:
+        index = PageIndex()
+
+    if any(change.root == template_source for change in changes):
+        new_template = read_html_template(template_source)
+        if new_template.template != template.template:
+            template = new_template
+            templates_changed = True
+            if templates is not None:
+                templates.set_default(template)
+
+    if templates is not None and any(change.root == templates.directory for change in changes):
+        templates.reload()
+        templates_changed = True
+
+    static_changes = [change for change in changes if change.root == static_dir]
+    if len(static_changes) > 0 and (fingerprints is not None or images is not None):
+        previous = asset_stages_key(fingerprints, images)
+        if fingerprints is not None:
+            fingerprints.update(static_dir)
+            use_assets(fingerprints.urls())
+        if images is not None:
+            images.update(static_dir)
+            use_images(images.infos())
+        if asset_stages_key(fingerprints, images) != previous:
+            # Every page links to the new names and sizes, like after a template change.
+            if parser.cache is not None:
+                parser.cache.use_namespace(cache_namespace(manifest.base_path, fingerprints, images, parser.single_pass))
+            templates_changed = True
+
+    if templates_changed:
+        manifest.template_hash = outputs_hash(hash_text(template.template) if templates is None else templates.hash(), fingerprints, images)
+        manifest.invalidate()
+        rebuilt.extend(build_content(content_dir, target_dir, parser, manifest.base_path, manifest, template=template, templates=templates, index=index, drafts=drafts)[0])
+        changes = [change for change in changes if change.root != content_dir]
+
+    if len(static_changes) > 0:
+        # Syncing only stats unchanged assets, and it also drops outputs of removed ones.
+        sync_static(static_dir, target_dir, manifest.assets, hardlink=hardlink, transforms=asset_transforms())
+        if fingerprints is not None:
+            write_fingerprints(fingerprints, static_dir, target_dir, hardlink)
+        if images is not None:
+            images.publish(target_dir, hardlink)
+            images.save()
+        rebuilt.extend(target_dir / change.path.relative_to(static_dir) for change in static_changes)
+
+    for change in changes:
+        if change.root == content_dir and change.path.suffix == ".md":
+            relative_path = change.path.relative_to(content_dir)
+            output_file = (target_dir / relative_path).with_suffix(".html")
+            if change.change_type == ChangeType.REMOVED:
+                index.forget(relative_path)
+                published = False
+            else:
+                published = drafts or not index.update(change.path, relative_path).draft
+
+            if published:
+                generate_html_file(change.path, output_file, parser, manifest.base_path, template, templates=templates)
+                manifest.record(change.path, relative_path, output_file)
+            else:
+                manifest.forget(relative_path)
+                remove_outputs([output_file], target_dir)
+            rebuilt.append(output_file)
+
+    if listings and (content_changed or templates_changed):
+        write = partial(write_listing, base_path=manifest.base_path)
+        rebuilt.extend(build_listings(content_dir, target_dir, index, write, template, manifest, templates, page_size=page_size, drafts=drafts))
+
+    return rebuilt, template
+
+
+def watch(static_dir: Path, content_dir: Path, target_dir: Path, parser: MarkdownParser, manifest: BuildManifest, interval: float, hardlink: bool = True, templates: Optional[TemplateSet] = None, index: Optional[PageIndex] = None, drafts: bool = False, page_size: int = PAGE_SIZE, site_url: Optional[str] = None, fingerprints: Optional[AssetFingerprints] = None, images: Optional[ImageStore] = None, compression: Optional[CompressionStore] = None, site_author: Optional[str] = None) -> None:
+    template = HTML_TEMPLATE
+    roots = [content_dir, static_dir, TEMPLATE_SOURCE]
+    if templates is not None and templates.directory is not None:
+        # Watched even while it does not exist, so a templates/ directory created later is picked up.
+        roots.append(templates.directory)
+    watcher = PollingWatcher(roots)
+    print(f"Watching {', '.join(f'{root}/' if root.suffix == '' else root.name for root in roots)} for changes (Ctrl+C to stop)")
+
+    try:
+        while True:
+            time.sleep(interval)
+            changes = watcher.poll()
+            if len(changes) == 0:
+                continue
+
+            start = time.perf_counter()
+            try:
+                rebuilt, template = rebuild_changes(changes, static_dir, content_dir, target_dir, parser, manifest, template, hardlink=hardlink, templates=templates, index=index, drafts=drafts, page_size=page_size, fingerprints=fingerprints, images=images)
+            except Exception as error:
+                print(f"Rebuild failed: {error}")
+                continue
+
+            if site_url is not None and index is not None and any(change.root != static_dir for change in changes):
+                rebuilt.extend(write_site_files(target_dir, site_url, index, manifest, drafts, site_author))
+            if compression is not None:
+                compression.update(target_dir)
+                compression.save()
+            manifest.save()
+            if index is not None:
+                index.save()
+            changed = save_changed_files(target_dir)
+            print(f"Rebuilt {len(rebuilt)} files ({changed} changed) in {(time.perf_counter() - start) * 1000:.0f}ms")
+    except KeyboardInterrupt:
+        pass
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    arg_parser = argparse.ArgumentParser(prog="python3 -m src.main")
+    arg_parser.add_argument("base_path", nargs="?", default="/")
+    arg_parser.add_argument("--incremental", action="store_true", help="only re-render pages whose sources changed since the last build")
+    arg_parser.add_argument("-j", "--jobs", type=int, default=1, help="number of worker processes used to render pages (0 uses every core)")
+    arg_parser.add_argument("--pipeline", action="store_true", help="read sources and write pages on background threads while rendering (ignored with --jobs)")
+    arg_parser.add_argument("--fingerprint", action="store_true", help="also write static assets under content-hashed names (index.<hash>.css) and link pages to those")
+    arg_parser.add_argument("--images", action="store_true", help="give images their dimensions, resized srcset variants and lazy loading")
+    arg_parser.add_argument("--image-widths", type=int, nargs="+", default=list(VARIANT_WIDTHS), help="widths of the resized image variants in pixels")
+    arg_parser.add_argument("--image-jobs", type=int, default=0, help="number of worker processes used to resize images (0 uses every core)")
+    arg_parser.add_argument("--minify", action="store_true", help="collapse whitespace in pages (keeping <pre> blocks as they are) and minify CSS assets")
+    arg_parser.add_argument("--compress", action="store_true", help="write precompressed .gz (and .br with the brotli module) sidecars of HTML, CSS, JS and SVG outputs")
+    arg_parser.add_argument("--compress-jobs", type=int, default=0, help="number of worker processes used to compress outputs (0 uses every core)")
+    arg_parser.add_argument("--compress-max-ratio", type=float, default=MAX_RATIO, help="largest compressed to original size ratio for which a sidecar is kept (1 keeps every sidecar)")
+    arg_parser.add_argument("--checksum", action="store_true", help="compare static assets by content hash, not just size and mtime")
+    arg_parser.add_argument("--no-hardlinks", dest="hardlink", action="store_false", help="copy static assets instead of hardlinking them into the output")
+    arg_parser.add_argument("--watch", action="store_true", help="keep running and rebuild changed pages and assets")
+    arg_parser.add_argument("--interval", type=float, default=0.1, help="polling interval of --watch in seconds")
+    arg_parser.add_argument("--drafts", action="store_true", help="also publish pages marked draft in their front matter")
+    arg_parser.add_argument("--page-size", type=int, default=PAGE_SIZE, help="posts per page of the generated blog, tag and archive listings (0 disables them)")
+    arg_parser.add_argument("--site-url", help="absolute URL of the site (https://example.com), enables sitemap.xml, atom.xml and rss.xml")
+    arg_parser.add_argument("--site-author", help="author named in atom.xml (defaults to the site title)")
+    arg_parser.add_argument("--templates", type=Path, default=Path("templates"), help="directory of per-section page templates")
+    arg_parser.add_argument("--cache-size", type=int, default=0, help="number of rendered Markdown blocks kept in memory for reuse, for sites that repeat blocks across pages (default 0, off)")
+    arg_parser.add_argument("--disk-cache", action="store_true", help=f"also keep rendered blocks across builds in {RENDER_CACHE_PATH}")
+    arg_parser.add_argument("--profile", action="store_true", help=f"time every build stage and write a report to {PROFILE_PATH}")
+    arg_parser.add_argument("--profile-top", type=int, default=10, help="number of slowest pages listed by --profile")
+
+    return arg_parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    base_path = args.base_path
 
     static_dir = Path("static")
     content_dir = Path("content")
@@ -58,14 +406,107 @@ def main() -> None:
         if not path.exists():
             raise FileNotFoundError(f"Required directory not found: {path}")
 
-    if target_dir.exists():
-        shutil.rmtree(target_dir)
-    target_dir.mkdir()
+    use_base_path(base_path)
+    use_minify(args.minify)
+    templates = TemplateSet(content_dir, args.templates, HTML_TEMPLATE)
+    fingerprints = None
+    if args.fingerprint:
+        # Hashed before anything is rendered, so pages link to the fingerprinted names right away.
+        fingerprints = AssetFingerprints.load(FINGERPRINTS_PATH)
+        fingerprints.update(static_dir)
+        use_assets(fingerprints.urls())
+    images = None
+    if args.images:
+        images = ImageStore.load(IMAGES_PATH, IMAGE_CACHE_DIR, args.image_widths)
+        images.update(static_dir, resolve_jobs(args.image_jobs))
+        use_images(images.infos())
+    template_hash = outputs_hash(templates.hash(), fingerprints, images)
+    if args.incremental:
+        manifest = BuildManifest.load(MANIFEST_PATH, template_hash, base_path)
+        target_dir.mkdir(exist_ok=True)
+    elif MANIFEST_PATH.exists():
+        # Every page is rendered again, but outputs are only replaced when they changed and the
+        # manifest still knows which ones to remove, so the output directory is kept.
+        manifest = BuildManifest.load(MANIFEST_PATH, template_hash, base_path)
+        manifest.invalidate()
+        target_dir.mkdir(exist_ok=True)
+    else:
+        manifest = BuildManifest(MANIFEST_PATH, template_hash, base_path)
+        if target_dir.exists():
+            shutil.rmtree(target_dir)
+        target_dir.mkdir()
+
+    print(sync_static(static_dir, target_dir, manifest.assets, args.checksum, args.hardlink, asset_transforms()))
+    # Full builds keep the output directory, so outputs of stages that were turned off are removed
+    # from what their stores recorded.
+    if fingerprints is not None:
+        write_fingerprints(fingerprints, static_dir, target_dir, args.hardlink)
+        print(fingerprints.stats)
+    elif FINGERPRINTS_PATH.exists():
+        stale_fingerprints = AssetFingerprints.load(FINGERPRINTS_PATH)
+        stale_fingerprints.unpublish(target_dir)
+        stale_fingerprints.save()
+        print(stale_fingerprints.stats)
+    if images is not None:
+        images.publish(target_dir, args.hardlink)
+        images.save()
+        print(images.stats)
+    elif IMAGES_PATH.exists():
+        stale_images = ImageStore.load(IMAGES_PATH, IMAGE_CACHE_DIR, args.image_widths)
+        stale_images.unpublish(target_dir)
+        stale_images.save()
+        print(stale_images.stats)
+
+    profiler = BuildProfiler() if args.profile else NULL_PROFILER
+    parser = MarkdownParser(profiler=profiler)
+    if args.cache_size > 0 or args.disk_cache:
+        parser.cache = RenderCache(args.cache_size, RENDER_CACHE_PATH if args.disk_cache else None, cache_namespace(base_path, fingerprints, images, parser.single_pass))
+    cache = parser.cache
+    # The index only caches front matter, so it is reused by full builds too.
+    index = PageIndex.load(PAGE_INDEX_PATH)
+    _, report = build_content(content_dir, target_dir, parser, base_path, manifest, resolve_jobs(args.jobs), templates=templates, index=index, drafts=args.drafts, pipeline=args.pipeline)
+    if report is not None:
+        print(report)
+    if args.page_size > 0:
+        listings = build_listings(content_dir, target_dir, index, partial(write_listing, base_path=base_path), HTML_TEMPLATE, manifest, templates, page_size=args.page_size, drafts=args.drafts)
+        print(f"Listings: wrote {len(listings)} of {len(manifest.listings)} pages")
+    if args.site_url is not None:
+        site_files = write_site_files(target_dir, args.site_url, index, manifest, args.drafts, args.site_author)
+        print(f"Sitemap and feeds: wrote {', '.join(path.name for path in site_files)}")
+    elif len(manifest.sitemaps) > 0:
+        remove_site_files(target_dir, manifest)
+    compression = None
+    if args.compress:
+        # Last, so the sidecars are made from the final outputs.
+        compression = CompressionStore.load(COMPRESSION_PATH, max_ratio=args.compress_max_ratio)
+        compression.update(target_dir, resolve_jobs(args.compress_jobs))
+        compression.save()
+        print(compression.stats)
+    elif COMPRESSION_PATH.exists():
+        stale_compression = CompressionStore.load(COMPRESSION_PATH)
+        stale_compression.unpublish(target_dir)
+        stale_compression.save()
+        print(stale_compression.stats)
+    manifest.save()
+    index.save()
+    print(f"Changed outputs: {save_changed_files(target_dir)}")
+
+    if cache is not None:
+        cache.flush()
+        print(cache.stats)
+
+    if isinstance(profiler, BuildProfiler):
+        print(profiler.format_report(args.profile_top))
+        profiler.save(PROFILE_PATH, args.profile_top)
+        print(f"Profile written to {PROFILE_PATH}")
+        # Rebuilds in watch mode are not profiled.
+        parser = MarkdownParser(cache=cache)
 
-    copy_static_files(static_dir, target_dir)
+    if args.watch:
+        watch(static_dir, content_dir, target_dir, parser, manifest, args.interval, args.hardlink, templates, index, args.drafts, args.page_size, args.site_url, fingerprints, images, compression, args.site_author)
 
-    parser = MarkdownParser()
-    build_content(content_dir, target_dir, parser, base_path)
+    if cache is not None:
+        cache.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,135 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+MANIFEST_VERSION = 1
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def hash_text(text: str) -> str:
+    return hash_bytes(text.encode("utf-8"))
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class PageEntry:
+    def __init__(self, source_hash: str, output: str, size: int, mtime_ns: int):
+        self.source_hash = source_hash
+        self.output = output
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    def to_json(self) -> Dict:
+        return {"hash": self.source_hash, "output": self.output, "size": self.size, "mtime_ns": self.mtime_ns}
+
+    @staticmethod
+    def from_json(data: Dict) -> PageEntry:
+        return PageEntry(data["hash"], data["output"], data["size"], data["mtime_ns"])
+
+class BuildManifest:
+    def __init__(self, path: Path, template_hash: str, base_path: str):
+        self.path = path
+        self.template_hash = template_hash
+        self.base_path = base_path
+        self.pages: Dict[str, PageEntry] = {}
+        self.assets: Dict[str, List[int]] = {}
+        # Signatures of generated listing pages, keyed by their output path.
+        self.listings: Dict[str, str] = {}
+        # Sitemap files of the last build, so only those are removed when a later one needs fewer.
+        self.sitemaps: List[str] = []
+
+    @staticmethod
+    def load(path: Path, template_hash: str, base_path: str) -> BuildManifest:
+        manifest = BuildManifest(path, template_hash, base_path)
+        if not path.exists():
+            return manifest
+
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return manifest
+
+        if data.get("version") != MANIFEST_VERSION:
+            return manifest
+
+        # Outputs are only reusable when they were rendered with the same template and base path,
+        # but the recorded output paths are still needed to clean up removed sources.
+        manifest.pages = {key: PageEntry.from_json(entry) for key, entry in data.get("pages", {}).items()}
+        manifest.assets = data.get("assets", {})
+        manifest.listings = data.get("listings", {})
+        manifest.sitemaps = data.get("sitemaps", [])
+        if data.get("template_hash") != template_hash or data.get("base_path") != base_path:
+            manifest.invalidate()
+
+        return manifest
+
+    def invalidate(self) -> None:
+        for entry in self.pages.values():
+            entry.source_hash = ""
+        # Listing outputs are still known, so removed listings are cleaned up on the next build.
+        for output in self.listings:
+            self.listings[output] = ""
+
+    def save(self) -> None:
+        data = {
+            "version": MANIFEST_VERSION,
+            "template_hash": self.template_hash,
+            "base_path": self.base_path,
+            "pages": {key: entry.to_json() for key, entry in sorted(self.pages.items())},
+            "assets": dict(sorted(self.assets.items())),
+            "listings": dict(sorted(self.listings.items())),
+            "sitemaps": self.sitemaps,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(data, indent=1))
+        os.replace(tmp_path, self.path)
+
+    def needs_render(self, source: Path, relative_path: Path, output: Path) -> bool:
+        entry = self.pages.get(relative_path.as_posix())
+        if entry is None or not entry.source_hash or not output.exists():
+            return True
+
+        stat = source.stat()
+        if stat.st_size == entry.size and stat.st_mtime_ns == entry.mtime_ns:
+            return False
+
+        # Touched but not edited: refresh the cached stat so the next run skips hashing again.
+        if hash_file(source) == entry.source_hash and entry.output == output.as_posix():
+            entry.size, entry.mtime_ns = stat.st_size, stat.st_mtime_ns
+            return False
+
+        return True
+
+    def record(self, source: Path, relative_path: Path, output: Path) -> None:
+        stat = source.stat()
+        self.pages[relative_path.as_posix()] = PageEntry(hash_file(source), output.as_posix(), stat.st_size, stat.st_mtime_ns)
+
+    def forget(self, relative_path: Path) -> None:
+        self.pages.pop(relative_path.as_posix(), None)
+
+    def prune(self, seen: Iterable[Path]) -> List[Path]:
+        seen_keys = {path.as_posix() for path in seen}
+        removed = [key for key in self.pages if key not in seen_keys]
+
+        return [Path(self.pages.pop(key).output) for key in removed]
+
+def remove_outputs(outputs: Iterable[Path], root: Path) -> None:
+    for output in outputs:
+        output.unlink(missing_ok=True)
+
+        parent = output.parent
+        while parent != root and root in parent.parents:
+            try:
+                parent.rmdir()
+            except OSError:
+                break
+            parent = parent.parent
@@ -0,0 +1,214 @@
+from __future__ import annotations
+import io
+import re
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, TextIO
+
+# Elements whose content is whitespace-sensitive; it is passed through byte for byte.
+PRESERVED_TAGS = frozenset(("pre", "textarea", "script", "style"))
+# Whitespace next to these tags never renders, so it is dropped instead of collapsed to one space.
+BLOCK_TAGS = frozenset((
+    "html", "head", "body", "title", "meta", "link", "base", "script", "style", "noscript",
+    "article", "aside", "section", "nav", "header", "footer", "main", "div", "p", "pre", "blockquote",
+    "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "li", "dl", "dt", "dd", "hr", "figure", "figcaption",
+    "table", "thead", "tbody", "tfoot", "tr", "th", "td", "form", "fieldset", "details", "summary",
+))
+
+# Written pages are minified in batches of about this many characters, each cut after a complete tag.
+BUFFER_SIZE = 64 * 1024
+
+def _alternation(words: Iterable[str]) -> str:
+    # Nested by prefix (h(?:1|2|ead|...)), which the regex engine tries much faster than a flat list.
+    branches: Dict[str, List[str]] = {}
+    for word in words:
+        branches.setdefault(word[0], []).append(word[1:])
+
+    parts = []
+    for first, rests in sorted(branches.items()):
+        rest = _alternation([rest for rest in rests if rest])
+        if not rest:
+            parts.append(re.escape(first))
+        elif "" in rests:
+            parts.append(f"{re.escape(first)}(?:{rest})?")
+        else:
+            parts.append(f"{re.escape(first)}(?:{rest})")
+    return "|".join(parts)
+
+PRESERVED_OPEN = re.compile(rf"<({'|'.join(sorted(PRESERVED_TAGS))})(?![\w-])[^>]*>", re.IGNORECASE)
+PRESERVED_CLOSE = {name: re.compile(rf"</{name}\s*>", re.IGNORECASE) for name in PRESERVED_TAGS}
+# The doctype counts as a block tag; comments are left where they are, with the whitespace around them.
+BLOCK_TAG = rf"<(?:!(?!--)[^>]*|/?(?:{_alternation(BLOCK_TAGS)})(?![\w-])[^>]*)>"
+BLOCK_TAG_PATTERN = re.compile(BLOCK_TAG, re.IGNORECASE | re.DOTALL)
+# Two passes: patterns that start with a literal are found much faster than " ?(...) ?".
+SPACE_BEFORE_BLOCK = re.compile(rf" ({BLOCK_TAG})", re.IGNORECASE | re.DOTALL)
+SPACE_AFTER_BLOCK = re.compile(rf"({BLOCK_TAG}) ", re.IGNORECASE | re.DOTALL)
+# Splits minified HTML into text and the tags and comments between it, whose whitespace is kept.
+HTML_TAG_SPLIT = re.compile(r"(<!--.*?-->|<[!/?A-Za-z][^>]*>)", re.DOTALL)
+# Whitespace runs that are not a single space already. Only HTML whitespace collapses: a
+# non-breaking space is content.
+HTML_WHITESPACE = re.compile(r"[ \t\n\r\f]{2,}|[\t\n\r\f]")
+# The same for text without tabs, carriage returns and form feeds, in two faster passes.
+HTML_NEWLINES = re.compile(r"\n[ \n]*")
+HTML_SPACES = re.compile(r"  +")
+# Joins the text segments of a batch so they are collapsed in one pass; it is not whitespace.
+TEXT_SEPARATOR = "\x00"
+
+CSS_STRING = r'"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\''
+# Comments go, except /*! ... */ ones, which by convention carry licenses.
+CSS_COMMENT = re.compile(rf"({CSS_STRING})|/\*(?!!).*?\*/", re.DOTALL)
+# Splits the stylesheet into code and string literals, which are left as they are.
+CSS_STRINGS = re.compile(rf"({CSS_STRING})")
+CSS_WHITESPACE = re.compile(r"\s+")
+CSS_PUNCTUATION = re.compile(r" ?([{};,>~]) ?")
+CSS_COLON = re.compile(r": ")
+# A space before a colon is only dropped after a property name ("{color :red"); in a selector it is a
+# descendant combinator ("a :hover"), which is followed by a "{" before the next ";" or "}".
+CSS_PROPERTY_COLON = re.compile(r"([{;][-\w]+) :(?![^{};]*\{)")
+CSS_LAST_SEMICOLON = re.compile(r";(?=})")
+
+_enabled = False
+
+def use_minify(enabled: bool) -> None:
+    global _enabled
+    _enabled = enabled
+
+def minify_enabled() -> bool:
+    return _enabled
+
+def _collapse_whitespace(text: str) -> str:
+    if "\t" in text or "\r" in text or "\f" in text:
+        return HTML_WHITESPACE.sub(" ", text)
+    return HTML_SPACES.sub(" ", HTML_NEWLINES.sub(" ", text))
+
+class HtmlMinifier(io.TextIOBase):
+    # Collapses whitespace in the HTML written through it, as it streams. Writes are buffered and
+    # minified in batches that end after a complete tag outside comments and preserved elements,
+    # so chunks may split tags and whitespace runs anywhere and the output is the same as for the
+    # whole document.
+    def __init__(self, sink: TextIO, buffer_size: int = BUFFER_SIZE):
+        super().__init__()
+        self.sink = sink
+        self.buffer_size = buffer_size
+        self.chunks: List[str] = []
+        self.pending = ""
+        self.buffered = 0
+        self.limit = buffer_size
+        # The start of the document counts as a block boundary.
+        self.after_block = True
+        self.read = 0
+        self.written = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, chunk: str) -> int:
+        self.read += len(chunk)
+        self.chunks.append(chunk)
+        self.buffered += len(chunk)
+        if self.buffered >= self.limit:
+            self.__process(False)
+        return len(chunk)
+
+    def close(self) -> None:
+        # Flushes what is held back; the wrapped sink stays open.
+        if not self.closed:
+            self.__process(True)
+        super().close()
+
+    def __process(self, final: bool) -> None:
+        pending = self.pending + "".join(self.chunks)
+        self.chunks.clear()
+        end = len(pending)
+        if not final:
+            end = pending.rfind(">") + 1
+            comment = pending.rfind("<!--", 0, end)
+            if comment != -1 and pending.find("-->", comment + 4, end) == -1:
+                end = pending.rfind(">", 0, comment) + 1
+
+        output = []
+        position = 0
+        while position < end:
+            match = PRESERVED_OPEN.search(pending, position, end)
+            if match is None:
+                output.append(self.__minify(pending[position:end], final and end == len(pending)))
+                position = end
+                break
+
+            name = match.group(1).lower()
+            close = PRESERVED_CLOSE[name].search(pending, match.end(), end)
+            if close is None and not final:
+                # The element is not complete yet: it waits, with the text in front of it.
+                stop = max(position, pending.rfind(">", position, match.start()) + 1)
+                output.append(self.__minify(pending[position:stop], False))
+                position = stop
+                break
+
+            region_end = end if close is None else close.end()
+            output.append(self.__minify(pending[position:match.start()], name in BLOCK_TAGS))
+            output.append(pending[match.start():region_end])
+            self.after_block = name in BLOCK_TAGS
+            position = region_end
+
+        self.pending = pending[position:]
+        self.buffered = len(self.pending)
+        # A large preserved element is not scanned again for every write while it is incomplete.
+        self.limit = self.buffered + self.buffer_size
+
+        text = "".join(output)
+        if text:
+            self.written += len(text)
+            self.sink.write(text)
+
+    def __minify(self, html: str, before_block: bool) -> str:
+        # Whitespace is only collapsed in the text between tags, so every run is scanned once.
+        parts = HTML_TAG_SPLIT.split(html)
+        if TEXT_SEPARATOR in html:
+            parts[0::2] = [_collapse_whitespace(text) for text in parts[0::2]]
+        else:
+            parts[0::2] = _collapse_whitespace(TEXT_SEPARATOR.join(parts[0::2])).split(TEXT_SEPARATOR)
+        html = "".join(parts)
+        html = SPACE_AFTER_BLOCK.sub(r"\1", SPACE_BEFORE_BLOCK.sub(r"\1", html))
+        if self.after_block and html.startswith(" "):
+            html = html[1:]
+        if before_block and html.endswith(" "):
+            html = html[:-1]
+        if html:
+            self.after_block = html.endswith(">") and BLOCK_TAG_PATTERN.fullmatch(html, html.rfind("<")) is not None
+        return html
+
+    def __repr__(self) -> str:
+        return f'HtmlMinifier({self.read}, {self.written})'
+
+def minify_html(html: str) -> str:
+    sink = io.StringIO()
+    minifier = HtmlMinifier(sink)
+    minifier.write(html)
+    minifier.close()
+    return sink.getvalue()
+
+@contextmanager
+def minified(sink: TextIO) -> Iterator[TextIO]:
+    # Pages are minified on their way to the sink while minification is enabled.
+    if not _enabled:
+        yield sink
+        return
+
+    minifier = HtmlMinifier(sink)
+    yield minifier
+    minifier.close()
+
+def minify_css(css: str) -> str:
+    css = CSS_COMMENT.sub(lambda match: match.group(1) or " ", css)
+    parts = CSS_STRINGS.split(css)
+    for i in range(0, len(parts), 2):
+        code = CSS_WHITESPACE.sub(" ", parts[i])
+        code = CSS_PUNCTUATION.sub(r"\1", code)
+        code = CSS_PROPERTY_COLON.sub(r"\1:", code)
+        parts[i] = CSS_LAST_SEMICOLON.sub("", CSS_COLON.sub(":", code))
+    return "".join(parts).strip()
+
+def asset_transforms() -> Dict[str, Callable[[str], str]]:
+    # Static assets rewritten on their way to the output, by suffix.
+    if not _enabled:
+        return {}
+    return {".css": minify_css}
@@ -0,0 +1,108 @@
+from __future__ import annotations
+import os
+import threading
+from pathlib import Path
+from typing import List, Optional, TextIO
+from src.manifest import hash_bytes, hash_file
+
+# Outputs this process created or replaced since the last drain_changes(). Worker processes hand
+# theirs back per batch, like profiles and cache statistics.
+_changed: List[Path] = []
+_lock = threading.Lock()
+
+def record_change(path: Path) -> None:
+    with _lock:
+        _changed.append(path)
+
+def drain_changes() -> List[Path]:
+    with _lock:
+        changed = list(_changed)
+        _changed.clear()
+    return changed
+
+def temp_path(path: Path) -> Path:
+    # Unique per process and thread, next to the output so the final rename stays on one filesystem.
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+def is_unchanged(path: Path, data: bytes) -> bool:
+    try:
+        size = path.stat().st_size
+    except FileNotFoundError:
+        return False
+
+    return size == len(data) and hash_file(path) == hash_bytes(data)
+
+def write_if_changed(path: Path, text: str) -> bool:
+    return write_bytes_if_changed(path, text.encode("utf-8"))
+
+def write_bytes_if_changed(path: Path, data: bytes) -> bool:
+    # Identical outputs are left alone, so their mtime only moves when their content does and
+    # rsync or an upload step can skip them. Others are replaced atomically.
+    if is_unchanged(path, data):
+        return False
+
+    tmp = temp_path(path)
+    try:
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+    record_change(path)
+    return True
+
+def replace_if_changed(tmp: Path, path: Path) -> bool:
+    try:
+        unchanged = tmp.stat().st_size == path.stat().st_size and hash_file(tmp) == hash_file(path)
+    except FileNotFoundError:
+        unchanged = False
+
+    if unchanged:
+        tmp.unlink()
+        return False
+
+    os.replace(tmp, path)
+    record_change(path)
+    return True
+
+class PageBuffer:
+    # A page rendered in memory, kept as the chunks written to it. They are encoded straight into
+    # the bytes that are written, instead of being joined into one string and encoded as a copy.
+    __slots__ = ("chunks", "write")
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        # Bound directly, so a write is a single list append.
+        self.write = self.chunks.append
+
+    def getvalue(self) -> bytes:
+        return b"".join([chunk.encode("utf-8") for chunk in self.chunks])
+
+    def __repr__(self) -> str:
+        return f'PageBuffer({len(self.chunks)})'
+
+class AtomicOutput:
+    # For outputs written piece by piece (streamed pages, feeds): the content goes to a temporary
+    # file, which then either replaces the output or is dropped when it is identical.
+    def __init__(self, path: Path):
+        self.path = path
+        self.tmp = temp_path(path)
+        self.sink: Optional[TextIO] = None
+        self.changed = False
+
+    def __enter__(self) -> TextIO:
+        self.sink = self.tmp.open("w", encoding="utf-8")
+        return self.sink
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        assert self.sink is not None
+        self.sink.close()
+        if exc_type is not None:
+            self.tmp.unlink(missing_ok=True)
+            return
+
+        self.changed = replace_if_changed(self.tmp, self.path)
+
+    def __repr__(self) -> str:
+        return f'AtomicOutput({self.path}, {self.changed})'
@@ -0,0 +1,125 @@
+from __future__ import annotations
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.front_matter import PageMeta, read_front_matter
+
+PAGE_INDEX_VERSION = 1
+
+class IndexEntry:
+    __slots__ = ("size", "mtime_ns", "meta")
+
+    def __init__(self, size: int, mtime_ns: int, meta: PageMeta):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.meta = meta
+
+    def to_json(self) -> Dict:
+        return {"size": self.size, "mtime_ns": self.mtime_ns, "meta": self.meta.to_json()}
+
+    @staticmethod
+    def from_json(data: Dict) -> IndexEntry:
+        return IndexEntry(data["size"], data["mtime_ns"], PageMeta.from_json(data["meta"]))
+
+def read_page_meta(source: Path) -> PageMeta:
+    with source.open() as lines:
+        meta, _ = read_front_matter(lines)
+    return meta
+
+class PageIndex:
+    # Front matter of every page, keyed by its path relative to the content directory. Entries are
+    # re-read only when the source's size or mtime changed, so listings, sitemaps and feeds can
+    # query the metadata of every page without opening the Markdown files again.
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path
+        self.entries: Dict[str, IndexEntry] = {}
+        self.dirty = False
+
+    @staticmethod
+    def load(path: Path) -> PageIndex:
+        index = PageIndex(path)
+        if not path.exists():
+            return index
+
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return index
+
+        if data.get("version") == PAGE_INDEX_VERSION:
+            index.entries = {key: IndexEntry.from_json(entry) for key, entry in data.get("pages", {}).items()}
+
+        return index
+
+    def save(self) -> None:
+        if self.path is None or not self.dirty:
+            return
+
+        data = {
+            "version": PAGE_INDEX_VERSION,
+            "pages": {key: entry.to_json() for key, entry in sorted(self.entries.items())},
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(data, indent=1))
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def update(self, source: Path, relative_path: Path) -> PageMeta:
+        key = relative_path.as_posix()
+        stat = source.stat()
+        entry = self.entries.get(key)
+        if entry is not None and entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+            return entry.meta
+
+        try:
+            meta = read_page_meta(source)
+        except ValueError as error:
+            raise ValueError(f"{source}: {error}") from error
+
+        self.entries[key] = IndexEntry(stat.st_size, stat.st_mtime_ns, meta)
+        self.dirty = True
+        return meta
+
+    def get(self, relative_path: Path) -> Optional[PageMeta]:
+        entry = self.entries.get(relative_path.as_posix())
+        return None if entry is None else entry.meta
+
+    def forget(self, relative_path: Path) -> None:
+        if self.entries.pop(relative_path.as_posix(), None) is not None:
+            self.dirty = True
+
+    def prune(self, seen: Iterable[Path]) -> List[str]:
+        seen_keys = {path.as_posix() for path in seen}
+        removed = [key for key in self.entries if key not in seen_keys]
+        for key in removed:
+            del self.entries[key]
+        self.dirty = self.dirty or len(removed) > 0
+
+        return removed
+
+    def pages(self, drafts: bool = False, tag: Optional[str] = None) -> List[Tuple[str, PageMeta]]:
+        # Newest first; undated pages come last, in path order.
+        pages = [
+            (key, entry.meta) for key, entry in self.entries.items()
+            if (drafts or not entry.meta.draft) and (tag is None or tag in entry.meta.tags)
+        ]
+        pages.sort(key=lambda page: page[0])
+        pages.sort(key=lambda page: page[1].date or "", reverse=True)
+        return pages
+
+    def tags(self, drafts: bool = False) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for entry in self.entries.values():
+            if drafts or not entry.meta.draft:
+                for tag in entry.meta.tags:
+                    counts[tag] = counts.get(tag, 0) + 1
+
+        return dict(sorted(counts.items()))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __repr__(self) -> str:
+        return f'PageIndex({self.path}, {len(self.entries)})'
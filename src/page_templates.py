@@ -0,0 +1,132 @@
+from __future__ import annotations
+import re
+from functools import lru_cache
+from pathlib import Path
+from string import Template
+from typing import Callable, Dict, List, Mapping, Optional
+from src.manifest import hash_text
+from src.urls import UrlResolver, rewrite_urls, using_base_path
+
+Write = Callable[[str], object]
+
+CONTENT_SLOT = "content"
+DEFAULT_TEMPLATE_NAME = "default"
+TEMPLATE_SUFFIX = ".html"
+
+class CompiledTemplate:
+    # A template split once into static chunks and the slots between them: chunks[i] is written
+    # before slots[i], and the last chunk closes the page.
+    def __init__(self, chunks: List[str], slots: List[str]):
+        self.chunks = chunks
+        self.slots = slots
+
+    def render(self, write: Write, values: Mapping[str, str], render_content: Callable[[Write], None]) -> None:
+        for chunk, slot in zip(self.chunks, self.slots):
+            write(chunk)
+            if slot == CONTENT_SLOT:
+                render_content(write)
+            else:
+                write(values[slot])
+        write(self.chunks[-1])
+
+    def __repr__(self) -> str:
+        return f'CompiledTemplate({self.chunks}, {self.slots})'
+
+def compile_template(source: str, base_path: str, pattern: re.Pattern = Template.pattern) -> CompiledTemplate:
+    # Compiled once per resolver: switching to another asset map brings new resolvers and so
+    # compiles the template again.
+    with using_base_path(base_path) as resolver:
+        return _compile_template(source, resolver, pattern)
+
+@lru_cache(maxsize=64)
+def _compile_template(source: str, resolver: UrlResolver, pattern: re.Pattern) -> CompiledTemplate:
+    # URLs in static chunks are resolved here, once per template, instead of on every page.
+    chunks: List[str] = []
+    slots: List[str] = []
+    text: List[str] = []
+    position = 0
+
+    for match in pattern.finditer(source):
+        text.append(source[position:match.start()])
+        position = match.end()
+
+        if match.group("escaped") is not None:
+            text.append(match.group("escaped"))
+            continue
+
+        slot = match.group("named") or match.group("braced")
+        if slot is None:
+            raise ValueError(f"Invalid placeholder in template at index {match.start()}")
+        if slot == CONTENT_SLOT and CONTENT_SLOT in slots:
+            raise ValueError(f"Template has more than one ${CONTENT_SLOT} slot")
+
+        chunks.append(rewrite_urls("".join(text), resolver))
+        slots.append(slot)
+        text = []
+
+    text.append(source[position:])
+    chunks.append(rewrite_urls("".join(text), resolver))
+
+    return CompiledTemplate(chunks, slots)
+
+class TemplateSet:
+    # Page templates from a templates/ directory. A page uses the template named after its nearest
+    # section: content/blog/tom/index.md looks for blog/tom.html, then blog.html, then default.html
+    # and finally falls back to the built-in default.
+    def __init__(self, content_dir: Path, directory: Optional[Path], default: Template):
+        self.content_dir = content_dir
+        self.directory = directory
+        self.default = default
+        self.loaded: Dict[str, Optional[Template]] = {}
+        self.selected: Dict[Path, Template] = {}
+
+    def path_for(self, name: str) -> Optional[Path]:
+        if self.directory is None:
+            return None
+        return self.directory / f"{name}{TEMPLATE_SUFFIX}"
+
+    def load(self, name: str) -> Optional[Template]:
+        if name not in self.loaded:
+            path = self.path_for(name)
+            self.loaded[name] = Template(path.read_text()) if path is not None and path.is_file() else None
+
+        return self.loaded[name]
+
+    def select(self, source: Path, name: Optional[str] = None) -> Template:
+        if name is not None:
+            template = self.load(name)
+            if template is None:
+                raise FileNotFoundError(f"Template not found: {self.path_for(name) or name}")
+            return template
+
+        section = source.relative_to(self.content_dir).parent
+        template = self.selected.get(section)
+        if template is None:
+            template = self.default
+            for candidate in (section, *section.parents):
+                found = self.load(DEFAULT_TEMPLATE_NAME if candidate == Path(".") else candidate.as_posix())
+                if found is not None:
+                    template = found
+                    break
+            self.selected[section] = template
+
+        return template
+
+    def reload(self) -> None:
+        self.loaded.clear()
+        self.selected.clear()
+
+    def set_default(self, default: Template) -> None:
+        self.default = default
+        self.selected.clear()
+
+    def hash(self) -> str:
+        sources = [self.default.template]
+        if self.directory is not None and self.directory.is_dir():
+            for path in sorted(self.directory.rglob(f"*{TEMPLATE_SUFFIX}")):
+                sources.append(f"{path.relative_to(self.directory).as_posix()}\x00{path.read_text()}")
+
+        return hash_text("\x00".join(sources))
+
+    def __repr__(self) -> str:
+        return f'TemplateSet({self.content_dir}, {self.directory})'
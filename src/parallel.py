@@ -0,0 +1,114 @@
+from __future__ import annotations
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from src.outputs import drain_changes, record_change
+from src.parsers.markdown import MarkdownParser
+from src.profiler import NULL_PROFILER, BuildProfiler
+from src.render_cache import CacheStats, RenderCache
+from src.images import ImageInfo, get_images, use_images
+from src.minify import minify_enabled, use_minify
+from src.urls import get_assets, use_assets
+
+PageJob = Tuple[Path, Path]
+RenderPage = Callable[[Path, Path, MarkdownParser], object]
+
+# Each worker process builds its own parser once, in the pool initializer.
+_worker_parser: Optional[MarkdownParser] = None
+
+class WorkerStats:
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.batches = 0
+        self.pages = 0
+        self.seconds = 0.0
+
+    def __repr__(self) -> str:
+        return f'WorkerStats({self.pid}, {self.batches}, {self.pages}, {self.seconds:.3f})'
+
+def resolve_jobs(jobs: int) -> int:
+    if jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+def split_batches(pages: Sequence[PageJob], jobs: int, batch_size: Optional[int] = None) -> List[Sequence[PageJob]]:
+    if batch_size is None:
+        # A few batches per worker keeps the pool balanced when page sizes vary.
+        batch_size = max(1, math.ceil(len(pages) / (jobs * 4)))
+
+    return [pages[i:i + batch_size] for i in range(0, len(pages), batch_size)]
+
+def _init_worker(profile: bool = False, cache_config: Optional[Tuple[int, Optional[Path], str]] = None, assets: Optional[Dict[str, str]] = None, images: Optional[Dict[str, ImageInfo]] = None, minify: bool = False) -> None:
+    global _worker_parser
+    # Workers resolve asset URLs to the same fingerprinted names, describe images and minify pages like the parent.
+    use_minify(minify)
+    if assets:
+        use_assets(assets)
+    if images:
+        use_images(images)
+    profiler = BuildProfiler() if profile else NULL_PROFILER
+    cache = RenderCache(*cache_config) if cache_config is not None else None
+    _worker_parser = MarkdownParser(profiler=profiler, cache=cache)
+
+def _render_batch(render_page: RenderPage, batch: Sequence[PageJob]) -> Tuple[int, int, float, Optional[BuildProfiler], Optional[CacheStats], List[Path]]:
+    assert _worker_parser is not None
+
+    start = time.perf_counter()
+    for src_file, dst_file in batch:
+        render_page(src_file, dst_file, _worker_parser)
+    seconds = time.perf_counter() - start
+
+    profiler = _worker_parser.profiler
+    cache = _worker_parser.cache
+    cache_stats = None
+    if cache is not None:
+        # Workers have no shutdown hook, so their disk tier is flushed after every batch.
+        cache.flush()
+        cache_stats, cache.stats = cache.stats, CacheStats()
+
+    return os.getpid(), len(batch), seconds, profiler.drain() if isinstance(profiler, BuildProfiler) else None, cache_stats, drain_changes()
+
+def render_parallel(pages: Sequence[PageJob], render_page: RenderPage, jobs: int, batch_size: Optional[int] = None, profiler: Optional[BuildProfiler] = None, cache: Optional[RenderCache] = None) -> Dict[int, WorkerStats]:
+    # With a profiler, every worker profiles its pages and the results are merged into it. With a cache,
+    # every worker keeps a cache of the same size and disk tier, and their statistics are added to it.
+    stats: Dict[int, WorkerStats] = {}
+    if len(pages) == 0:
+        return stats
+
+    batches = split_batches(pages, jobs, batch_size)
+    cache_config = None if cache is None else (cache.max_entries, cache.disk_path, cache.namespace)
+    with ProcessPoolExecutor(max_workers=min(jobs, len(batches)), initializer=_init_worker, initargs=(profiler is not None, cache_config, get_assets(), get_images(), minify_enabled())) as pool:
+        futures = [pool.submit(_render_batch, render_page, batch) for batch in batches]
+        for future in futures:
+            pid, count, seconds, batch_profile, batch_cache_stats, changed = future.result()
+            for path in changed:
+                record_change(path)
+            if profiler is not None and batch_profile is not None:
+                profiler.merge(batch_profile)
+            if cache is not None and batch_cache_stats is not None:
+                cache.stats.merge(batch_cache_stats)
+            worker = stats.setdefault(pid, WorkerStats(pid))
+            worker.batches += 1
+            worker.pages += count
+            worker.seconds += seconds
+
+    return stats
+
+def format_worker_report(stats: Dict[int, WorkerStats], wall_seconds: float) -> str:
+    lines = [f"Rendered with {len(stats)} workers in {wall_seconds:.3f}s"]
+    for worker in sorted(stats.values(), key=lambda worker: worker.pid):
+        lines.append(f"  worker {worker.pid}: {worker.pages} pages in {worker.batches} batches, {worker.seconds:.3f}s")
+
+    return "\n".join(lines)
+
+class WorkerReport:
+    # What a parallel render returns to main(), which prints it with the other stage reports.
+    def __init__(self, stats: Dict[int, WorkerStats], wall_seconds: float):
+        self.stats = stats
+        self.wall_seconds = wall_seconds
+
+    def __str__(self) -> str:
+        return format_worker_report(self.stats, self.wall_seconds)
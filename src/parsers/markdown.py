@@ -1,8 +1,11 @@
 import re
 from enum import Enum
+from functools import lru_cache
 from src.htmlnode import HTMLNode, ParentNode, LeafNode
+from src.profiler import NULL_PROFILER, Profiler
+from src.render_cache import RenderCache
 from src.textnode import TextNode, TextType, text_node_to_html_node
-from typing import Callable, Dict, List, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 class BlockType(Enum):
     PARAGRAPH = 'paragraph',
@@ -12,8 +15,99 @@ class BlockType(Enum):
     UNORDERED_LIST = 'unordered_list'
     ORDERED_LIST = 'ordered_list'
 
+@lru_cache(maxsize=None)
+def get_split_pattern(delimiter: str) -> re.Pattern:
+    d = re.escape(delimiter)
+    # (?<!{d}) - negative lookbehind: ensures the delimiter is NOT preceded by another delimiter
+    # {d} - matches exactly one instance of the delimiter
+    # (?!{d}) - negative lookahead: ensures the delimiter is NOT followed by another delimiter
+    # Result: matches a single, standalone delimiter and ignores runs like '**' or '***'
+
+    # TODO: Improve on contigous sections such as "_one__two_ **a****b**"
+    return re.compile(rf'(?<!{d}){d}(?!{d})')
+
+IMAGE_PATTERN = re.compile(r'!\[([^\[\]]*)\]\(([^\(\)]*)\)')
+LINK_PATTERN = re.compile(r'(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)')
+
+# One alternation for every inline token, so text_to_textnodes can walk the text once.
+INLINE_LINK_TOKEN = (
+    r'(?P<image>!\[(?P<image_alt>[^\[\]]*)\]\((?P<image_url>[^\(\)]*)\))'
+    r'|(?P<link>(?<!!)\[(?P<link_text>[^\[\]]*)\]\((?P<link_url>[^\(\)]*)\))'
+)
+INLINE_TOKEN_PATTERN = re.compile(
+    INLINE_LINK_TOKEN +
+    r'|(?P<delimiter>(?<!\*)\*\*(?!\*)|(?<!_)_(?!_)|(?<!`)`(?!`))'
+)
+
+# Links and images inside bold and italic spans; code spans are left as they are.
+INLINE_LINK_PATTERN = re.compile(INLINE_LINK_TOKEN)
+
+INLINE_DELIMITERS: Dict[str, Tuple[TextType, re.Pattern]] = {
+    "**": (TextType.BOLD, re.compile(r'(?<!\*)\*\*(?!\*)')),
+    "_": (TextType.ITALIC, re.compile(r'(?<!_)_(?!_)')),
+    "`": (TextType.CODE, re.compile(r'(?<!`)`(?!`)')),
+}
+
+# Block prefixes are matched against the whole block, so whitespace must not run past the first line.
+HEADING_PREFIX_PATTERN = re.compile(r'#{1,6}[^\S\n]')
+ORDERED_LIST_PREFIX_PATTERN = re.compile(r'\d+\.[^\S\n]')
+UNORDERED_LIST_PREFIX_PATTERN = re.compile(r'[-*+][^\S\n]')
+
+HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.*)')
+CODE_FENCE_PATTERN = re.compile(r'^```|```$', flags=re.MULTILINE)
+QUOTE_LINE_PATTERN = re.compile(r'^>\s?')
+UNORDERED_ITEM_PATTERN = re.compile(r'^[*-]\s+')
+ORDERED_ITEM_PATTERN = re.compile(r'^\d+\.\s+')
+
+# A block runs over non-empty lines, from its first to its last non-whitespace character: it ends at "\n\n".
+BLOCK_PATTERN = re.compile(r'\S[^\n]*(?:\n[^\n]+)*(?<=\S)')
+
+# Classifiers look at text[start:end] in place, so blocks can be typed before they are sliced out.
+BlockClassifier = Callable[[str, int, int], BlockType]
+
+def _classify_prefix(pattern: re.Pattern, block_type: BlockType) -> BlockClassifier:
+    return lambda text, start, end: block_type if pattern.match(text, start, end) else BlockType.PARAGRAPH
+
+# Every block type is decided by its first character, so classification is a single dict lookup
+# followed by at most one anchored match.
+BLOCK_TYPE_DISPATCH: Dict[str, BlockClassifier] = {
+    "#": _classify_prefix(HEADING_PREFIX_PATTERN, BlockType.HEADING),
+    "`": lambda text, start, end: BlockType.CODE if text.startswith("```", start, end) else BlockType.PARAGRAPH,
+    ">": lambda text, start, end: BlockType.QUOTE,
+    **{marker: _classify_prefix(UNORDERED_LIST_PREFIX_PATTERN, BlockType.UNORDERED_LIST) for marker in "-*+"},
+    **{digit: _classify_prefix(ORDERED_LIST_PREFIX_PATTERN, BlockType.ORDERED_LIST) for digit in "0123456789"},
+}
+
+def classify_block(text: str, start: int, end: int) -> BlockType:
+    if start >= end:
+        return BlockType.PARAGRAPH
+
+    classify = BLOCK_TYPE_DISPATCH.get(text[start])
+    if classify is None:
+        return BlockType.PARAGRAPH
+
+    return classify(text, start, end)
+
+# Profiler stage names, built once so the per-block bookkeeping does no string formatting.
+BLOCK_STAGES: Dict[BlockType, str] = {block_type: f"block:{block_type.name.lower()}" for block_type in BlockType}
+
 class MarkdownParser:
+    def __init__(self, single_pass: bool = True, profiler: Profiler = NULL_PROFILER, cache: Optional[RenderCache] = None):
+        # single_pass=False keeps the original split_nodes pipeline around for comparison.
+        self.single_pass = single_pass
+        self.profiler = profiler
+        self.cache = cache
+
+        if profiler.enabled:
+            # Timed wrappers shadow the methods on this instance only, so an unprofiled parser pays nothing.
+            self.iter_blocks = profiler.wrap_iter("blocks", self.iter_blocks)
+            self.iter_line_blocks = profiler.wrap_iter("blocks", self.iter_line_blocks)
+            self.text_to_textnodes = profiler.wrap("inline", self.text_to_textnodes)
+
     def text_to_textnodes(self, text: str) -> List[TextNode]:
+        if self.single_pass:
+            return self.__scan_inline(text)
+
         nodes = [TextNode(text, TextType.TEXT)]
         
         nodes = self.split_nodes_image(nodes)
@@ -30,9 +124,63 @@ class MarkdownParser:
 
         return nodes
 
+    def __scan_inline(self, text: str) -> List[TextNode]:
+        nodes = []
+        position = 0
+
+        while True:
+            match = INLINE_TOKEN_PATTERN.search(text, position)
+            if match is None:
+                break
+
+            start = match.start()
+            if start > position:
+                nodes.append(TextNode(text=text[position:start], text_type=TextType.TEXT))
+
+            if match.group("image") is not None:
+                nodes.append(TextNode(text=match.group("image_alt"), text_type=TextType.IMAGE, url=match.group("image_url")))
+                position = match.end()
+            elif match.group("link") is not None:
+                nodes.append(TextNode(text=match.group("link_text"), text_type=TextType.LINK, url=match.group("link_url")))
+                position = match.end()
+            else:
+                text_type, closing_pattern = INLINE_DELIMITERS[match.group("delimiter")]
+                closing = closing_pattern.search(text, match.end())
+                if closing is None:
+                    # split_nodes only ever rejected unclosed single-character delimiters.
+                    if len(match.group("delimiter")) == 1:
+                        raise ValueError(f"Invalid markdown element. Element starting at index {start} was not correctly closed")
+
+                    self.__scan_span(text, match.end(), len(text), text_type, nodes)
+                    position = len(text)
+                    break
+
+                self.__scan_span(text, match.end(), closing.start(), text_type, nodes)
+                position = closing.end()
+
+        if position < len(text) or len(nodes) == 0:
+            nodes.append(TextNode(text=text[position:], text_type=TextType.TEXT))
+
+        return nodes
+
+    def __scan_span(self, text: str, start: int, end: int, text_type: TextType, nodes: List[TextNode]) -> None:
+        position = start
+        if text_type != TextType.CODE:
+            for match in INLINE_LINK_PATTERN.finditer(text, start, end):
+                if match.start() > position:
+                    nodes.append(TextNode(text=text[position:match.start()], text_type=text_type))
+                if match.group("image") is not None:
+                    nodes.append(TextNode(text=match.group("image_alt"), text_type=TextType.IMAGE, url=match.group("image_url")))
+                else:
+                    nodes.append(TextNode(text=match.group("link_text"), text_type=TextType.LINK, url=match.group("link_url")))
+                position = match.end()
+
+        if end > position:
+            nodes.append(TextNode(text=text[position:end], text_type=text_type))
+
     def split_nodes(self, old_nodes: List[TextNode], delimiter: str, text_type: TextType) -> List[TextNode]:
         new_nodes = []
-        pattern = self.__get_split_pattern(delimiter)
+        pattern = get_split_pattern(delimiter)
 
         for node in old_nodes:
 
@@ -40,9 +188,7 @@ class MarkdownParser:
                 new_nodes.append(node)
                 continue
 
-            parts = re.split(pattern, node.text)
-            if node.text == " ":
-                print(parts)
+            parts = pattern.split(node.text)
 
             start = 0
             for i, part in enumerate(parts):
@@ -68,30 +214,79 @@ class MarkdownParser:
         return new_nodes
 
     def split_nodes_image(self, old_nodes: List[TextNode]) -> List[TextNode]:
-        return self.__split_link_based_nodes(old_nodes, self.extract_markdown_images, self.__get_image_pattern(), TextType.IMAGE)
+        return self.__split_link_based_nodes(old_nodes, IMAGE_PATTERN, TextType.IMAGE)
 
     def split_nodes_link(self, old_nodes: List[TextNode]) -> List[TextNode]:
-        return self.__split_link_based_nodes(old_nodes, self.extract_markdown_links, self.__get_link_pattern(), TextType.LINK)
+        return self.__split_link_based_nodes(old_nodes, LINK_PATTERN, TextType.LINK)
 
     def extract_markdown_images(self, text: str) -> List[Tuple[str, str]]:
-        pattern = self.__get_image_pattern()
-        matches = re.findall(pattern, text)
-
-        return matches
+        return IMAGE_PATTERN.findall(text)
 
     def extract_markdown_links(self, text: str) -> List[Tuple[str, str]]:
-        pattern = self.__get_link_pattern()
-        matches = re.findall(pattern, text)
-
-        return matches
+        return LINK_PATTERN.findall(text)
 
     def markdown_to_blocks(self, markdown: str) -> List[str]:
-        # TODO: For now, only care about simple and valid markdown.
-        blocks = markdown.split("\n\n")
+        return [markdown[start:end] for _, start, end in self.iter_blocks(markdown)]
+
+    def iter_blocks(self, markdown: str) -> Iterator[Tuple[BlockType, int, int]]:
+        # Walks the document once and yields every block as a whitespace-trimmed (type, start, end) span of the
+        # original string, so nothing is split or copied. A line starting with ``` opens or closes a fence: while
+        # one is open, the runs of lines around empty lines are merged back into a single block.
+        dispatch = BLOCK_TYPE_DISPATCH.get
+        count = markdown.count
+        has_fences = "```" in markdown
+        fence_start = -1
+        end = 0
+
+        for match in BLOCK_PATTERN.finditer(markdown):
+            start, end = match.span()
+
+            if has_fences:
+                fences = count("\n```", start, end)
+                if markdown.startswith("```", start) and (start == 0 or markdown[start - 1] == "\n"):
+                    fences += 1
+                if fence_start != -1:
+                    if fences % 2 == 0:
+                        continue
+                    start, fence_start = fence_start, -1
+                elif fences % 2 == 1:
+                    fence_start = start
+                    continue
 
-        return list(filter(lambda block: len(block) > 0, map(lambda block: block.strip(), blocks)))
+            classify = dispatch(markdown[start])
+            yield BlockType.PARAGRAPH if classify is None else classify(markdown, start, end), start, end
+
+        if fence_start != -1:
+            # An unclosed fence runs to the end of the document.
+            yield classify_block(markdown, fence_start, end), fence_start, end
+
+    def iter_line_blocks(self, lines: Iterable[str]) -> Iterator[Tuple[BlockType, str]]:
+        # The streaming counterpart of iter_blocks for sources too large to hold in memory: lines come from
+        # a file object and only the current block is kept. Yields the same blocks as iter_blocks does for
+        # the whole text, but as (type, text) pairs.
+        block: List[str] = []
+        in_fence = False
+
+        for line in lines:
+            if line == "\n" and not in_fence:
+                if block:
+                    yield from self.__line_block(block)
+                    block = []
+                continue
 
-    def __split_link_based_nodes(self, old_nodes: List[TextNode], get_links_callback: Callable, pattern: str, text_type: TextType) -> List[TextNode]:
+            if line.startswith("```"):
+                in_fence = not in_fence
+            block.append(line)
+
+        if block:
+            yield from self.__line_block(block)
+
+    def __line_block(self, lines: List[str]) -> Iterator[Tuple[BlockType, str]]:
+        text = "".join(lines).strip()
+        if text:
+            yield classify_block(text, 0, len(text)), text
+
+    def __split_link_based_nodes(self, old_nodes: List[TextNode], pattern: re.Pattern, text_type: TextType) -> List[TextNode]:
         new_nodes = []
 
         for node in old_nodes:
@@ -100,27 +295,17 @@ class MarkdownParser:
                 continue
 
             start, end = 0, len(node.text) - 1
-            links = get_links_callback(node.text)
-            links_positions = [
-                (m.start(), m.end() - 1)
-                for m in re.finditer(pattern, node.text)
-            ]
-
-            if len(links) != len(links_positions):
-                raise Exception("Links length and positions matches mismatch")
 
-            for i, match in enumerate(links_positions):
-                assert len(match) == 2
-                assert match[0] is not None and match[1] is not None
-
-                end = max(0, match[0] - 1)
+            # One finditer pass yields both the captured text/url and the span of every link.
+            for match in pattern.finditer(node.text):
+                end = max(0, match.start() - 1)
                 normal_text = node.text[start:end + 1]
 
                 if start < end:
                     new_nodes.append(TextNode(text=normal_text, text_type=node.text_type))
 
-                new_nodes.append(TextNode(text=links[i][0], text_type=text_type, url=links[i][1])) 
-                start = min(match[1] + 1, len(node.text))
+                new_nodes.append(TextNode(text=match.group(1), text_type=text_type, url=match.group(2)))
+                start = min(match.end(), len(node.text))
 
 
             if start < len(node.text):
@@ -129,96 +314,88 @@ class MarkdownParser:
         return new_nodes
 
     def block_to_block_type(self, block: str) -> BlockType | None:
-        regex_to_block_type: Dict[str, BlockType] = {
-            r"^#{1,6}\s": BlockType.HEADING,
-            r"^```": BlockType.CODE,
-            r"^>": BlockType.QUOTE,
-            r"^\d+\.\s": BlockType.ORDERED_LIST,
-            r"^[-*+]\s": BlockType.UNORDERED_LIST,
-            r".*": BlockType.PARAGRAPH,
-        }
-
-        first_line = block.split("\n", 1)[0]
-        for regex, block_type in regex_to_block_type.items():
-            if re.match(regex, first_line):
-                return block_type
-
-        return None
+        return classify_block(block, 0, len(block))
 
     def markdown_to_html_code(self, markdown: str) -> HTMLNode:
-        html_nodes = []
-        markdown_blocks = self.markdown_to_blocks(markdown)
-
-        for markdown_block in markdown_blocks:
-            block_type = self.block_to_block_type(markdown_block)
-            if block_type is None:
-                continue
-
-            match block_type:
-
-                case BlockType.PARAGRAPH:
-                    text_nodes = self.text_to_textnodes(markdown_block)
-                    children = list(map(lambda text_node: text_node_to_html_node(text_node), text_nodes))
-                    html_nodes.append(ParentNode(tag="p", children=children))
-
-                case BlockType.HEADING:
-                    match = re.match(r"^(#{1,6})\s+(.*)", markdown_block)
-                    if not match:
-                        continue
-
-                    level = len(match.group(1))
-                    content = match.group(2).strip()
+        blocks = ((block_type, markdown[start:end]) for block_type, start, end in self.iter_blocks(markdown))
+        return ParentNode(tag='div', children=list(self.blocks_to_html_nodes(blocks)))
+
+    def blocks_to_html_nodes(self, blocks: Iterable[Tuple[BlockType, str]]) -> Iterator[HTMLNode]:
+        profiler = self.profiler
+        cache = self.cache
+
+        for block_type, markdown_block in blocks:
+            stage = BLOCK_STAGES[block_type]
+            profiler.start()
+            if cache is None:
+                html_node = self.__block_to_html_node(markdown_block, block_type)
+            else:
+                html_node = self.__cached_block_to_html_node(markdown_block, block_type, stage, cache)
+            profiler.stop(stage)
+
+            if html_node is not None:
+                yield html_node
+
+    def __cached_block_to_html_node(self, markdown_block: str, block_type: BlockType, stage: str, cache: RenderCache) -> HTMLNode | None:
+        # A cached block comes back as a single untagged leaf holding its rendered HTML.
+        html = cache.get(stage, markdown_block)
+        if html is None:
+            html_node = self.__block_to_html_node(markdown_block, block_type)
+            html = "" if html_node is None else html_node.to_html()
+            cache.put(stage, markdown_block, html)
+
+        return LeafNode(value=html) if html else None
+
+    def __block_to_html_node(self, markdown_block: str, block_type: BlockType) -> HTMLNode | None:
+        match block_type:
+
+            case BlockType.PARAGRAPH:
+                text_nodes = self.text_to_textnodes(markdown_block)
+                children = list(map(lambda text_node: text_node_to_html_node(text_node), text_nodes))
+                return ParentNode(tag="p", children=children)
+
+            case BlockType.HEADING:
+                match = HEADING_PATTERN.match(markdown_block)
+                if not match:
+                    return None
+
+                level = len(match.group(1))
+                content = match.group(2).strip()
+                text_nodes = self.text_to_textnodes(content)
+                children = list(map(lambda text_node: text_node_to_html_node(text_node), text_nodes))
+                return ParentNode(tag=f"h{level}", children=children)
+
+            case BlockType.CODE:
+                code = markdown_block.strip()
+                code = CODE_FENCE_PATTERN.sub("", code).strip()
+                return ParentNode(tag="pre", children=[LeafNode(tag="code", value=code)])
+
+            case BlockType.QUOTE:
+                lines = markdown_block.splitlines()
+                cleaned = [QUOTE_LINE_PATTERN.sub("", line) for line in lines]
+                content = "\n".join(cleaned).strip()
+                text_nodes = self.text_to_textnodes(content)
+                children = list(map(lambda text_node: text_node_to_html_node(text_node), text_nodes))
+                return ParentNode(tag="blockquote", children=children)
+
+            case BlockType.UNORDERED_LIST:
+                items = markdown_block.splitlines()
+                li_nodes = []
+                for item in items:
+                    content = UNORDERED_ITEM_PATTERN.sub("", item).strip()
                     text_nodes = self.text_to_textnodes(content)
                     children = list(map(lambda text_node: text_node_to_html_node(text_node), text_nodes))
-                    html_nodes.append(ParentNode(tag=f"h{level}", children=children))
-
-                case BlockType.CODE:
-                    code = markdown_block.strip()
-                    code = re.sub(r"^```|```$", "", code, flags=re.MULTILINE).strip()
-                    html_nodes.append(ParentNode(tag="pre", children=[LeafNode(tag="code", value=code)]))
-
-                case BlockType.QUOTE:
-                    lines = markdown_block.splitlines()
-                    cleaned = [re.sub(r"^>\s?", "", line) for line in lines]
-                    content = "\n".join(cleaned).strip()
+                    li_nodes.append(ParentNode(tag="li", children=children))
+                return ParentNode(tag="ul", children=li_nodes)
+
+            case BlockType.ORDERED_LIST:
+                items = markdown_block.splitlines()
+                li_nodes = []
+                for item in items:
+                    content = ORDERED_ITEM_PATTERN.sub("", item).strip()
                     text_nodes = self.text_to_textnodes(content)
                     children = list(map(lambda text_node: text_node_to_html_node(text_node), text_nodes))
-                    html_nodes.append(ParentNode(tag="blockquote", children=children))
-
-                case BlockType.UNORDERED_LIST:
-                    items = markdown_block.splitlines()
-                    li_nodes = []
-                    for item in items:
-                        content = re.sub(r"^[*-]\s+", "", item).strip()
-                        text_nodes = self.text_to_textnodes(content)
-                        children = list(map(lambda text_node: text_node_to_html_node(text_node), text_nodes))
-                        li_nodes.append(ParentNode(tag="li", children=children))
-                    html_nodes.append(ParentNode(tag="ul", children=li_nodes))
-
-                case BlockType.ORDERED_LIST:
-                    items = markdown_block.splitlines()
-                    li_nodes = []
-                    for item in items:
-                        content = re.sub(r"^\d+\.\s+", "", item).strip()
-                        text_nodes = self.text_to_textnodes(content)
-                        children = list(map(lambda text_node: text_node_to_html_node(text_node), text_nodes))
-                        li_nodes.append(ParentNode(tag="li", children=children))
-                    html_nodes.append(ParentNode(tag="ol", children=li_nodes))
-
-        return ParentNode(tag='div', children=html_nodes)
-
-    def __get_split_pattern(self, delimiter: str) -> str:
-        d = re.escape(delimiter)
-        # (?<!{d}) - negative lookbehind: ensures the delimiter is NOT preceded by another delimiter
-        # {d} - matches exactly one instance of the delimiter
-        # (?!{d}) - negative lookahead: ensures the delimiter is NOT followed by another delimiter
-        # Result: matches a single, standalone delimiter and ignores runs like '**' or '***'
-
-        # TODO: Improve on contigous sections such as "_one__two_ **a****b**"
-        return rf'(?<!{d}){d}(?!{d})'
-
-    def __get_image_pattern(self) -> str:
-        return rf'!\[([^\[\]]*)\]\(([^\(\)]*)\)'
-
-    def __get_link_pattern(self) -> str:
-        return rf'(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)'
+                    li_nodes.append(ParentNode(tag="li", children=children))
+                return ParentNode(tag="ol", children=li_nodes)
+
+        return None
@@ -0,0 +1,183 @@
+from __future__ import annotations
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Deque, List, Optional, Sequence, Set, Tuple
+from src.outputs import write_bytes_if_changed
+
+PageJob = Tuple[Path, Path]
+# Renders a page from its source path and text into the encoded HTML to write.
+RenderSource = Callable[[Path, str], bytes]
+# Renders a page straight from its source file to its output, for pages too large to hold in memory.
+RenderFile = Callable[[Path, Path], object]
+
+QUEUE_SIZE = 32
+WRITE_BATCH = 16
+# Reads and writes of each stage that may be in flight at once; on network storage the latency of
+# a request, not its bandwidth, is what the build waits for.
+IO_THREADS = 4
+
+class PipelineStats:
+    def __init__(self):
+        self.read = 0
+        self.rendered = 0
+        self.written = 0
+        self.unchanged = 0
+        self.streamed = 0
+        self.directories = 0
+        self.batches = 0
+
+    def __str__(self) -> str:
+        return (
+            f"Pipeline: read {self.read}, rendered {self.rendered}, wrote {self.written} pages in {self.batches} batches "
+            f"({self.unchanged} unchanged, {self.directories} directories created), streamed {self.streamed}"
+        )
+
+class BuildPipeline:
+    # A reader stage prefetches sources, the calling thread parses and renders them, and a writer
+    # stage creates directories and writes outputs in batches. The stages are joined by bounded
+    # queues, so slow storage overlaps with rendering while memory use stays bounded.
+    def __init__(self, render_source: RenderSource, render_file: RenderFile, stream_threshold: int, queue_size: int = QUEUE_SIZE, write_batch: int = WRITE_BATCH, io_threads: int = IO_THREADS):
+        self.render_source = render_source
+        self.render_file = render_file
+        self.stream_threshold = stream_threshold
+        self.queue_size = queue_size
+        self.write_batch = write_batch
+        self.io_threads = io_threads
+        self.sources: queue.Queue[Optional[Tuple[Path, Path, Optional[str]]]] = queue.Queue(queue_size)
+        self.outputs: queue.Queue[Optional[Tuple[Path, bytes]]] = queue.Queue(queue_size)
+        self.stopped = threading.Event()
+        self.errors: List[BaseException] = []
+        self.stats = PipelineStats()
+
+    # Both helpers give up once a stage failed, so no thread blocks on a queue nobody serves anymore.
+    def __put(self, target: queue.Queue, item) -> bool:
+        while not self.stopped.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __get(self, source: queue.Queue):
+        while not self.stopped.is_set():
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+
+    def __fail(self, error: BaseException) -> None:
+        self.errors.append(error)
+        self.stopped.set()
+
+    def __load(self, src_file: Path) -> Optional[str]:
+        # Large sources are left for the render stage to stream from disk.
+        if src_file.stat().st_size >= self.stream_threshold:
+            return None
+        return src_file.read_text()
+
+    def __hand_on(self, pending: Deque[Tuple[Path, Path, Future]]) -> bool:
+        src_file, dst_file, future = pending.popleft()
+        if not self.__put(self.sources, (src_file, dst_file, future.result())):
+            return False
+        self.stats.read += 1
+        return True
+
+    def __read(self, pages: Sequence[PageJob]) -> None:
+        # Sources are read by a small pool but handed on in build order; at most queue_size reads run
+        # ahead of the queue.
+        pending: Deque[Tuple[Path, Path, Future]] = deque()
+        try:
+            with ThreadPoolExecutor(self.io_threads, thread_name_prefix="pipeline-read") as pool:
+                for src_file, dst_file in pages:
+                    pending.append((src_file, dst_file, pool.submit(self.__load, src_file)))
+                    if len(pending) >= self.queue_size and not self.__hand_on(pending):
+                        break
+                while pending and not self.stopped.is_set():
+                    self.__hand_on(pending)
+                for _, _, future in pending:
+                    future.cancel()
+            self.__put(self.sources, None)
+        except BaseException as error:
+            self.__fail(error)
+
+    def __write_file(self, output: Tuple[Path, bytes]) -> bool:
+        dst_file, html = output
+        return write_bytes_if_changed(dst_file, html)
+
+    def __write(self) -> None:
+        with ThreadPoolExecutor(self.io_threads, thread_name_prefix="pipeline-write") as pool:
+            self.__write_batches(pool)
+
+    def __write_batches(self, pool: ThreadPoolExecutor) -> None:
+        created: Set[Path] = set()
+        done = False
+        while not done:
+            item = self.__get(self.outputs)
+            if item is None:
+                return
+
+            batch = [item]
+            while len(batch) < self.write_batch:
+                try:
+                    item = self.outputs.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    done = True
+                    break
+                batch.append(item)
+
+            try:
+                # Every directory of the batch is created before its files, each one only once per build.
+                for parent in sorted({dst_file.parent for dst_file, _ in batch} - created):
+                    parent.mkdir(parents=True, exist_ok=True)
+                    created.add(parent)
+                    self.stats.directories += 1
+                for changed in pool.map(self.__write_file, batch):
+                    if changed:
+                        self.stats.written += 1
+                    else:
+                        self.stats.unchanged += 1
+                self.stats.batches += 1
+            except BaseException as error:
+                self.__fail(error)
+                return
+
+    def run(self, pages: Sequence[PageJob]) -> PipelineStats:
+        reader = threading.Thread(target=self.__read, args=(pages,), name="pipeline-reader", daemon=True)
+        writer = threading.Thread(target=self.__write, name="pipeline-writer", daemon=True)
+        reader.start()
+        writer.start()
+
+        try:
+            while True:
+                item = self.__get(self.sources)
+                if item is None:
+                    break
+
+                src_file, dst_file, content = item
+                if content is None:
+                    self.render_file(src_file, dst_file)
+                    self.stats.streamed += 1
+                    continue
+
+                html = self.render_source(src_file, content)
+                self.stats.rendered += 1
+                if not self.__put(self.outputs, (dst_file, html)):
+                    break
+            self.__put(self.outputs, None)
+        except BaseException as error:
+            self.__fail(error)
+        finally:
+            reader.join()
+            writer.join()
+
+        if len(self.errors) > 0:
+            raise self.errors[0]
+
+        return self.stats
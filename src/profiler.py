@@ -0,0 +1,190 @@
+from __future__ import annotations
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+class Profiler:
+    # The no-op profiler every parser starts with: each hook is an empty call, so an unprofiled
+    # build only pays a handful of method calls per page and per block.
+    enabled = False
+
+    def wrap(self, stage: str, function: Callable[..., T]) -> Callable[..., T]:
+        return function
+
+    def wrap_iter(self, stage: str, function: Callable[..., Iterator[T]]) -> Callable[..., Iterator[T]]:
+        return function
+
+    def call(self, stage: str, function: Callable[..., T], *args: Any) -> T:
+        return function(*args)
+
+    def start(self) -> None:
+        pass
+
+    def stop(self, stage: str) -> None:
+        pass
+
+    def begin_page(self, path: Path) -> None:
+        pass
+
+    def count_nodes(self, root: Any) -> None:
+        pass
+
+    def end_page(self) -> None:
+        pass
+
+NULL_PROFILER = Profiler()
+
+class PageProfile:
+    __slots__ = ("path", "stages", "nodes")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.stages: Dict[str, float] = {}
+        self.nodes = 0
+
+    @property
+    def seconds(self) -> float:
+        return sum(self.stages.values())
+
+    def to_json(self) -> Dict:
+        return {"path": self.path, "seconds": self.seconds, "nodes": self.nodes, "stages": self.stages}
+
+    def __repr__(self) -> str:
+        return f'PageProfile({self.path}, {self.seconds:.6f}, {self.nodes})'
+
+class BuildProfiler(Profiler):
+    enabled = True
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self.pages: List[PageProfile] = []
+        self.current: Optional[PageProfile] = None
+        # One [start, time spent in nested stages] entry per open stage. Stages record their self time,
+        # so nested stages (inline scanning inside a paragraph) are never counted twice.
+        self.stack: List[List[float]] = []
+
+    def wrap(self, stage: str, function: Callable[..., T]) -> Callable[..., T]:
+        def timed(*args: Any, **kwargs: Any) -> T:
+            self.start()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.stop(stage)
+
+        return timed
+
+    def wrap_iter(self, stage: str, function: Callable[..., Iterator[T]]) -> Callable[..., Iterator[T]]:
+        # Generators run interleaved with their consumer, so only the time spent producing each item counts.
+        def timed(*args: Any, **kwargs: Any) -> Iterator[T]:
+            iterator = function(*args, **kwargs)
+            while True:
+                self.start()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    self.stop(stage)
+                yield item
+
+        return timed
+
+    def call(self, stage: str, function: Callable[..., T], *args: Any) -> T:
+        self.start()
+        try:
+            return function(*args)
+        finally:
+            self.stop(stage)
+
+    def start(self) -> None:
+        self.stack.append([time.perf_counter(), 0.0])
+
+    def stop(self, stage: str) -> None:
+        start, nested = self.stack.pop()
+        elapsed = time.perf_counter() - start
+        if len(self.stack) > 0:
+            self.stack[-1][1] += elapsed
+
+        self.add(stage, elapsed - nested)
+
+    def add(self, stage: str, seconds: float, calls: int = 1) -> None:
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+        self.calls[stage] = self.calls.get(stage, 0) + calls
+        if self.current is not None:
+            self.current.stages[stage] = self.current.stages.get(stage, 0.0) + seconds
+
+    def begin_page(self, path: Path) -> None:
+        self.current = PageProfile(str(path))
+
+    def count_nodes(self, root: Any) -> None:
+        if self.current is None:
+            return
+
+        count = 0
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            count += 1
+            if node.children:
+                stack.extend(node.children)
+        self.current.nodes += count
+
+    def end_page(self) -> None:
+        if self.current is not None:
+            self.pages.append(self.current)
+            self.current = None
+
+    def drain(self) -> BuildProfiler:
+        # Hands the collected data over (worker processes send it back per batch) and starts afresh.
+        drained = BuildProfiler()
+        drained.seconds, drained.calls, drained.pages = self.seconds, self.calls, self.pages
+        self.seconds, self.calls, self.pages = {}, {}, []
+        return drained
+
+    def merge(self, other: BuildProfiler) -> None:
+        for stage, seconds in other.seconds.items():
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+            self.calls[stage] = self.calls.get(stage, 0) + other.calls[stage]
+        self.pages.extend(other.pages)
+
+    def slowest(self, count: int) -> List[PageProfile]:
+        return sorted(self.pages, key=lambda page: page.seconds, reverse=True)[:count]
+
+    def to_json(self, slowest: int = 10) -> Dict:
+        return {
+            "pages": len(self.pages),
+            "seconds": sum(self.seconds.values()),
+            "nodes": sum(page.nodes for page in self.pages),
+            "stages": {
+                stage: {"seconds": seconds, "calls": self.calls[stage]}
+                for stage, seconds in sorted(self.seconds.items(), key=lambda item: item[1], reverse=True)
+            },
+            "slowest": [page.to_json() for page in self.slowest(slowest)],
+        }
+
+    def save(self, path: Path, slowest: int = 10) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_json(slowest), indent=2))
+
+    def format_report(self, slowest: int = 10) -> str:
+        total = sum(self.seconds.values())
+        nodes = sum(page.nodes for page in self.pages)
+        lines = [
+            f"Profiled {len(self.pages)} pages, {nodes} nodes, {total * 1000:.1f}ms in timed stages",
+            f"  {'stage':<24}{'calls':>9}{'total ms':>11}{'share':>8}{'us/call':>10}",
+        ]
+        for stage, seconds in sorted(self.seconds.items(), key=lambda item: item[1], reverse=True):
+            calls = self.calls[stage]
+            share = seconds / total * 100 if total > 0 else 0.0
+            lines.append(f"  {stage:<24}{calls:>9}{seconds * 1000:>11.2f}{share:>7.1f}%{seconds / calls * 1e6:>10.1f}")
+
+        if slowest > 0 and len(self.pages) > 0:
+            lines.append(f"Slowest {min(slowest, len(self.pages))} pages:")
+            for page in self.slowest(slowest):
+                lines.append(f"  {page.seconds * 1000:8.2f}ms {page.nodes:>7} nodes  {page.path}")
+
+        return "\n".join(lines)
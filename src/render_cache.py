@@ -0,0 +1,116 @@
+from __future__ import annotations
+import sqlite3
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+from src.manifest import hash_bytes, hash_text
+
+# Parsed fragments only stay valid for the code that rendered them.
+FRAGMENT_SOURCES = [Path(__file__).parent / name for name in ("parsers/markdown.py", "htmlnode.py", "textnode.py", "urls.py", "images.py")]
+
+def fragment_sources_hash(sources: Iterable[Path] = FRAGMENT_SOURCES) -> str:
+    return hash_bytes(b"".join(source.read_bytes() for source in sources))
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def merge(self, other: CacheStats) -> None:
+        self.hits += other.hits
+        self.disk_hits += other.disk_hits
+        self.misses += other.misses
+        self.evictions += other.evictions
+
+    def __str__(self) -> str:
+        lookups = self.hits + self.disk_hits + self.misses
+        rate = (self.hits + self.disk_hits) / lookups * 100 if lookups > 0 else 0.0
+        return (
+            f"Render cache: {self.hits} hits, {self.disk_hits} disk hits, {self.misses} misses "
+            f"({rate:.1f}% hit rate), {self.evictions} evictions"
+        )
+
+class RenderCache:
+    # Rendered HTML of Markdown blocks, keyed by block type and block text. The memory tier is a
+    # bounded LRU; the optional sqlite tier outlives the build and is shared by worker processes.
+    def __init__(self, max_entries: int = 4096, disk_path: Optional[Path] = None, namespace: str = ""):
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self.namespace = namespace
+        self.stats = CacheStats()
+        self.entries: OrderedDict[Tuple[str, str], str] = OrderedDict()
+        self.pending: List[Tuple[str, str, str]] = []
+        self.db: Optional[sqlite3.Connection] = None
+
+        if disk_path is not None:
+            disk_path.parent.mkdir(parents=True, exist_ok=True)
+            self.db = sqlite3.connect(disk_path, timeout=30)
+            self.db.execute("CREATE TABLE IF NOT EXISTS fragments (key TEXT PRIMARY KEY, namespace TEXT NOT NULL, html TEXT NOT NULL)")
+            # Fragments rendered by other parser versions can never be hit again.
+            with self.db:
+                self.db.execute("DELETE FROM fragments WHERE namespace != ?", (namespace,))
+
+    def use_namespace(self, namespace: str) -> None:
+        # Fragments rendered for the old namespace stay on disk until the next build opens the cache.
+        self.flush()
+        self.entries.clear()
+        self.namespace = namespace
+
+    def __disk_key(self, block_type: str, text: str) -> str:
+        return hash_text(f"{self.namespace}\x00{block_type}\x00{text}")
+
+    def get(self, block_type: str, text: str) -> Optional[str]:
+        key = (block_type, text)
+        html = self.entries.get(key)
+        if html is not None:
+            self.entries.move_to_end(key)
+            self.stats.hits += 1
+            return html
+
+        if self.db is not None:
+            row = self.db.execute("SELECT html FROM fragments WHERE key = ?", (self.__disk_key(block_type, text),)).fetchone()
+            if row is not None:
+                self.stats.disk_hits += 1
+                self.__remember(key, row[0])
+                return row[0]
+
+        self.stats.misses += 1
+        return None
+
+    def put(self, block_type: str, text: str, html: str) -> None:
+        self.__remember((block_type, text), html)
+        if self.db is not None:
+            self.pending.append((self.__disk_key(block_type, text), self.namespace, html))
+
+    def __remember(self, key: Tuple[str, str], html: str) -> None:
+        if self.max_entries <= 0:
+            return
+
+        self.entries[key] = html
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def flush(self) -> None:
+        # New fragments reach the disk tier in one transaction per flush instead of one per block.
+        if self.db is None or len(self.pending) == 0:
+            return
+
+        with self.db:
+            self.db.executemany("INSERT OR IGNORE INTO fragments (key, namespace, html) VALUES (?, ?, ?)", self.pending)
+        self.pending = []
+
+    def close(self) -> None:
+        self.flush()
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __repr__(self) -> str:
+        return f'RenderCache({self.max_entries}, {self.disk_path}, {len(self.entries)})'
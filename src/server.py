@@ -0,0 +1,293 @@
+from __future__ import annotations
+import argparse
+import io
+import threading
+import time
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from string import Template
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+from src.front_matter import split_front_matter
+from src.htmlnode import HTMLNode
+from src.listings import ARCHIVE_ROOT, LISTING_SECTION, TAGS_ROOT, build_listings
+from src.main import HTML_TEMPLATE, TEMPLATE_SOURCE, read_html_template, render_markdown_page, write_page
+from src.page_index import PageIndex
+from src.page_templates import TemplateSet
+from src.parsers.markdown import MarkdownParser
+from src.watch import PollingWatcher
+
+LIVE_RELOAD_PATH = "/__livereload"
+# Only directory URLs below these can be listing pages; everything else skips the listings.
+LISTING_ROOTS = frozenset((LISTING_SECTION, TAGS_ROOT, ARCHIVE_ROOT))
+LIVE_RELOAD_SCRIPT = f"<script>new EventSource('{LIVE_RELOAD_PATH}').onmessage = () => location.reload();</script>"
+
+class ReloadNotifier:
+    def __init__(self):
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def notify(self) -> None:
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version: int, timeout: float) -> int:
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+def with_live_reload(html: str) -> bytes:
+    if "</body>" in html:
+        html = html.replace("</body>", f"{LIVE_RELOAD_SCRIPT}</body>", 1)
+    else:
+        html += LIVE_RELOAD_SCRIPT
+    return html.encode("utf-8")
+
+class PageRenderer:
+    def __init__(self, content_dir: Path, template: Template = HTML_TEMPLATE, templates: Optional[TemplateSet] = None):
+        self.content_dir = content_dir
+        self.template = template
+        self.templates = templates
+        self.cache: Dict[Path, Tuple[int, bytes]] = {}
+        # Front matter of every page and the listing pages built from it, until the content changes.
+        self.index = PageIndex()
+        self.listings: Optional[Dict[str, Tuple[str, HTMLNode, Template]]] = None
+        self.lock = threading.Lock()
+        # Parsers are not shared between request threads.
+        self.local = threading.local()
+
+    def source_for(self, request_path: str) -> Optional[Path]:
+        relative = unquote(urlsplit(request_path).path).lstrip("/")
+        if relative == "" or relative.endswith("/"):
+            candidates = [relative + "index.md"]
+        elif relative.endswith(".html"):
+            candidates = [relative[:-len(".html")] + ".md"]
+        else:
+            candidates = [relative + "/index.md", relative + ".md"]
+
+        root = self.content_dir.resolve()
+        for candidate in candidates:
+            source = (root / candidate).resolve()
+            if root in source.parents and source.is_file():
+                return source
+
+        return None
+
+    def listing_output(self, request_path: str) -> Optional[str]:
+        # Listings are always directory pages below a listing root: /blog/, /tags/python/page/2/index.html.
+        relative = unquote(urlsplit(request_path).path).lstrip("/")
+        if relative.partition("/")[0] not in LISTING_ROOTS:
+            return None
+        if relative.endswith("/index.html"):
+            return relative
+        if "." in relative.rpartition("/")[2]:
+            return None
+        if not relative.endswith("/"):
+            relative += "/"
+        return relative + "index.html"
+
+    def refresh_listings(self) -> None:
+        # Called when the content changed; the listings are built again on the next request for one.
+        with self.lock:
+            self.listings = None
+
+    def __build_listings(self) -> Dict[str, Tuple[str, HTMLNode, Template]]:
+        # Built the way the site build writes them, with drafts included. The caller holds the lock.
+        root = self.content_dir.resolve()
+        pages: Dict[str, Tuple[str, HTMLNode, Template]] = {}
+
+        def collect(output_file: Path, title: str, html_node: HTMLNode, template: Template) -> None:
+            pages[output_file.as_posix()] = (title, html_node, template)
+
+        sources: List[Path] = []
+        for source in root.rglob("*.md"):
+            relative_path = source.relative_to(root)
+            self.index.update(source, relative_path)
+            sources.append(relative_path)
+        self.index.prune(sources)
+        build_listings(root, Path(), self.index, collect, self.template, templates=self.templates, drafts=True)
+
+        return pages
+
+    def render_listing(self, request_path: str) -> Optional[bytes]:
+        output = self.listing_output(request_path)
+        if output is None:
+            return None
+
+        with self.lock:
+            if self.listings is None:
+                self.listings = self.__build_listings()
+            page = self.listings.get(output)
+        if page is None:
+            return None
+
+        title, html_node, template = page
+        sink = io.StringIO()
+        write_page(sink, title, html_node, "/", template)
+        return with_live_reload(sink.getvalue())
+
+    def set_template(self, template: Template) -> None:
+        with self.lock:
+            self.template = template
+            if self.templates is not None:
+                self.templates.set_default(template)
+            self.cache.clear()
+            self.listings = None
+
+    def reload_templates(self) -> None:
+        with self.lock:
+            if self.templates is not None:
+                self.templates.reload()
+            self.cache.clear()
+            self.listings = None
+
+    def render(self, source: Path) -> bytes:
+        mtime_ns = source.stat().st_mtime_ns
+        with self.lock:
+            cached = self.cache.get(source)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+
+        # Drafts are rendered too, so they can be previewed before they are published.
+        meta, body = split_front_matter(source.read_text())
+        with self.lock:
+            template = self.template if self.templates is None else self.templates.select(source, meta.template)
+
+        parser = getattr(self.local, "parser", None)
+        if parser is None:
+            parser = self.local.parser = MarkdownParser()
+
+        sink = io.StringIO()
+        render_markdown_page(sink, body, parser, "/", template, meta.title)
+        page = with_live_reload(sink.getvalue())
+        with self.lock:
+            self.cache[source] = (mtime_ns, page)
+
+        return page
+
+class DevRequestHandler(SimpleHTTPRequestHandler):
+    renderer: PageRenderer
+    notifier: ReloadNotifier
+
+    def do_GET(self) -> None:
+        if urlsplit(self.path).path == LIVE_RELOAD_PATH:
+            self.stream_reload_events()
+            return
+
+        if not self.send_page(include_body=True):
+            super().do_GET()
+
+    def do_HEAD(self) -> None:
+        if not self.send_page(include_body=False):
+            super().do_HEAD()
+
+    def send_page(self, include_body: bool) -> bool:
+        source = self.renderer.source_for(self.path)
+        try:
+            page = self.renderer.render_listing(self.path) if source is None else self.renderer.render(source)
+        except Exception as error:
+            name = self.path if source is None else source.name
+            self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, f"Failed to render {name}: {error}")
+            return True
+        if page is None:
+            return False
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(page)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if include_body:
+            self.wfile.write(page)
+
+        return True
+
+    def stream_reload_events(self) -> None:
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        version = self.notifier.version
+        try:
+            while True:
+                current = self.notifier.wait(version, timeout=15)
+                if current != version:
+                    version = current
+                    self.wfile.write(b"data: reload\n\n")
+                else:
+                    self.wfile.write(b": keepalive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+def watch_sources(renderer: PageRenderer, notifier: ReloadNotifier, static_dir: Path, template_source: Path, interval: float) -> None:
+    roots = [renderer.content_dir, static_dir, template_source]
+    templates_dir = None if renderer.templates is None else renderer.templates.directory
+    if templates_dir is not None:
+        roots.append(templates_dir)
+    watcher = PollingWatcher(roots)
+    while True:
+        time.sleep(interval)
+        changes = watcher.poll()
+        if len(changes) == 0:
+            continue
+
+        # Rendered pages are keyed by mtime and expire on their own; the listings and the template need an explicit reset.
+        if any(change.root == renderer.content_dir for change in changes):
+            renderer.refresh_listings()
+        if any(change.root == template_source for change in changes):
+            try:
+                renderer.set_template(read_html_template(template_source))
+            except OSError as error:
+                print(f"Keeping previous template: {error}")
+                continue
+        if templates_dir is not None and any(change.root == templates_dir for change in changes):
+            renderer.reload_templates()
+
+        notifier.notify()
+
+def create_server(host: str, port: int, content_dir: Path, static_dir: Path, templates_dir: Optional[Path] = None) -> Tuple[ThreadingHTTPServer, PageRenderer, ReloadNotifier]:
+    # Requested sources are resolved paths, so templates are selected relative to the resolved content directory.
+    templates = None if templates_dir is None else TemplateSet(content_dir.resolve(), templates_dir.resolve(), HTML_TEMPLATE)
+    renderer = PageRenderer(content_dir, templates=templates)
+    notifier = ReloadNotifier()
+    handler = type("BoundDevRequestHandler", (DevRequestHandler,), {"renderer": renderer, "notifier": notifier})
+
+    server = ThreadingHTTPServer((host, port), partial(handler, directory=str(static_dir)))
+    server.daemon_threads = True
+
+    return server, renderer, notifier
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(prog="python3 -m src.server")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8888)
+    arg_parser.add_argument("--interval", type=float, default=0.1, help="polling interval for live reload in seconds")
+    arg_parser.add_argument("--templates", type=Path, default=Path("templates"), help="directory of per-section page templates")
+    args = arg_parser.parse_args()
+
+    content_dir = Path("content")
+    static_dir = Path("static")
+    for path in (static_dir, content_dir):
+        if not path.exists():
+            raise FileNotFoundError(f"Required directory not found: {path}")
+
+    server, renderer, notifier = create_server(args.host, args.port, content_dir, static_dir, args.templates)
+    threading.Thread(target=watch_sources, args=(renderer, notifier, static_dir, TEMPLATE_SOURCE, args.interval), daemon=True).start()
+
+    print(f"Serving {content_dir}/ and {static_dir}/ on http://{args.host}:{server.server_address[1]}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,149 @@
+from __future__ import annotations
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+from xml.sax.saxutils import escape, quoteattr
+from src.listings import page_url
+from src.outputs import replace_if_changed, temp_path
+from src.page_index import PageIndex
+from src.urls import resolve_url
+
+SITEMAP_NAMESPACE = "http://www.sitemaps.org/schemas/sitemap/0.9"
+SITEMAP_FILE = "sitemap.xml"
+# Limits of a single sitemap file from the sitemaps.org protocol.
+SITEMAP_MAX_URLS = 50000
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024
+
+# (root-relative URL, last modification time or None)
+SitemapEntry = Tuple[str, Optional[datetime]]
+
+class XmlWriter:
+    # Writes elements straight to the sink as they come, so documents of any size are never held
+    # in memory as a tree.
+    def __init__(self, sink: TextIO):
+        self.sink = sink
+        self.open: List[str] = []
+        self.written = 0
+
+    def write(self, text: str) -> None:
+        self.written += len(text.encode("utf-8"))
+        self.sink.write(text)
+
+    def declaration(self) -> None:
+        self.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+
+    def __attributes(self, attributes: Optional[Dict[str, str]]) -> str:
+        if not attributes:
+            return ""
+        return "".join(f" {key}={quoteattr(value)}" for key, value in attributes.items())
+
+    def start(self, tag: str, attributes: Optional[Dict[str, str]] = None) -> None:
+        self.write(f"{'  ' * len(self.open)}<{tag}{self.__attributes(attributes)}>\n")
+        self.open.append(tag)
+
+    def end(self) -> None:
+        tag = self.open.pop()
+        self.write(f"{'  ' * len(self.open)}</{tag}>\n")
+
+    def element(self, tag: str, text: Optional[str] = None, attributes: Optional[Dict[str, str]] = None) -> None:
+        indent = "  " * len(self.open)
+        if text is None:
+            self.write(f"{indent}<{tag}{self.__attributes(attributes)} />\n")
+        else:
+            self.write(f"{indent}<{tag}{self.__attributes(attributes)}>{escape(text)}</{tag}>\n")
+
+    def close(self) -> None:
+        while self.open:
+            self.end()
+
+def absolute_url(site_url: str, url: str) -> str:
+    # Root-relative URLs go through the resolver, so they carry the base path like the pages do.
+    return site_url.rstrip("/") + resolve_url(url)
+
+def w3c_datetime(moment: datetime) -> str:
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.isoformat(timespec="seconds")
+
+def sitemap_entries(index: PageIndex, listings: Iterable[str], drafts: bool = False) -> Iterator[SitemapEntry]:
+    # Pages come from the page index with the mtime it recorded, listings from their output paths,
+    # so nothing has to be read from disk.
+    for key, entry in sorted(index.entries.items()):
+        if drafts or not entry.meta.draft:
+            yield page_url(key), datetime.fromtimestamp(entry.mtime_ns / 1e9, timezone.utc)
+    for output in sorted(listings):
+        yield "/" + output[:-len("index.html")], None
+
+def _open_sitemap(path: Path) -> Tuple[TextIO, XmlWriter]:
+    sink = path.open("w", encoding="utf-8")
+    writer = XmlWriter(sink)
+    writer.declaration()
+    writer.start("urlset", {"xmlns": SITEMAP_NAMESPACE})
+    return sink, writer
+
+def write_sitemaps(dst_dir: Path, site_url: str, entries: Iterable[SitemapEntry], max_urls: int = SITEMAP_MAX_URLS, max_bytes: int = SITEMAP_MAX_BYTES, previous: Iterable[str] = ()) -> List[Path]:
+    # Entries are written to sitemap-1.xml, sitemap-2.xml, ... as they come. A site that fits in one
+    # file gets a plain sitemap.xml; a larger one gets a sitemap.xml index of its parts. Every file
+    # is written to a temporary path first and only replaces its output when its content changed.
+    dst_dir.mkdir(parents=True, exist_ok=True)
+    parts: List[Path] = [dst_dir / "sitemap-1.xml"]
+    sink, writer = _open_sitemap(temp_path(parts[0]))
+    count = 0
+    # Room for the closing tag of the urlset.
+    limit = max_bytes - len("</urlset>\n")
+
+    try:
+        for url, modified in entries:
+            entry = [("loc", absolute_url(site_url, url))]
+            if modified is not None:
+                entry.append(("lastmod", w3c_datetime(modified)))
+            size = sum(len(f"    <{tag}>{escape(text)}</{tag}>\n".encode("utf-8")) for tag, text in entry) + len("  <url>\n  </url>\n")
+
+            if count >= max_urls or (count > 0 and writer.written + size > limit):
+                writer.close()
+                sink.close()
+                parts.append(dst_dir / f"sitemap-{len(parts) + 1}.xml")
+                sink, writer = _open_sitemap(temp_path(parts[-1]))
+                count = 0
+
+            writer.start("url")
+            for tag, text in entry:
+                writer.element(tag, text)
+            writer.end()
+            count += 1
+
+        writer.close()
+    except BaseException:
+        sink.close()
+        for part in parts:
+            temp_path(part).unlink(missing_ok=True)
+        raise
+    sink.close()
+
+    index_path = dst_dir / SITEMAP_FILE
+    if len(parts) == 1:
+        replace_if_changed(temp_path(parts[0]), index_path)
+        written = [index_path]
+    else:
+        for part in parts:
+            replace_if_changed(temp_path(part), part)
+        with temp_path(index_path).open("w", encoding="utf-8") as sink:
+            writer = XmlWriter(sink)
+            writer.declaration()
+            writer.start("sitemapindex", {"xmlns": SITEMAP_NAMESPACE})
+            for part in parts:
+                writer.start("sitemap")
+                writer.element("loc", absolute_url(site_url, f"/{part.name}"))
+                writer.end()
+            writer.close()
+        replace_if_changed(temp_path(index_path), index_path)
+        written = [index_path, *parts]
+
+    # Parts left over from an earlier, larger build. Only files it wrote are removed, so sitemaps
+    # copied from the static directory stay.
+    for name in previous:
+        stale = dst_dir / name
+        if stale not in written:
+            stale.unlink(missing_ok=True)
+
+    return written
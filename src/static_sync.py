@@ -0,0 +1,183 @@
+from __future__ import annotations
+import os
+import shutil
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, List, Optional, Set
+from src.manifest import hash_file, remove_outputs
+from src.outputs import record_change, write_if_changed
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# ioctl request number of FICLONE on Linux: share the source extents copy-on-write (btrfs, xfs, ...).
+FICLONE = 0x40049409
+
+# Source size, source mtime and output size; transformed assets have a fourth element, 1.
+AssetState = List[int]
+AssetTransform = Callable[[str], str]
+
+class SyncStats:
+    def __init__(self):
+        self.copied_files = 0
+        self.copied_bytes = 0
+        self.linked_files = 0
+        self.linked_bytes = 0
+        self.skipped_files = 0
+        self.skipped_bytes = 0
+        self.transformed_files = 0
+        self.transformed_bytes = 0
+        self.removed_files = 0
+
+    def __str__(self) -> str:
+        transformed = ""
+        if self.transformed_files > 0:
+            transformed = f"transformed {self.transformed_files} ({format_bytes(self.transformed_bytes)}), "
+        return (
+            f"Static assets: copied {self.copied_files} files ({format_bytes(self.copied_bytes)}), "
+            f"linked {self.linked_files} ({format_bytes(self.linked_bytes)}), "
+            f"{transformed}skipped {self.skipped_files} ({format_bytes(self.skipped_bytes)}), "
+            f"removed {self.removed_files}"
+        )
+
+def format_bytes(size: int) -> str:
+    if size < 1024:
+        return f"{size} B"
+
+    value = size / 1024
+    for unit in ("KiB", "MiB"):
+        if value < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+
+    return f"{value:.1f} GiB"
+
+def _reflink(src: BinaryIO, dst: BinaryIO) -> bool:
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    except OSError:
+        return False
+    return True
+
+def _copy_file_range(src: BinaryIO, dst: BinaryIO) -> bool:
+    if not hasattr(os, "copy_file_range"):
+        return False
+
+    remaining = os.fstat(src.fileno()).st_size
+    try:
+        while remaining > 0:
+            copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+    except OSError:
+        src.seek(0)
+        dst.seek(0)
+        dst.truncate()
+        return False
+
+    return remaining == 0
+
+def link_or_copy(src: Path, dst: Path, hardlink: bool = True) -> bool:
+    # Returns True when the data is shared with the source (hardlink or reflink) rather than copied.
+    tmp = dst.with_name(f".{dst.name}.sync")
+    tmp.unlink(missing_ok=True)
+
+    if hardlink:
+        try:
+            os.link(src, tmp)
+            os.replace(tmp, dst)
+            return True
+        except OSError:
+            tmp.unlink(missing_ok=True)
+
+    with src.open("rb") as src_file, tmp.open("wb") as dst_file:
+        linked = _reflink(src_file, dst_file)
+        if not linked and not _copy_file_range(src_file, dst_file):
+            shutil.copyfileobj(src_file, dst_file, 1 << 20)
+
+    shutil.copystat(src, tmp)
+    os.replace(tmp, dst)
+    return linked
+
+def _asset_state(src_stat: os.stat_result, dst_size: int, transformed: bool) -> AssetState:
+    state = [src_stat.st_size, src_stat.st_mtime_ns, dst_size]
+    if transformed:
+        state.append(1)
+    return state
+
+def _is_unchanged(src: Path, src_stat: os.stat_result, dst: Path, recorded: AssetState | None, checksum: bool, transformed: bool = False) -> bool:
+    try:
+        dst_stat = dst.stat()
+    except FileNotFoundError:
+        return False
+
+    # Outputs of transformed assets differ from their sources, so only the recorded state tells
+    # whether they are current; it also tells when a transform was turned on or off.
+    if recorded is not None:
+        if _asset_state(src_stat, dst_stat.st_size, transformed) == recorded:
+            return True
+    elif transformed:
+        return False
+    elif src_stat.st_size == dst_stat.st_size and src_stat.st_mtime_ns == dst_stat.st_mtime_ns:
+        return True
+
+    return checksum and src_stat.st_size == dst_stat.st_size and hash_file(src) == hash_file(dst)
+
+def sync_static(src: Path, dst: Path, state: Dict[str, AssetState], checksum: bool = False, hardlink: bool = True, transforms: Optional[Dict[str, AssetTransform]] = None) -> SyncStats:
+    # Assets with a suffix in transforms (.css -> minify_css) are rewritten instead of linked or copied.
+    if not src.exists():
+        raise FileNotFoundError(f"Static directory not found: {src}")
+    if transforms is None:
+        transforms = {}
+
+    stats = SyncStats()
+    seen: Set[str] = set()
+    created_dirs: Set[Path] = set()
+
+    for dirpath, _, filenames in os.walk(src):
+        for filename in filenames:
+            src_file = Path(dirpath) / filename
+            relative_path = src_file.relative_to(src).as_posix()
+            dst_file = dst / relative_path
+            src_stat = src_file.stat()
+            transform = transforms.get(src_file.suffix)
+            seen.add(relative_path)
+
+            if _is_unchanged(src_file, src_stat, dst_file, state.get(relative_path), checksum, transform is not None):
+                stats.skipped_files += 1
+                stats.skipped_bytes += src_stat.st_size
+                state[relative_path] = _asset_state(src_stat, dst_file.stat().st_size, transform is not None)
+                continue
+
+            if dst_file.parent not in created_dirs:
+                dst_file.parent.mkdir(parents=True, exist_ok=True)
+                created_dirs.add(dst_file.parent)
+
+            if transform is not None:
+                # A hardlinked output would share the source's inode, so it is replaced rather than written through.
+                write_if_changed(dst_file, transform(src_file.read_text()))
+                stats.transformed_files += 1
+                stats.transformed_bytes += src_stat.st_size
+                state[relative_path] = _asset_state(src_stat, dst_file.stat().st_size, True)
+                continue
+
+            if link_or_copy(src_file, dst_file, hardlink):
+                stats.linked_files += 1
+                stats.linked_bytes += src_stat.st_size
+            else:
+                stats.copied_files += 1
+                stats.copied_bytes += src_stat.st_size
+            record_change(dst_file)
+            state[relative_path] = [src_stat.st_size, src_stat.st_mtime_ns, src_stat.st_size]
+
+    stale = [relative_path for relative_path in state if relative_path not in seen]
+    for relative_path in stale:
+        del state[relative_path]
+    remove_outputs([dst / relative_path for relative_path in stale], dst)
+    stats.removed_files = len(stale)
+
+    return stats
@@ -0,0 +1,127 @@
+import contextlib
+import gzip
+import io
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from src.compress import CompressionStore, compress_bytes, sidecar_path
+from src.main import main
+from src.minify import use_minify
+from src.outputs import drain_changes
+
+class CompressionStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.docs = self.root / "docs"
+        (self.docs / "blog").mkdir(parents=True)
+        (self.docs / "index.html").write_text("<p>home</p>" * 100)
+        (self.docs / "blog" / "index.html").write_text("<p>blog</p>" * 100)
+        (self.docs / "index.css").write_text("a{}")
+        (self.docs / "image.png").write_bytes(bytes(1000))
+        self.path = self.root / "compression.json"
+
+    def tearDown(self):
+        drain_changes()
+        self.tmp.cleanup()
+
+    def compress(self, **kwargs) -> CompressionStore:
+        store = CompressionStore.load(self.path, ("gz",), **kwargs)
+        store.update(self.docs)
+        store.save()
+        return store
+
+    def test_writes_sidecars_of_text_outputs(self):
+        store = self.compress()
+
+        sidecar = sidecar_path(self.docs / "index.html", "gz")
+        self.assertEqual(gzip.decompress(sidecar.read_bytes()), (self.docs / "index.html").read_bytes())
+        self.assertTrue(sidecar_path(self.docs / "blog" / "index.html", "gz").exists())
+        self.assertFalse(sidecar_path(self.docs / "image.png", "gz").exists())
+        # Compression makes a three byte stylesheet larger.
+        self.assertFalse(sidecar_path(self.docs / "index.css", "gz").exists())
+        self.assertEqual((store.stats.compressed, store.stats.skipped), (2, 1))
+        self.assertEqual(sorted(path.name for path in drain_changes()), ["index.html.gz", "index.html.gz"])
+
+    def test_only_changed_content_is_compressed_again(self):
+        self.compress()
+        index = self.docs / "index.html"
+        os.utime(index, ns=(index.stat().st_atime_ns, index.stat().st_mtime_ns + 10_000_000))
+        (self.docs / "blog" / "index.html").write_text("<p>new</p>" * 100)
+
+        store = self.compress()
+        self.assertEqual((store.stats.compressed, store.stats.unchanged, store.stats.reused), (1, 1, 1))
+        self.assertEqual(gzip.decompress(sidecar_path(self.docs / "blog" / "index.html", "gz").read_bytes()), b"<p>new</p>" * 100)
+
+        # A deleted sidecar is written again.
+        sidecar_path(index, "gz").unlink()
+        self.assertEqual(self.compress().stats.compressed, 1)
+        self.assertTrue(sidecar_path(index, "gz").exists())
+
+    def test_max_ratio_is_configurable(self):
+        self.compress()
+        store = self.compress(max_ratio=0.001)
+        self.assertEqual(store.stats.skipped, 3)
+        self.assertFalse(sidecar_path(self.docs / "index.html", "gz").exists())
+
+        store = self.compress(max_ratio=10)
+        self.assertEqual(store.stats.compressed, 3)
+        self.assertEqual(json.loads(self.path.read_text())["max_ratio"], 10)
+
+    def test_sidecars_of_removed_outputs_are_removed(self):
+        self.compress()
+        (self.docs / "blog" / "index.html").unlink()
+
+        store = self.compress()
+        self.assertEqual(store.stats.removed, 1)
+        self.assertFalse((self.docs / "blog").exists())
+
+    def test_parallel_compression(self):
+        store = CompressionStore(None, ("gz",))
+        store.update(self.docs, jobs=2)
+        self.assertEqual(store.stats.compressed, 2)
+        self.assertEqual(sidecar_path(self.docs / "index.html", "gz").read_bytes(), compress_bytes((self.docs / "index.html").read_bytes(), "gz"))
+
+    def test_unknown_encoding(self):
+        with self.assertRaises(ValueError):
+            compress_bytes(b"", "zstd")
+
+class CompressionBuildTestCase(unittest.TestCase):
+
+    def setUp(self):
+        # Changes recorded by other tests carry paths outside this build.
+        drain_changes()
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        Path("static").mkdir()
+        Path("content").mkdir()
+        Path("content/index.md").write_text("# Home\n\n" + "Some text. " * 100)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        use_minify(False)
+        drain_changes()
+        self.tmp.cleanup()
+
+    def build(self, *args: str) -> None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            main(["/", *args])
+
+    def test_sidecars_are_removed_when_compression_is_turned_off(self):
+        self.build("--compress")
+        sidecar = sidecar_path(Path("docs/index.html"), "gz")
+        self.assertTrue(sidecar.exists())
+
+        Path("content/index.md").write_text("# Home\n\n" + "New text. " * 100)
+        self.build()
+        self.assertIn("New text.", Path("docs/index.html").read_text())
+        self.assertFalse(sidecar.exists())
+        self.assertEqual(json.loads(Path(".cache/compression.json").read_text())["outputs"], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+import xml.etree.ElementTree as ElementTree
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from src.feeds import feed_posts, write_feeds
+from src.page_index import PageIndex
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+
+class FeedsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.content = self.root / "content"
+        self.docs = self.root / "docs"
+        (self.content / "blog").mkdir(parents=True)
+        self.docs.mkdir()
+        pages = {
+            "index.md": "# Home",
+            "blog/old.md": "---\ndate: 2023-05-01\n---\n# Old & busted",
+            "blog/new.md": "---\ndate: 2024-01-02T10:00:00Z\ntags: [python]\n---\n# New",
+            "blog/undated.md": "# Undated",
+            "blog/draft.md": "---\ndate: 2025-01-01\ndraft: true\n---\n# Draft",
+        }
+        self.index = PageIndex()
+        for key, text in pages.items():
+            (self.content / key).write_text(text)
+            self.index.update(self.content / key, Path(key))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_feed_posts_are_dated_published_posts(self):
+        self.assertEqual([key for key, _ in feed_posts(self.index)], ["blog/new.md", "blog/old.md"])
+        self.assertEqual([key for key, _ in feed_posts(self.index, size=1)], ["blog/new.md"])
+        self.assertEqual([key for key, _ in feed_posts(self.index, drafts=True)][0], "blog/draft.md")
+
+    def test_atom_feed(self):
+        write_feeds(self.docs, "https://example.com", "Home", self.index)
+        feed = ElementTree.parse(self.docs / "atom.xml").getroot()
+
+        self.assertEqual(feed.findtext(f"{ATOM}updated"), "2024-01-02T10:00:00+00:00")
+        self.assertEqual(feed.findtext(f"{ATOM}author/{ATOM}name"), "Home")
+        entries = feed.findall(f"{ATOM}entry")
+        self.assertEqual([entry.findtext(f"{ATOM}title") for entry in entries], ["New", "Old & busted"])
+        self.assertEqual(entries[0].findtext(f"{ATOM}id"), "https://example.com/blog/new.html")
+        self.assertEqual(entries[0].find(f"{ATOM}category").get("term"), "python")
+
+    def test_atom_feed_author(self):
+        write_feeds(self.docs, "https://example.com", "Home", self.index, author="Jane Doe")
+        feed = ElementTree.parse(self.docs / "atom.xml").getroot()
+        self.assertEqual(feed.findtext(f"{ATOM}author/{ATOM}name"), "Jane Doe")
+
+    def test_empty_atom_feed_is_dated_by_the_newest_page(self):
+        os.utime(self.content / "index.md", (1700000000, 1700000000))
+        os.utime(self.content / "blog" / "undated.md", (1600000000, 1600000000))
+        index = PageIndex()
+        for key in ["index.md", "blog/undated.md"]:
+            index.update(self.content / key, Path(key))
+
+        write_feeds(self.docs, "https://example.com", "Home", index)
+        feed = ElementTree.parse(self.docs / "atom.xml").getroot()
+        self.assertEqual(feed.findall(f"{ATOM}entry"), [])
+        self.assertEqual(feed.findtext(f"{ATOM}updated"), "2023-11-14T22:13:20+00:00")
+
+    def test_atom_feed_without_pages_is_dated_by_the_build(self):
+        write_feeds(self.docs, "https://example.com", "Home", PageIndex())
+        updated = datetime.fromisoformat(ElementTree.parse(self.docs / "atom.xml").getroot().findtext(f"{ATOM}updated"))
+        self.assertLess(datetime.now(timezone.utc) - updated, timedelta(minutes=1))
+
+    def test_rss_feed(self):
+        write_feeds(self.docs, "https://example.com", "Home", self.index)
+        channel = ElementTree.parse(self.docs / "rss.xml").getroot().find("channel")
+
+        items = channel.findall("item")
+        self.assertEqual([item.findtext("link") for item in items], ["https://example.com/blog/new.html", "https://example.com/blog/old.html"])
+        self.assertEqual(items[1].findtext("pubDate"), "Mon, 01 May 2023 00:00:00 +0000")
@@ -0,0 +1,124 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from src.fingerprint import ASSET_MANIFEST_FILE, AssetFingerprints, fingerprinted_path
+from src.main import HTML_TEMPLATE, build_content, rebuild_changes
+from src.manifest import BuildManifest
+from src.outputs import drain_changes
+from src.parsers.markdown import MarkdownParser
+from src.urls import use_assets
+from src.watch import Change, ChangeType
+
+class FingerprintedPathTestCase(unittest.TestCase):
+
+    def test_hash_goes_before_the_suffix(self):
+        self.assertEqual(fingerprinted_path("index.css", "0123456789abcdef"), "index.0123456789.css")
+        self.assertEqual(fingerprinted_path("images/a.b.png", "0123456789abcdef"), "images/a.b.0123456789.png")
+        self.assertEqual(fingerprinted_path("LICENSE", "0123456789abcdef"), "LICENSE.0123456789")
+        self.assertEqual(fingerprinted_path(".nojekyll", "0123456789abcdef"), ".nojekyll.0123456789")
+
+class AssetFingerprintsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.static = self.root / "static"
+        self.docs = self.root / "docs"
+        (self.static / "images").mkdir(parents=True)
+        (self.static / "index.css").write_text("body { color: red; }\n")
+        (self.static / "images" / "a.png").write_bytes(b"\x89PNG a")
+        self.path = self.root / "fingerprints.json"
+
+    def tearDown(self):
+        use_assets({})
+        drain_changes()
+        self.tmp.cleanup()
+
+    def fingerprints(self) -> AssetFingerprints:
+        fingerprints = AssetFingerprints.load(self.path)
+        fingerprints.update(self.static)
+        fingerprints.write_copies(self.static, self.docs)
+        fingerprints.write_manifest(self.docs)
+        fingerprints.save()
+        return fingerprints
+
+    def test_writes_copies_and_manifest(self):
+        fingerprints = self.fingerprints()
+        urls = fingerprints.urls()
+
+        self.assertEqual(sorted(urls), ["/images/a.png", "/index.css"])
+        css = self.docs / urls["/index.css"][1:]
+        self.assertEqual(css.read_text(), "body { color: red; }\n")
+        self.assertTrue((self.docs / urls["/images/a.png"][1:]).exists())
+
+        manifest = json.loads((self.docs / ASSET_MANIFEST_FILE).read_text())
+        self.assertEqual(manifest["/index.css"]["url"], urls["/index.css"])
+        self.assertEqual(manifest["/index.css"]["size"], css.stat().st_size)
+
+    def test_unchanged_assets_are_not_hashed_again(self):
+        self.fingerprints()
+        fingerprints = self.fingerprints()
+        self.assertEqual((fingerprints.stats.hashed, fingerprints.stats.reused, fingerprints.stats.written), (0, 2, 0))
+
+    def test_transformed_copies(self):
+        fingerprints = AssetFingerprints.load(self.path)
+        fingerprints.update(self.static)
+        fingerprints.write_copies(self.static, self.docs, transforms={".css": str.upper})
+        fingerprints.write_copies(self.static, self.docs, transforms={".css": str.upper})
+
+        self.assertEqual((self.docs / fingerprints.urls()["/index.css"][1:]).read_text(), "BODY { COLOR: RED; }\n")
+        self.assertEqual(fingerprints.stats.written, 2)
+
+    def test_changed_and_removed_assets_drop_their_copies(self):
+        old = self.fingerprints().urls()
+        (self.static / "index.css").write_text("body { color: blue; }\n")
+        (self.static / "images" / "a.png").unlink()
+
+        fingerprints = self.fingerprints()
+        new = fingerprints.urls()
+        self.assertNotEqual(new["/index.css"], old["/index.css"])
+        self.assertNotIn("/images/a.png", new)
+        self.assertFalse((self.docs / old["/index.css"][1:]).exists())
+        self.assertFalse((self.docs / "images").exists())
+        self.assertEqual((fingerprints.stats.hashed, fingerprints.stats.removed), (1, 2))
+
+    def test_copies_written_by_an_earlier_run_are_removed(self):
+        old = self.fingerprints().urls()
+        (self.static / "index.css").write_text("body { color: blue; }\n")
+        # A run that hashed the change but never wrote the copies, like a build without --fingerprint.
+        interrupted = AssetFingerprints.load(self.path)
+        interrupted.update(self.static)
+        interrupted.save()
+
+        fingerprints = self.fingerprints()
+        self.assertEqual(fingerprints.stats.hashed, 0)
+        self.assertFalse((self.docs / old["/index.css"][1:]).exists())
+        self.assertTrue((self.docs / fingerprints.urls()["/index.css"][1:]).exists())
+        self.assertEqual(fingerprints.stats.removed, 1)
+
+    def test_pages_link_to_fingerprinted_assets(self):
+        content = self.root / "content"
+        content.mkdir()
+        (content / "index.md").write_text("# Home\n\n![a](/images/a.png)\n")
+        fingerprints = self.fingerprints()
+        use_assets(fingerprints.urls())
+        manifest = BuildManifest(self.root / "manifest.json", "", "/site/")
+        parser = MarkdownParser()
+
+        build_content(content, self.docs, parser, "/site/", manifest)
+        html = (self.docs / "index.html").read_text()
+        self.assertIn(f"href='/site{fingerprints.urls()['/index.css']}'", html)
+        self.assertIn(f"src='/site{fingerprints.urls()['/images/a.png']}'", html)
+
+        # A changed asset gets a new name, so every page linking to it is rendered again.
+        (self.static / "index.css").write_text("body { color: blue; }\n")
+        rebuilt, _ = rebuild_changes([Change(ChangeType.MODIFIED, self.static / "index.css", self.static)], self.static, content, self.docs, parser, manifest, HTML_TEMPLATE, fingerprints=fingerprints)
+        html = (self.docs / "index.html").read_text()
+        self.assertIn(self.docs / "index.html", rebuilt)
+        self.assertIn(f"href='/site{fingerprints.urls()['/index.css']}'", html)
+        self.assertTrue((self.docs / fingerprints.urls()["/index.css"][1:]).exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import io
+import unittest
+from src.front_matter import PageMeta, read_front_matter, split_front_matter
+
+YAML_PAGE = """---
+title: "Hello: world"
+date: 2024-03-01
+tags:
+  - python
+  - 'web'
+draft: true
+template: blog/post
+---
+
+# Heading
+
+Body
+"""
+
+TOML_PAGE = """+++
+title = 'TOML page'
+date = "2024-03-01T10:00:00Z"
+tags = ["a", b]
+draft = false
++++
+# Heading
+"""
+
+class FrontMatterTestCase(unittest.TestCase):
+
+    def test_yaml_front_matter(self):
+        meta, body = split_front_matter(YAML_PAGE)
+
+        self.assertEqual(meta, PageMeta("Hello: world", "2024-03-01", ["python", "web"], True, "blog/post"))
+        self.assertEqual(body, "# Heading\n\nBody\n")
+
+    def test_toml_front_matter(self):
+        meta, body = split_front_matter(TOML_PAGE)
+
+        self.assertEqual(meta, PageMeta("TOML page", "2024-03-01T10:00:00Z", ["a", "b"], False, None))
+        self.assertEqual(body, "# Heading\n")
+
+    def test_title_falls_back_to_first_line(self):
+        self.assertEqual(split_front_matter("# Plain page\n\nBody"), (PageMeta("Plain page"), "# Plain page\n\nBody"))
+        self.assertEqual(split_front_matter("---\ndraft: true\n---\n# Heading\n")[0], PageMeta("Heading", draft=True))
+
+    def test_reading_lines_matches_splitting(self):
+        for page in (YAML_PAGE, TOML_PAGE, "# Plain page\n\nBody"):
+            lines = io.StringIO(page)
+            meta, first_line = read_front_matter(lines)
+            expected_meta, body = split_front_matter(page)
+
+            self.assertEqual(meta, expected_meta)
+            self.assertEqual(first_line + lines.read(), body)
+
+    def test_invalid_front_matter(self):
+        for page in ("---\ntitle: a\n", "---\nno separator\n---\n", "---\ndate: yesterday\n---\n", "---\ndraft: maybe\n---\n"):
+            with self.assertRaises(ValueError):
+                split_front_matter(page)
+        with self.assertRaises(ValueError):
+            read_front_matter(io.StringIO("+++\ntitle = 'a'\n"))
+
+    def test_horizontal_rule_like_first_line_is_body(self):
+        self.assertEqual(split_front_matter("--- not a fence\n"), (PageMeta("--- not a fence"), "--- not a fence\n"))
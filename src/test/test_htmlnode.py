@@ -1,3 +1,4 @@
+import io
 import unittest
 from src.htmlnode import HTMLNode, LeafNode, ParentNode
 
@@ -66,3 +67,47 @@ class HTMLNodeTestCase(unittest.TestCase):
     def test_to_html_with_no_children(self):
         node = ParentNode(tag="div", children=[])
         self.assertRaises(ValueError, node.to_html)
+
+    def test_render_writes_chunks_in_order(self):
+        node = ParentNode(tag="p", children=[LeafNode(tag="b", value="bold"), LeafNode(tag=None, value=" text")])
+        chunks = []
+        node.render(chunks.append)
+        self.assertEqual(chunks, ["<p>", "<b>bold</b>", " text", "</p>"])
+
+    def test_write_html_matches_to_html(self):
+        node = ParentNode(
+            tag="div",
+            children=[
+                ParentNode(tag="ul", children=[ParentNode(tag="li", children=[LeafNode(tag="a", value="link", props={"href": "/x"})])]),
+                LeafNode(tag="p", value="paragraph"),
+            ],
+        )
+        sink = io.StringIO()
+        node.write_html(sink)
+        self.assertEqual(sink.getvalue(), node.to_html())
+        self.assertEqual(sink.getvalue(), "<div><ul><li><a href='/x'>link</a></li></ul><p>paragraph</p></div>")
+
+    def test_to_html_with_deep_tree(self):
+        node: HTMLNode = LeafNode(tag=None, value="leaf")
+        for _ in range(5000):
+            node = ParentNode(tag="span", children=[node])
+
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span>" * 5000 + "leaf"))
+        self.assertTrue(html.endswith("</span>" * 5000))
+
+    def test_html_node_to_html_not_implemented(self):
+        self.assertRaises(NotImplementedError, HTMLNode(tag="p").to_html)
+
+    def test_props_are_read_only_copy(self):
+        props = {"href": "/a"}
+        node = LeafNode(tag="a", value="link", props=props)
+        props["href"] = "/b"
+
+        self.assertEqual(node.props, {"href": "/a"})
+        with self.assertRaises(TypeError):
+            node.props["href"] = "/c" # type: ignore[index]
+
+    def test_nodes_have_no_instance_dict(self):
+        for node in (HTMLNode(), LeafNode(value="text"), ParentNode(tag="p", children=[LeafNode(value="text")])):
+            self.assertFalse(hasattr(node, "__dict__"))
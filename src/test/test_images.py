@@ -0,0 +1,226 @@
+import random
+import struct
+import tempfile
+import unittest
+import zlib
+from pathlib import Path
+from src.images import ImageInfo, ImageStore, PngImage, image_size, process_image, read_png, resize_png, use_images, variant_path, write_png
+from src.outputs import drain_changes
+from src.textnode import TextNode, TextType, text_node_to_html_node
+from src.urls import using_base_path
+
+def png_chunk(kind: bytes, body: bytes) -> bytes:
+    return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+
+def paeth(left: int, up: int, upper_left: int) -> int:
+    estimate = left + up - upper_left
+    distances = [abs(estimate - left), abs(estimate - up), abs(estimate - upper_left)]
+    return (left, up, upper_left)[distances.index(min(distances))]
+
+def encode_png(width: int, height: int, color_type: int, channels: int, pixels: bytes, filters, extra: bytes = b"") -> bytes:
+    # Reference encoder applying the given filter type to every row, one byte at a time.
+    stride = width * channels
+    data = bytearray()
+    previous = bytes(stride)
+    for y in range(height):
+        row = pixels[y * stride:(y + 1) * stride]
+        kind = filters[y % len(filters)]
+        data.append(kind)
+        for i, value in enumerate(row):
+            left = row[i - channels] if i >= channels else 0
+            upper_left = previous[i - channels] if i >= channels else 0
+            predictor = [0, left, previous[i], (left + previous[i]) // 2, paeth(left, previous[i], upper_left)][kind]
+            data.append((value - predictor) & 0xFF)
+        previous = row
+
+    header = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + png_chunk(b"IHDR", header) + extra + png_chunk(b"IDAT", zlib.compress(bytes(data))) + png_chunk(b"IEND", b"")
+
+class PngTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.random = random.Random(4)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def pixels(self, size: int) -> bytes:
+        return bytes(self.random.randrange(256) for _ in range(size))
+
+    def test_decodes_every_filter_type(self):
+        for color_type, channels in ((0, 1), (2, 3), (4, 2), (6, 4)):
+            pixels = self.pixels(9 * 5 * channels)
+            path = self.root / f"{color_type}.png"
+            path.write_bytes(encode_png(9, 5, color_type, channels, pixels, [0, 1, 2, 3, 4]))
+
+            image = read_png(path)
+            self.assertEqual((image.width, image.height, image.channels), (9, 5, channels))
+            self.assertEqual(bytes(image.pixels), pixels)
+            self.assertEqual(image_size(path), (9, 5))
+
+    def test_expands_palettes(self):
+        path = self.root / "palette.png"
+        palette = png_chunk(b"PLTE", bytes([255, 0, 0, 0, 0, 255])) + png_chunk(b"tRNS", bytes([128]))
+        path.write_bytes(encode_png(2, 1, 3, 1, bytes([1, 0]), [0], palette))
+
+        image = read_png(path)
+        self.assertEqual(image.channels, 4)
+        self.assertEqual(bytes(image.pixels), bytes([0, 0, 255, 255, 255, 0, 0, 128]))
+
+    def test_unsupported_formats(self):
+        path = self.root / "interlaced.png"
+        path.write_bytes(b"\x89PNG\r\n\x1a\n" + png_chunk(b"IHDR", struct.pack(">IIBBBBB", 4, 4, 8, 2, 0, 0, 1)))
+        with self.assertRaises(ValueError):
+            read_png(path)
+        self.assertEqual(image_size(path), (4, 4))
+
+    def test_corrupt_files(self):
+        png = encode_png(6, 4, 2, 3, self.pixels(6 * 4 * 3), [0])
+        idat = png.index(b"IDAT")
+        length = struct.unpack(">I", png[idat - 4:idat])[0]
+        # A truncated compressed stream, rows missing from a complete one, and a palette index without colour.
+        truncated = png[:idat + 4 + length // 2]
+        short = png[:idat - 4] + png_chunk(b"IDAT", zlib.compress(bytes(10))) + png_chunk(b"IEND", b"")
+        palette = encode_png(2, 1, 3, 1, bytes([0, 5]), [0], png_chunk(b"PLTE", bytes(3)))
+
+        for name, data in (("truncated", truncated), ("short", short), ("palette", palette)):
+            with self.subTest(name=name):
+                path = self.root / f"{name}.png"
+                path.write_bytes(data)
+                with self.assertRaises(ValueError):
+                    read_png(path)
+
+        path = self.root / "truncated.png"
+        self.assertEqual(process_image(path, "digest", self.root / "cache", (2, 4)), ("digest", (6, 4), []))
+
+    def test_write_round_trip(self):
+        for channels in (1, 2, 3, 4):
+            image = PngImage(7, 4, channels, bytearray(self.pixels(7 * 4 * channels)))
+            path = self.root / f"{channels}.png"
+            write_png(path, image)
+            self.assertEqual(bytes(read_png(path).pixels), bytes(image.pixels))
+
+    def test_resize_averages_boxes(self):
+        image = PngImage(4, 2, 1, bytearray([0, 10, 20, 30, 40, 50, 60, 70]))
+        resized = resize_png(image, 2)
+
+        self.assertEqual((resized.width, resized.height), (2, 1))
+        self.assertEqual(list(resized.pixels), [(0 + 10 + 40 + 50 + 2) // 4, (20 + 30 + 60 + 70 + 2) // 4])
+
+        rgba = resize_png(PngImage(3, 3, 4, bytearray([10, 20, 30, 255] * 9)), 2)
+        self.assertEqual(bytes(rgba.pixels), bytes([10, 20, 30, 255] * 4))
+
+    def test_header_sizes(self):
+        gif = self.root / "a.gif"
+        gif.write_bytes(b"GIF89a" + struct.pack("<HH", 320, 200) + bytes(16))
+        jpeg = self.root / "a.jpg"
+        jpeg.write_bytes(b"\xff\xd8" + b"\xff\xe0" + struct.pack(">H", 4) + b"\x00\x00" + b"\xff\xc0" + struct.pack(">HBHH", 11, 8, 600, 800) + bytes(8))
+        other = self.root / "a.bin"
+        other.write_bytes(bytes(32))
+
+        self.assertEqual(image_size(gif), (320, 200))
+        self.assertEqual(image_size(jpeg), (800, 600))
+        self.assertIsNone(image_size(other))
+
+class ImageStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.static = self.root / "static"
+        self.docs = self.root / "docs"
+        (self.static / "images").mkdir(parents=True)
+        self.write_image(self.static / "images" / "a.png", 40, 20, 3)
+        self.write_image(self.static / "images" / "small.png", 8, 8, 4)
+        (self.static / "index.css").write_text("body {}\n")
+
+    def tearDown(self):
+        use_images({})
+        drain_changes()
+        self.tmp.cleanup()
+
+    def write_image(self, path: Path, width: int, height: int, shade: int) -> None:
+        write_png(path, PngImage(width, height, 3, bytearray([shade, shade * 2, shade * 3] * width * height)))
+
+    def store(self) -> ImageStore:
+        store = ImageStore.load(self.root / "images.json", self.root / "cache", (10, 20))
+        store.update(self.static)
+        store.publish(self.docs)
+        store.save()
+        return store
+
+    def test_dimensions_and_variants(self):
+        store = self.store()
+        infos = store.infos()
+
+        self.assertEqual(sorted(infos), ["/images/a.png", "/images/small.png"])
+        self.assertEqual((infos["/images/small.png"].width, infos["/images/small.png"].variants), (8, []))
+        a = infos["/images/a.png"]
+        self.assertEqual((a.width, a.height), (40, 20))
+        self.assertEqual([width for _, width in a.variants], [10, 20])
+        for url, width in a.variants:
+            variant = read_png(self.docs / url[1:])
+            self.assertEqual((variant.width, variant.height), (width, width // 2))
+            self.assertEqual(bytes(variant.pixels[:3]), bytes([3, 6, 9]))
+        self.assertEqual((store.stats.processed, store.stats.written), (2, 2))
+
+    def test_unchanged_images_are_not_processed_again(self):
+        self.store()
+        (self.static / "images" / "copy.png").write_bytes((self.static / "images" / "a.png").read_bytes())
+
+        store = self.store()
+        self.assertEqual((store.stats.processed, store.stats.reused, store.stats.hashed), (0, 3, 1))
+        self.assertEqual(len(store.infos()["/images/copy.png"].variants), 2)
+
+    def test_changed_and_removed_images(self):
+        old = self.store().infos()["/images/a.png"]
+        self.write_image(self.static / "images" / "a.png", 40, 20, 5)
+        (self.static / "images" / "small.png").unlink()
+
+        store = self.store()
+        new = store.infos()["/images/a.png"]
+        self.assertNotEqual(new.variants, old.variants)
+        for url, _ in old.variants:
+            self.assertFalse((self.docs / url[1:]).exists())
+        self.assertEqual(sorted(store.infos()), ["/images/a.png"])
+        self.assertEqual((store.stats.processed, store.stats.removed), (1, 2))
+        self.assertEqual(len(list((self.root / "cache").iterdir())), 2)
+
+    def test_cached_variants_are_not_decoded_again(self):
+        digest = self.store().sources["images/a.png"][2]
+        # An interlaced header of the same size: any attempt to decode it raises.
+        undecodable = self.root / "interlaced.png"
+        undecodable.write_bytes(b"\x89PNG\r\n\x1a\n" + png_chunk(b"IHDR", struct.pack(">IIBBBBB", 40, 20, 8, 2, 0, 0, 1)))
+
+        self.assertEqual(process_image(undecodable, digest, self.root / "cache", (10, 20)), (digest, (40, 20), [(10, 5), (20, 10)]))
+        self.assertEqual(process_image(undecodable, digest, self.root / "cache", (10, 20, 30)), (digest, (40, 20), []))
+
+    def test_variant_paths(self):
+        self.assertEqual(variant_path("images/a.png", "0123456789abcdef", 480), "images/a-480w.0123456789.png")
+
+class ImageNodeTestCase(unittest.TestCase):
+
+    def tearDown(self):
+        use_images({})
+
+    def test_unknown_images_are_unchanged(self):
+        node = text_node_to_html_node(TextNode("alt", TextType.IMAGE, "/images/a.png"))
+        self.assertEqual(node.to_html(), "<img src='/images/a.png' alt='alt'></img>")
+
+    def test_known_images_get_dimensions_and_srcset(self):
+        use_images({"/images/a.png": ImageInfo(960, 480, [("/images/a-480w.1.png", 480)])})
+        node = text_node_to_html_node(TextNode("alt", TextType.IMAGE, "/images/a.png"))
+
+        with using_base_path("/site/"):
+            html = node.to_html()
+        self.assertEqual(
+            html,
+            "<img src='/site/images/a.png' alt='alt' width='960' height='480' loading='lazy' decoding='async' "
+            "srcset='/site/images/a-480w.1.png 480w, /site/images/a.png 960w' sizes='(max-width: 960px) 100vw, 960px'></img>",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import tempfile
+import unittest
+from functools import partial
+from pathlib import Path
+from src.listings import build_listings, collect_listings, page_url, slugify, tag_slugs
+from src.main import HTML_TEMPLATE, build_content, rebuild_changes, write_listing
+from src.manifest import BuildManifest
+from src.page_index import PageIndex
+from src.parsers.markdown import MarkdownParser
+from src.watch import Change, ChangeType
+
+class ListingsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.content = self.root / "content"
+        self.docs = self.root / "docs"
+        (self.content / "blog").mkdir(parents=True)
+        (self.content / "index.md").write_text("# Home")
+        for number in range(1, 6):
+            tags = "[python, web]" if number % 2 == 0 else "[python]"
+            self.write_post(number, f"---\ndate: 202{number % 2}-0{number}-01\ntags: {tags}\n---\n# Post {number}\n")
+        self.index = PageIndex()
+        self.manifest = BuildManifest(self.root / "manifest.json", "t", "/")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_post(self, number: int, text: str) -> Path:
+        post = self.content / "blog" / f"post-{number}" / "index.md"
+        post.parent.mkdir(exist_ok=True)
+        post.write_text(text)
+        return post
+
+    def build(self, page_size: int = 2):
+        build_content(self.content, self.docs, MarkdownParser(), "/", self.manifest, index=self.index)
+        written = build_listings(self.content, self.docs, self.index, partial(write_listing, base_path="/"), HTML_TEMPLATE, self.manifest, page_size=page_size)
+        return sorted(path.relative_to(self.docs).as_posix() for path in written)
+
+    def test_urls_and_slugs(self):
+        self.assertEqual(page_url("index.md"), "/")
+        self.assertEqual(page_url("blog/tom/index.md"), "/blog/tom/")
+        self.assertEqual(page_url("contact.md"), "/contact.html")
+        self.assertEqual(slugify("Machine Learning & C++"), "machine-learning-c")
+
+    def test_colliding_tag_slugs_are_numbered(self):
+        self.assertEqual(tag_slugs(["C++", "C", "c 2", "Go"]), {"C": "c", "C++": "c-2", "Go": "go", "c 2": "c-2-2"})
+
+        self.write_post(6, "---\ndate: 2022-01-01\ntags: [C++, C]\n---\n# Post 6\n")
+        self.build()
+        self.assertIn("<h1>Posts tagged C</h1>", (self.docs / "tags" / "c" / "index.html").read_text())
+        self.assertIn("<h1>Posts tagged C++</h1>", (self.docs / "tags" / "c-2" / "index.html").read_text())
+
+    def test_collect_paginates_index_tags_and_archives(self):
+        self.build()
+        listings = collect_listings(self.index, page_size=2)
+
+        self.assertEqual([listing.output for listing in listings], [
+            "blog/index.html", "blog/page/2/index.html", "blog/page/3/index.html",
+            "tags/python/index.html", "tags/python/page/2/index.html", "tags/python/page/3/index.html",
+            "tags/web/index.html",
+            "archive/2021/index.html", "archive/2021/page/2/index.html", "archive/2020/index.html",
+        ])
+        self.assertEqual([key for key, _ in listings[0].posts], ["blog/post-5/index.md", "blog/post-3/index.md"])
+        self.assertEqual((listings[1].number, listings[1].count), (2, 3))
+
+    def test_listing_page_links_posts_and_neighbours(self):
+        self.build()
+        html = (self.docs / "blog" / "page" / "2" / "index.html").read_text()
+
+        self.assertIn("<title>Blog (page 2 of 3)</title>", html)
+        self.assertIn("<li><a href='/blog/post-1/'>Post 1</a><time datetime='2021-01-01'>2021-01-01</time></li>", html)
+        self.assertIn("<a href='/blog/' rel='prev'>Newer posts</a><a href='/blog/page/3/' rel='next'>Older posts</a>", html)
+
+    def test_only_affected_listings_are_rewritten(self):
+        self.assertEqual(len(self.build()), 10)
+        self.assertEqual(self.build(), [])
+
+        self.write_post(4, "---\ndate: 2020-04-01\ntags: [python, web]\n---\n# Renamed\n")
+        self.assertEqual(self.build(), ["archive/2020/index.html", "blog/page/2/index.html", "tags/python/page/2/index.html", "tags/web/index.html"])
+
+    def test_stale_listings_are_removed(self):
+        self.build()
+        for number in (2, 4):
+            self.write_post(number, f"# Post {number}\n")
+        self.build()
+
+        self.assertFalse((self.docs / "tags" / "web").exists())
+        self.assertFalse((self.docs / "archive" / "2020").exists())
+        self.assertNotIn("tags/web/index.html", self.manifest.listings)
+
+    def test_content_page_takes_precedence(self):
+        (self.content / "blog" / "index.md").write_text("# My blog")
+        self.build()
+
+        self.assertIn("<h1>My blog</h1>", (self.docs / "blog" / "index.html").read_text())
+        self.assertTrue((self.docs / "blog" / "page" / "2" / "index.html").exists())
+
+    def test_rebuild_updates_listings(self):
+        self.build()
+        post = self.write_post(6, "---\ndate: 2022-01-01\n---\n# Post 6\n")
+        rebuilt, _ = rebuild_changes([Change(ChangeType.ADDED, post, self.content)], self.root / "static", self.content, self.docs, MarkdownParser(), self.manifest, HTML_TEMPLATE, index=self.index, page_size=2)
+
+        self.assertIn(self.docs / "archive" / "2022" / "index.html", rebuilt)
+        self.assertIn("Post 6", (self.docs / "blog" / "index.html").read_text())
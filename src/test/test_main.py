@@ -0,0 +1,132 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from string import Template
+from src.htmlnode import LeafNode, ParentNode
+from src.images import PngImage, use_images, write_png
+from src.main import HTML_TEMPLATE, generate_html_file, main, page_title, write_page
+from src.outputs import drain_changes
+from src.parsers.markdown import MarkdownParser
+from src.urls import use_assets
+
+class WritePageTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.node = ParentNode(tag="div", children=[
+            LeafNode(tag="a", value="home", props={"href": "/"}),
+            LeafNode(tag="img", value="", props={"src": "/images/a.png", "alt": "a"}),
+        ])
+
+    def render(self, base_path: str) -> str:
+        sink = io.StringIO()
+        write_page(sink, "Title", self.node, base_path)
+        return sink.getvalue()
+
+    def test_matches_template_substitution(self):
+        expected = HTML_TEMPLATE.substitute(title="Title", content=self.node.to_html())
+        self.assertEqual(self.render("/"), expected)
+
+    def test_rewrites_base_path(self):
+        html = self.render("/site/")
+
+        self.assertIn("<link href='/site/index.css'", html)
+        self.assertIn("<a href='/site/'>home</a>", html)
+        self.assertIn("<img src='/site/images/a.png' alt='a'></img>", html)
+
+    def test_base_path_leaves_code_samples_alone(self):
+        node = ParentNode(tag="p", children=[
+            LeafNode(tag="code", value="<a href='/x'>"),
+            LeafNode(tag="a", value="x", props={"href": "/x"}),
+        ])
+        sink = io.StringIO()
+        write_page(sink, "Title", node, "/site/")
+
+        self.assertIn("<code><a href='/x'></code><a href='/site/x'>x</a>", sink.getvalue())
+
+    def test_template_without_content_slot(self):
+        sink = io.StringIO()
+        write_page(sink, "Title", self.node, "/", Template("<title>$title</title>"))
+        self.assertEqual(sink.getvalue(), "<title>Title</title>")
+
+class StreamingPageTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.source = self.root / "page.md"
+        self.source.write_text(
+            "# Large _reference_\n\nIntro with a [link](/docs) and ![image](/a.png).\n\n"
+            "```\nfirst\n\nsecond\n```\n\n- one\n- two\n\n> quote\n"
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_streamed_page_matches_whole_page(self):
+        for base_path in ("/", "/site/"):
+            whole, streamed = self.root / "whole.html", self.root / "streamed.html"
+            generate_html_file(self.source, whole, MarkdownParser(), base_path)
+            generate_html_file(self.source, streamed, MarkdownParser(), base_path, stream_threshold=0)
+
+            self.assertEqual(streamed.read_text(), whole.read_text())
+
+    def test_streamed_page_with_front_matter_matches_whole_page(self):
+        self.source.write_text("---\ntitle: Front matter title\ntags: [a, b]\n---\n\n" + self.source.read_text())
+        whole, streamed = self.root / "whole.html", self.root / "streamed.html"
+        generate_html_file(self.source, whole, MarkdownParser(), "/")
+        generate_html_file(self.source, streamed, MarkdownParser(), "/", stream_threshold=0)
+
+        self.assertEqual(streamed.read_text(), whole.read_text())
+        self.assertIn("<title>Front matter title</title>", whole.read_text())
+        self.assertNotIn("tags", whole.read_text())
+
+    def test_page_title_reads_first_line_only(self):
+        self.assertEqual(page_title("## Title\nbody"), "Title")
+        self.assertEqual(page_title("# Title"), "Title")
+        self.assertEqual(page_title("\n# Not the title"), "")
+
+class FullBuildTestCase(unittest.TestCase):
+
+    def setUp(self):
+        # Changes recorded by other tests carry paths outside this build.
+        drain_changes()
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        Path("static/images").mkdir(parents=True)
+        Path("static/index.css").write_text("body {}")
+        write_png(Path("static/images/a.png"), PngImage(8, 4, 1, bytearray(32)))
+        Path("content/blog").mkdir(parents=True)
+        Path("content/index.md").write_text("# Home")
+        Path("content/blog/post.md").write_text("---\ndate: 2024-01-01\n---\n# Post")
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        use_assets({})
+        use_images({})
+        drain_changes()
+        self.tmp.cleanup()
+
+    def build(self, *args: str) -> None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            main(["/", *args])
+
+    def outputs(self):
+        return sorted(path.relative_to("docs").as_posix() for path in Path("docs").rglob("*") if path.is_file())
+
+    def test_outputs_of_stages_turned_off_are_removed(self):
+        self.build()
+        plain = self.outputs()
+        self.build("--site-url", "https://example.com", "--fingerprint", "--images", "--image-widths", "4")
+        added = set(self.outputs()) - set(plain)
+        self.assertIn("sitemap.xml", added)
+        self.assertIn("atom.xml", added)
+        self.assertIn("asset-manifest.json", added)
+        self.assertTrue(any(output.startswith("index.") and output != "index.css" for output in added))
+        self.assertTrue(any(output.startswith("images/a-4w.") for output in added))
+
+        self.build()
+        self.assertEqual(self.outputs(), plain)
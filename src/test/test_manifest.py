@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from src.main import build_content
+from src.manifest import BuildManifest
+from src.parsers.markdown import MarkdownParser
+
+class BuildManifestTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.content = self.root / "content"
+        self.docs = self.root / "docs"
+        self.manifest_path = self.root / ".cache" / "manifest.json"
+        self.parser = MarkdownParser()
+
+        (self.content / "blog").mkdir(parents=True)
+        (self.content / "index.md").write_text("# Home\n\nWelcome")
+        (self.content / "blog" / "post.md").write_text("# Post\n\nSome **bold** text")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, template_hash: str = "t", base_path: str = "/"):
+        manifest = BuildManifest.load(self.manifest_path, template_hash, base_path)
+        rendered, _ = build_content(self.content, self.docs, self.parser, base_path, manifest)
+        manifest.save()
+        return sorted(path.relative_to(self.docs).as_posix() for path in rendered)
+
+    def test_first_build_renders_everything(self):
+        self.assertEqual(self.build(), ["blog/post.html", "index.html"])
+        self.assertTrue(self.manifest_path.exists())
+
+    def test_unchanged_sources_are_skipped(self):
+        self.build()
+        self.assertEqual(self.build(), [])
+
+    def test_only_changed_source_is_rendered(self):
+        self.build()
+        (self.content / "index.md").write_text("# Home\n\nWelcome back")
+        self.assertEqual(self.build(), ["index.html"])
+        self.assertIn("Welcome back", (self.docs / "index.html").read_text())
+
+    def test_touched_source_is_not_rendered(self):
+        self.build()
+        source = self.content / "index.md"
+        stat = source.stat()
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000))
+        self.assertEqual(self.build(), [])
+
+    def test_removed_source_deletes_output(self):
+        self.build()
+        (self.content / "blog" / "post.md").unlink()
+        self.build()
+        self.assertFalse((self.docs / "blog" / "post.html").exists())
+        self.assertFalse((self.docs / "blog").exists())
+
+    def test_template_change_renders_everything(self):
+        self.build()
+        self.assertEqual(self.build(template_hash="other"), ["blog/post.html", "index.html"])
+
+    def test_base_path_change_renders_everything(self):
+        self.build()
+        self.assertEqual(self.build(base_path="/site/"), ["blog/post.html", "index.html"])
+
+    def test_missing_output_is_rendered(self):
+        self.build()
+        (self.docs / "index.html").unlink()
+        self.assertEqual(self.build(), ["index.html"])
+
+    def test_corrupt_manifest_is_ignored(self):
+        self.manifest_path.parent.mkdir(parents=True)
+        self.manifest_path.write_text("{not json")
+        self.assertEqual(self.build(), ["blog/post.html", "index.html"])
@@ -1,5 +1,5 @@
 import unittest
-from src.parsers.markdown import MarkdownParser, BlockType
+from src.parsers.markdown import MarkdownParser, BlockType, get_split_pattern
 from src.textnode import TextNode, TextType
 
 class MarkdownParserSplitNodesTestCase(unittest.TestCase):
@@ -450,6 +450,32 @@ class MarkdownParserSplitNodesTestCase(unittest.TestCase):
             ],
         )
 
+    def test_markdown_to_blocks_collapses_extra_blank_lines(self):
+        md = "\n\n  # Title  \n\n\n\nparagraph\n \nstill the paragraph\n\n\n"
+        self.assertEqual(self.parser.markdown_to_blocks(md), ["# Title", "paragraph\n \nstill the paragraph"])
+
+    def test_iter_blocks_yields_typed_spans(self):
+        md = "# Title\n\n> quote\n\n1. one\n2. two"
+        spans = list(self.parser.iter_blocks(md))
+
+        self.assertEqual([block_type for block_type, _, _ in spans], [BlockType.HEADING, BlockType.QUOTE, BlockType.ORDERED_LIST])
+        self.assertEqual([md[start:end] for _, start, end in spans], ["# Title", "> quote", "1. one\n2. two"])
+
+    def test_fenced_code_keeps_blank_lines(self):
+        md = "intro\n\n```\nfirst\n\n\nsecond\n```\n\noutro"
+        self.assertEqual(self.parser.markdown_to_blocks(md), ["intro", "```\nfirst\n\n\nsecond\n```", "outro"])
+
+        html = self.parser.markdown_to_html_code(md).to_html()
+        self.assertEqual(html, "<div><p>intro</p><pre><code>first\n\n\nsecond</code></pre><p>outro</p></div>")
+
+    def test_unclosed_fence_runs_to_the_end(self):
+        md = "intro\n\n```\ncode\n\nmore code\n"
+        self.assertEqual(self.parser.markdown_to_blocks(md), ["intro", "```\ncode\n\nmore code"])
+
+    def test_indented_backticks_do_not_open_a_fence(self):
+        md = "text\n  ```\n\nnext"
+        self.assertEqual(self.parser.markdown_to_blocks(md), ["text\n  ```", "next"])
+
     def test_block_to_block_types(self):
         block = "# heading"
         self.assertEqual(self.parser.block_to_block_type(block), BlockType.HEADING)
@@ -463,3 +489,115 @@ class MarkdownParserSplitNodesTestCase(unittest.TestCase):
         self.assertEqual(self.parser.block_to_block_type(block), BlockType.ORDERED_LIST)
         block = "paragraph"
         self.assertEqual(self.parser.block_to_block_type(block), BlockType.PARAGRAPH)
+
+    def test_block_to_block_types_only_inspects_first_line(self):
+        self.assertEqual(self.parser.block_to_block_type("#\nnot a heading"), BlockType.PARAGRAPH)
+        self.assertEqual(self.parser.block_to_block_type("####### too deep"), BlockType.PARAGRAPH)
+        self.assertEqual(self.parser.block_to_block_type("-\n- item"), BlockType.PARAGRAPH)
+        self.assertEqual(self.parser.block_to_block_type("12 monkeys"), BlockType.PARAGRAPH)
+        self.assertEqual(self.parser.block_to_block_type("``not code"), BlockType.PARAGRAPH)
+        self.assertEqual(self.parser.block_to_block_type("+ item"), BlockType.UNORDERED_LIST)
+        self.assertEqual(self.parser.block_to_block_type(""), BlockType.PARAGRAPH)
+
+    def test_split_patterns_are_compiled_once(self):
+        self.assertIs(get_split_pattern("**"), get_split_pattern("**"))
+        self.assertIsNot(get_split_pattern("**"), get_split_pattern("_"))
+
+
+class MarkdownParserSinglePassTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = MarkdownParser()
+        self.multi_pass_parser = MarkdownParser(single_pass=False)
+
+    def test_matches_multi_pass_output(self):
+        samples = [
+            "",
+            " ",
+            "Just plain text",
+            "This is **bold** text",
+            "This is _italic_ text",
+            "Code: `print('hi')` end",
+            "Visit [example](https://example.com)",
+            "![one](one.png) and ![two](two.png)",
+            "Start _italic_ **bold** `code` [link](url) ![img](img.png) end",
+            "**bold** at the start and _italic_ at the end",
+            "[a](a.com)[b](b.com)",
+            "Broken [link](missing end",
+            "Broken ![alt](missing end",
+            "Trailing **bold",
+            "**one** and **two** and `three`",
+            "[link with _underscores_](url) then _italic_",
+            "**[docs](/docs)**",
+            "_![logo](/logo.png)_",
+            "**a [b](c)",
+        ]
+
+        for text in samples:
+            with self.subTest(text=text):
+                try:
+                    expected = self.multi_pass_parser.text_to_textnodes(text)
+                except Exception:
+                    with self.assertRaises(ValueError):
+                        self.parser.text_to_textnodes(text)
+                    continue
+
+                self.assertEqual(self.parser.text_to_textnodes(text), expected)
+
+    def test_links_inside_emphasis(self):
+        self.assertEqual(
+            self.parser.text_to_textnodes("**see [docs](/docs) now** and `[not](/a/link)`"),
+            [
+                TextNode("see ", TextType.BOLD),
+                TextNode("docs", TextType.LINK, "/docs"),
+                TextNode(" now", TextType.BOLD),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("[not](/a/link)", TextType.CODE),
+            ],
+        )
+
+    def test_matches_multi_pass_html_for_document(self):
+        md = (
+            "# Title with **bold**\n"
+            "\n"
+            "Paragraph with [a link](/page) and ![an image](/img.png) and `code`.\n"
+            "\n"
+            "> quoted _text_\n"
+            "\n"
+            "- item **one**\n"
+            "- item [two](/two)\n"
+            "\n"
+            "1. first\n"
+            "2. second"
+        )
+
+        self.assertEqual(
+            self.parser.markdown_to_html_code(md).to_html(),
+            self.multi_pass_parser.markdown_to_html_code(md).to_html(),
+        )
+
+    def test_keeps_text_between_adjacent_links(self):
+        result = self.parser.text_to_textnodes("[a](a.com) [b](b.com)")
+
+        self.assertEqual(result, [
+            TextNode("a", TextType.LINK, url="a.com"),
+            TextNode(" ", TextType.TEXT),
+            TextNode("b", TextType.LINK, url="b.com"),
+        ])
+
+    def test_delimiters_inside_code_are_literal(self):
+        result = self.parser.text_to_textnodes("Use `snake_case` names")
+
+        self.assertEqual(result, [
+            TextNode("Use ", TextType.TEXT),
+            TextNode("snake_case", TextType.CODE),
+            TextNode(" names", TextType.TEXT),
+        ])
+
+    def test_delimiter_runs_are_literal(self):
+        result = self.parser.text_to_textnodes("a *** b")
+        self.assertEqual(result, [TextNode("a *** b", TextType.TEXT)])
+
+    def test_unclosed_code_raises(self):
+        with self.assertRaises(ValueError):
+            self.parser.text_to_textnodes("This is `broken code")
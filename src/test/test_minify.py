@@ -0,0 +1,123 @@
+import io
+import random
+import tempfile
+import unittest
+from pathlib import Path
+from src.main import generate_html_file, outputs_hash
+from src.minify import HtmlMinifier, minify_css, minify_html, use_minify
+from src.outputs import drain_changes
+from src.parsers.markdown import MarkdownParser
+
+PAGE = """
+<!doctype html>
+<html>
+  <head>
+    <title>  A   title </title>
+  </head>
+  <body>
+    <article><div><p>Some   <b>bold</b>  <i>words</i>
+ and&nbsp;&nbsp;text\u00a0\u00a0here  too</p>
+<pre><code>def f():
+    return  "  a  "
+
+</code></pre>
+<!--  a  comment  -->
+<p><img src='/a.png' alt='two  spaces'></img> <a href='/'>link</a> </p>
+<textarea>
+  kept
+</textarea>
+</div></article>
+  </body>
+</html>
+"""
+
+class MinifyHtmlTestCase(unittest.TestCase):
+
+    def test_collapses_whitespace(self):
+        self.assertEqual(
+            minify_html(PAGE),
+            "<!doctype html><html><head><title>A title</title></head><body><article><div>"
+            "<p>Some <b>bold</b> <i>words</i> and&nbsp;&nbsp;text\u00a0\u00a0here too</p>"
+            "<pre><code>def f():\n    return  \"  a  \"\n\n</code></pre>"
+            "<!--  a  comment  --><p><img src='/a.png' alt='two  spaces'></img> <a href='/'>link</a></p>"
+            "<textarea>\n  kept\n</textarea></div></article></body></html>",
+        )
+
+    def test_preformatted_blocks_are_byte_exact(self):
+        code = "<pre><code>  x  =  1\n\n\t\ty\r\n</code></pre>"
+        self.assertIn(code, minify_html(f"<p> a </p>\n{code}\n<p> b </p>"))
+        self.assertIn(code.upper(), minify_html(f"<P> a </P>\n{code.upper()}\n"))
+
+    def test_streamed_chunks_match_the_whole_document(self):
+        rng = random.Random(3)
+        expected = minify_html(PAGE * 3)
+        for _ in range(20):
+            sink = io.StringIO()
+            minifier = HtmlMinifier(sink, rng.randrange(1, 64))
+            position = 0
+            while position < len(PAGE * 3):
+                size = rng.randrange(1, 12)
+                minifier.write((PAGE * 3)[position:position + size])
+                position += size
+            minifier.close()
+            self.assertEqual(sink.getvalue(), expected)
+
+    def test_long_text_runs(self):
+        # Every whitespace run is scanned once, however long the text around it.
+        paragraph = "word  word\n" * 40_000
+        self.assertEqual(minify_html(f"<p>{paragraph}</p>"), f"<p>{'word word ' * 39_999}word word</p>")
+
+    def test_incomplete_preserved_element_is_held_back(self):
+        sink = io.StringIO()
+        minifier = HtmlMinifier(sink, 1)
+        minifier.write("<p>a</p>\n<pre>  b")
+        self.assertEqual(sink.getvalue(), "<p>a</p>")
+        minifier.write("  </pre>\n")
+        minifier.close()
+        self.assertEqual(sink.getvalue(), "<p>a</p><pre>  b  </pre>")
+
+class MinifyCssTestCase(unittest.TestCase):
+
+    def test_minifies_rules(self):
+        css = "/* theme */\nbody {\n  color : red;\n  margin: 0 auto;\n}\n\nh1 > a,\nh2 ~ a:hover { color: blue; }\n"
+        self.assertEqual(minify_css(css), "body{color:red;margin:0 auto}h1>a,h2~a:hover{color:blue}")
+
+    def test_space_before_a_colon_is_kept_in_selectors(self):
+        css = "a :hover { color : red ; --gap : 0 }\n@media print { p :first-child { margin :0 } }"
+        self.assertEqual(minify_css(css), "a :hover{color:red;--gap:0}@media print{p :first-child{margin:0}}")
+
+    def test_strings_and_license_comments_are_kept(self):
+        css = "/*! License  */\na::before { content: \"  /* x */ ; } \" ; }\nb { content: 'it\\'s  , here' }"
+        self.assertEqual(minify_css(css), "/*! License */ a::before{content:\"  /* x */ ; } \"}b{content:'it\\'s  , here'}")
+
+class MinifyBuildTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.source = self.root / "page.md"
+        self.source.write_text("# Title\n\nSome   text\nover lines.\n\n```\n  indented\n\n    code\n```\n")
+
+    def tearDown(self):
+        use_minify(False)
+        drain_changes()
+        self.tmp.cleanup()
+
+    def test_pages_are_minified_when_enabled(self):
+        plain, whole, streamed = self.root / "plain.html", self.root / "whole.html", self.root / "streamed.html"
+        generate_html_file(self.source, plain, MarkdownParser(), "/")
+        template_hash = outputs_hash("template")
+        use_minify(True)
+        generate_html_file(self.source, whole, MarkdownParser(), "/")
+        generate_html_file(self.source, streamed, MarkdownParser(), "/", stream_threshold=0)
+
+        self.assertEqual(whole.read_text(), minify_html(plain.read_text()))
+        self.assertEqual(streamed.read_text(), whole.read_text())
+        self.assertIn("<pre><code>indented\n\n    code</code></pre>", whole.read_text())
+        self.assertTrue(whole.read_text().startswith("<!doctype html><html><head>"))
+        # Minified outputs do not match a manifest written for plain ones.
+        self.assertNotEqual(outputs_hash("template"), template_hash)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from src.main import build_content, generate_html_file, save_changed_files
+from src.outputs import AtomicOutput, PageBuffer, drain_changes, replace_if_changed, temp_path, write_bytes_if_changed, write_if_changed
+from src.parsers.markdown import MarkdownParser
+
+class OutputsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        drain_changes()
+
+    def tearDown(self):
+        drain_changes()
+        self.tmp.cleanup()
+
+    def age(self, path: Path) -> int:
+        # Move the mtime into the past, so a rewrite would be visible even on coarse clocks.
+        os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+        return path.stat().st_mtime_ns
+
+    def test_write_if_changed(self):
+        output = self.root / "page.html"
+        self.assertTrue(write_if_changed(output, "<p>one</p>"))
+        mtime = self.age(output)
+
+        self.assertFalse(write_if_changed(output, "<p>one</p>"))
+        self.assertEqual(output.stat().st_mtime_ns, mtime)
+
+        self.assertTrue(write_if_changed(output, "<p>two</p>"))
+        self.assertEqual(output.read_text(), "<p>two</p>")
+        self.assertEqual(drain_changes(), [output, output])
+        self.assertEqual(list(self.root.iterdir()), [output])
+
+    def test_page_buffer(self):
+        output = self.root / "page.html"
+        sink = PageBuffer()
+        sink.write("<p>caf")
+        sink.write("\u00e9</p>\r\n")
+        self.assertTrue(write_bytes_if_changed(output, sink.getvalue()))
+        self.assertEqual(output.read_bytes(), "<p>caf\u00e9</p>\r\n".encode("utf-8"))
+
+        sink = PageBuffer()
+        sink.write("<p>caf\u00e9</p>\r\n")
+        self.assertFalse(write_bytes_if_changed(output, sink.getvalue()))
+        self.assertEqual(drain_changes(), [output])
+
+    def test_replace_if_changed(self):
+        output = self.root / "sitemap.xml"
+        output.write_text("same")
+        tmp = temp_path(output)
+        tmp.write_text("same")
+
+        self.assertFalse(replace_if_changed(tmp, output))
+        self.assertFalse(tmp.exists())
+
+        tmp.write_text("other")
+        self.assertTrue(replace_if_changed(tmp, output))
+        self.assertEqual(output.read_text(), "other")
+        self.assertFalse(tmp.exists())
+
+    def test_atomic_output(self):
+        output = self.root / "atom.xml"
+        output.write_text("<feed />")
+        mtime = self.age(output)
+
+        writer = AtomicOutput(output)
+        with writer as sink:
+            sink.write("<feed />")
+        self.assertFalse(writer.changed)
+        self.assertEqual(output.stat().st_mtime_ns, mtime)
+
+        with self.assertRaises(RuntimeError):
+            with AtomicOutput(output) as sink:
+                sink.write("<feed>")
+                raise RuntimeError("failed")
+        self.assertEqual(output.read_text(), "<feed />")
+        self.assertEqual(list(self.root.iterdir()), [output])
+
+    def test_streamed_page_is_not_rewritten(self):
+        source = self.root / "page.md"
+        source.write_text("# Title\n\nSome text.\n")
+        output = self.root / "out" / "page.html"
+
+        self.assertTrue(generate_html_file(source, output, MarkdownParser(), "/", stream_threshold=0))
+        mtime = self.age(output)
+        self.assertFalse(generate_html_file(source, output, MarkdownParser(), "/", stream_threshold=0))
+        self.assertFalse(generate_html_file(source, output, MarkdownParser(), "/"))
+        self.assertEqual(output.stat().st_mtime_ns, mtime)
+
+    def test_second_full_build_changes_nothing(self):
+        content, docs = self.root / "content", self.root / "docs"
+        for name in ("index", "about", "contact"):
+            page = content / name / "index.md"
+            page.parent.mkdir(parents=True)
+            page.write_text(f"# {name}\n\nText of {name}.\n")
+        changed_files = self.root / "changed-files.txt"
+
+        build_content(content, docs, MarkdownParser(), "/")
+        self.assertEqual(save_changed_files(docs, changed_files), 3)
+        build_content(content, docs, MarkdownParser(), "/")
+        self.assertEqual(save_changed_files(docs, changed_files), 0)
+
+        (content / "about" / "index.md").write_text("# about\n\nNew text.\n")
+        build_content(content, docs, MarkdownParser(), "/")
+        self.assertEqual(save_changed_files(docs, changed_files), 1)
+        self.assertEqual(changed_files.read_text(), "about/index.html\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
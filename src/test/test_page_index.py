@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from src.front_matter import PageMeta
+from src.main import HTML_TEMPLATE, build_content, rebuild_changes
+from src.manifest import BuildManifest
+from src.page_index import PageIndex
+from src.parsers.markdown import MarkdownParser
+from src.watch import Change, ChangeType
+
+class PageIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.content = self.root / "content"
+        self.docs = self.root / "docs"
+        self.index_path = self.root / ".cache" / "page-index.json"
+
+        (self.content / "blog").mkdir(parents=True)
+        (self.content / "index.md").write_text("# Home\n\nWelcome")
+        (self.content / "blog" / "old.md").write_text("---\ndate: 2023-05-01\ntags: [python]\n---\n# Old post\n")
+        (self.content / "blog" / "new.md").write_text("---\ntitle: New post\ndate: 2024-01-02\ntags: [python, web]\n---\nBody")
+        (self.content / "blog" / "draft.md").write_text("---\ndate: 2025-01-01\ndraft: true\ntags: web\n---\n# Draft\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, index: PageIndex, drafts: bool = False):
+        manifest = BuildManifest.load(self.root / "manifest.json", "t", "/")
+        build_content(self.content, self.docs, MarkdownParser(), "/", manifest, index=index, drafts=drafts)
+        manifest.save()
+        return manifest
+
+    def test_queries(self):
+        index = PageIndex(self.index_path)
+        self.build(index)
+
+        self.assertEqual([key for key, _ in index.pages()], ["blog/new.md", "blog/old.md", "index.md"])
+        self.assertEqual([key for key, _ in index.pages(drafts=True)][0], "blog/draft.md")
+        self.assertEqual([meta.title for _, meta in index.pages(tag="python")], ["New post", "Old post"])
+        self.assertEqual(index.tags(), {"python": 2, "web": 1})
+        self.assertEqual(index.tags(drafts=True), {"python": 2, "web": 2})
+
+    def test_drafts_are_not_published(self):
+        self.build(PageIndex())
+        self.assertFalse((self.docs / "blog" / "draft.html").exists())
+        self.assertTrue((self.docs / "blog" / "new.html").exists())
+
+        self.build(PageIndex(), drafts=True)
+        self.assertTrue((self.docs / "blog" / "draft.html").exists())
+
+        self.build(PageIndex())
+        self.assertFalse((self.docs / "blog" / "draft.html").exists())
+
+    def test_persisted_entries_are_reused(self):
+        index = PageIndex(self.index_path)
+        self.build(index)
+        index.save()
+
+        loaded = PageIndex.load(self.index_path)
+        self.assertEqual(loaded.get(Path("blog/new.md")), PageMeta("New post", "2024-01-02", ["python", "web"]))
+
+        # Unchanged sources are not read again, so a stale title would survive as long as size and mtime match.
+        loaded.entries["index.md"].meta.title = "Cached"
+        self.assertEqual(loaded.update(self.content / "index.md", Path("index.md")).title, "Cached")
+        self.assertFalse(loaded.dirty)
+
+        os.utime(self.content / "index.md", ns=(0, 0))
+        self.assertEqual(loaded.update(self.content / "index.md", Path("index.md")).title, "Home")
+        self.assertTrue(loaded.dirty)
+
+    def test_removed_pages_are_pruned(self):
+        index = PageIndex(self.index_path)
+        self.build(index)
+        (self.content / "blog" / "old.md").unlink()
+        self.build(index)
+
+        self.assertIsNone(index.get(Path("blog/old.md")))
+
+    def test_page_turned_draft_is_unpublished_on_rebuild(self):
+        index = PageIndex()
+        manifest = self.build(index)
+        page = self.content / "blog" / "new.md"
+        page.write_text("---\ndraft: true\n---\nBody")
+
+        changes = [Change(ChangeType.MODIFIED, page, self.content)]
+        rebuild_changes(changes, self.root / "static", self.content, self.docs, MarkdownParser(), manifest, HTML_TEMPLATE, index=index)
+
+        self.assertFalse((self.docs / "blog" / "new.html").exists())
+        self.assertTrue(index.get(Path("blog/new.md")).draft)
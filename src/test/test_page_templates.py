@@ -0,0 +1,111 @@
+import tempfile
+import unittest
+from pathlib import Path
+from src.main import HTML_TEMPLATE, build_content, rebuild_changes
+from src.manifest import BuildManifest, hash_text
+from src.page_templates import TemplateSet, compile_template
+from src.parsers.markdown import MarkdownParser
+from src.watch import Change, ChangeType
+
+def render(source: str, base_path: str = "/", **values: str) -> str:
+    parts = []
+    compile_template(source, base_path).render(parts.append, values, lambda write: write("<p>body</p>"))
+    return "".join(parts)
+
+class CompileTemplateTestCase(unittest.TestCase):
+
+    def test_splits_chunks_and_slots(self):
+        compiled = compile_template("<title>$title</title><main>${content}</main>", "/")
+
+        self.assertEqual(compiled.chunks, ["<title>", "</title><main>", "</main>"])
+        self.assertEqual(compiled.slots, ["title", "content"])
+
+    def test_matches_substitute(self):
+        expected = HTML_TEMPLATE.substitute(title="Title", content="<p>body</p>")
+        self.assertEqual(render(HTML_TEMPLATE.template, title="Title"), expected)
+
+    def test_rewrites_static_chunks_once(self):
+        html = render("<link href='/index.css' /><img src='/a.png' />$content", "/site/")
+        self.assertEqual(html, "<link href='/site/index.css' /><img src='/site/a.png' /><p>body</p>")
+
+    def test_compiled_once_per_base_path(self):
+        self.assertIs(compile_template("$content", "/"), compile_template("$content", "/"))
+        self.assertIsNot(compile_template("$content", "/"), compile_template("$content", "/site/"))
+
+    def test_escaped_delimiter(self):
+        self.assertEqual(render("$$5 $title", title="x"), "$5 x")
+
+    def test_invalid_placeholders(self):
+        with self.assertRaises(ValueError):
+            compile_template("$ oops", "/")
+        with self.assertRaises(ValueError):
+            compile_template("$content $content", "/")
+        with self.assertRaises(KeyError):
+            render("$missing")
+
+class TemplateSetTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.content = self.root / "content"
+        self.templates_dir = self.root / "templates"
+        for page in ("index.md", "blog/index.md", "blog/tom/index.md", "contact/index.md"):
+            (self.content / page).parent.mkdir(parents=True, exist_ok=True)
+            (self.content / page).write_text(f"# {page}\n\nBody")
+        (self.templates_dir / "blog").mkdir(parents=True)
+        (self.templates_dir / "blog.html").write_text("<blog>$title|$content</blog>")
+        (self.templates_dir / "blog" / "tom.html").write_text("<tom>$content</tom>")
+        self.templates = TemplateSet(self.content, self.templates_dir, HTML_TEMPLATE)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_nearest_section_wins(self):
+        self.assertIs(self.templates.select(self.content / "index.md"), HTML_TEMPLATE)
+        self.assertEqual(self.templates.select(self.content / "blog" / "index.md").template, "<blog>$title|$content</blog>")
+        self.assertEqual(self.templates.select(self.content / "blog" / "tom" / "index.md").template, "<tom>$content</tom>")
+        self.assertIs(self.templates.select(self.content / "contact" / "index.md"), HTML_TEMPLATE)
+
+    def test_default_template_file(self):
+        (self.templates_dir / "default.html").write_text("<default>$content</default>")
+        self.templates.reload()
+        self.assertEqual(self.templates.select(self.content / "contact" / "index.md").template, "<default>$content</default>")
+
+    def test_explicit_name(self):
+        self.assertEqual(self.templates.select(self.content / "index.md", "blog/tom").template, "<tom>$content</tom>")
+        with self.assertRaises(FileNotFoundError):
+            self.templates.select(self.content / "index.md", "missing")
+
+    def test_hash_without_directory_matches_template_hash(self):
+        self.assertEqual(TemplateSet(self.content, None, HTML_TEMPLATE).hash(), hash_text(HTML_TEMPLATE.template))
+        self.assertNotEqual(self.templates.hash(), hash_text(HTML_TEMPLATE.template))
+
+    def test_build_uses_section_templates(self):
+        docs = self.root / "docs"
+        build_content(self.content, docs, MarkdownParser(), "/", templates=self.templates, jobs=2)
+
+        self.assertEqual((docs / "blog" / "index.html").read_text(), "<blog>blog/index.md|<div><h1>blog/index.md</h1><p>Body</p></div></blog>")
+        self.assertEqual((docs / "blog" / "tom" / "index.html").read_text(), "<tom><div><h1>blog/tom/index.md</h1><p>Body</p></div></tom>")
+        self.assertIn("<article><div><h1>index.md</h1>", (docs / "index.html").read_text())
+
+    def test_front_matter_names_template(self):
+        (self.content / "contact" / "index.md").write_text("---\ntemplate: blog/tom\n---\n# Contact\n")
+        docs = self.root / "docs"
+        build_content(self.content, docs, MarkdownParser(), "/", templates=self.templates)
+
+        self.assertEqual((docs / "contact" / "index.html").read_text(), "<tom><div><h1>Contact</h1></div></tom>")
+
+    def test_template_change_rebuilds_every_page(self):
+        docs = self.root / "docs"
+        manifest = BuildManifest(self.root / "manifest.json", self.templates.hash(), "/")
+        parser = MarkdownParser()
+        build_content(self.content, docs, parser, "/", manifest, templates=self.templates)
+
+        (self.templates_dir / "blog.html").write_text("<new>$content</new>")
+        changes = [Change(ChangeType.MODIFIED, self.templates_dir / "blog.html", self.templates_dir)]
+        rebuilt, _ = rebuild_changes(changes, self.root / "static", self.content, docs, parser, manifest, HTML_TEMPLATE, templates=self.templates)
+
+        self.assertEqual(len(rebuilt), 4)
+        self.assertEqual(manifest.template_hash, self.templates.hash())
+        self.assertTrue((docs / "blog" / "index.html").read_text().startswith("<new>"))
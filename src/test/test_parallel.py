@@ -0,0 +1,72 @@
+import contextlib
+import io
+import tempfile
+import unittest
+from pathlib import Path
+from src.main import build_content
+from src.parallel import render_parallel, split_batches
+from src.parsers.markdown import MarkdownParser
+from src.profiler import BuildProfiler
+
+def record_page(src_file: Path, dst_file: Path, parser: MarkdownParser) -> None:
+    dst_file.parent.mkdir(parents=True, exist_ok=True)
+    dst_file.write_text(src_file.read_text().upper())
+
+class ParallelBuildTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.content = self.root / "content"
+
+        for i in range(12):
+            page = self.content / f"section{i % 3}" / f"page{i}.md"
+            page.parent.mkdir(parents=True, exist_ok=True)
+            page.write_text(f"# Page {i}\n\nSome **bold** and _italic_ text with [a link](/page{i}).\n\n- one\n- two")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_split_batches_covers_every_page(self):
+        pages = [(Path(f"{i}.md"), Path(f"{i}.html")) for i in range(10)]
+        batches = split_batches(pages, jobs=2)
+
+        self.assertEqual([page for batch in batches for page in batch], pages)
+        self.assertEqual(len(batches), 5)
+
+    def test_split_batches_with_explicit_size(self):
+        pages = [(Path(f"{i}.md"), Path(f"{i}.html")) for i in range(5)]
+        self.assertEqual([len(batch) for batch in split_batches(pages, jobs=4, batch_size=2)], [2, 2, 1])
+
+    def test_render_parallel_reports_every_page(self):
+        out = self.root / "out"
+        pages = [(path, out / path.with_suffix(".txt").name) for path in sorted(self.content.rglob("*.md"))]
+        stats = render_parallel(pages, record_page, jobs=2, batch_size=3)
+
+        self.assertEqual(sum(worker.pages for worker in stats.values()), len(pages))
+        self.assertEqual(sum(worker.batches for worker in stats.values()), 4)
+        for src_file, dst_file in pages:
+            self.assertEqual(dst_file.read_text(), src_file.read_text().upper())
+
+    def test_parallel_output_matches_serial(self):
+        serial, parallel = self.root / "serial", self.root / "parallel"
+        self.assertIsNone(build_content(self.content, serial, MarkdownParser(), "/base/")[1])
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            _, report = build_content(self.content, parallel, MarkdownParser(), "/base/", jobs=3)
+        self.assertEqual(output.getvalue(), "")
+        self.assertEqual(sum(worker.pages for worker in report.stats.values()), 12)
+        self.assertTrue(str(report).startswith(f"Rendered with {len(report.stats)} workers"))
+
+        serial_files = sorted(path.relative_to(serial) for path in serial.rglob("*.html"))
+        parallel_files = sorted(path.relative_to(parallel) for path in parallel.rglob("*.html"))
+        self.assertEqual(serial_files, parallel_files)
+        self.assertEqual(len(serial_files), 12)
+        for relative_path in serial_files:
+            self.assertEqual((serial / relative_path).read_bytes(), (parallel / relative_path).read_bytes())
+
+    def test_parallel_profile_is_merged(self):
+        profiler = BuildProfiler()
+        build_content(self.content, self.root / "out", MarkdownParser(profiler=profiler), "/", jobs=3)
+
+        self.assertEqual(sorted(page.path for page in profiler.pages), sorted(str(path) for path in self.content.rglob("*.md")))
+        self.assertEqual(profiler.calls["read"], 12)
@@ -0,0 +1,76 @@
+import contextlib
+import io
+import tempfile
+import unittest
+from functools import partial
+from pathlib import Path
+from src.main import build_content, generate_html_file, render_html_source
+from src.parsers.markdown import MarkdownParser
+from src.pipeline import BuildPipeline
+
+class BuildPipelineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.content = self.root / "content"
+        for number in range(12):
+            page = self.content / f"section-{number % 3}" / f"page-{number}" / "index.md"
+            page.parent.mkdir(parents=True)
+            page.write_text(f"---\ntitle: Page {number}\n---\n# Page {number}\n\nA [link](/page-{number}/) and **bold** text.\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def outputs(self, root: Path):
+        return {path.relative_to(root).as_posix(): path.read_text() for path in sorted(root.rglob("*.html"))}
+
+    def pipeline(self, parser: MarkdownParser, **options) -> BuildPipeline:
+        render_source = partial(render_html_source, parser=parser, base_path="/site/")
+        render_file = partial(generate_html_file, parser=parser, base_path="/site/")
+        return BuildPipeline(render_source, render_file, **options)
+
+    def pages(self, root: Path):
+        return [(source, (root / source.relative_to(self.content)).with_suffix(".html")) for source in sorted(self.content.rglob("*.md"))]
+
+    def test_matches_serial_build(self):
+        serial, pipelined = self.root / "serial", self.root / "pipelined"
+        build_content(self.content, serial, MarkdownParser(), "/site/")
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            _, stats = build_content(self.content, pipelined, MarkdownParser(), "/site/", pipeline=True)
+
+        self.assertEqual(output.getvalue(), "")
+        self.assertEqual(stats.rendered, 12)
+        self.assertEqual(self.outputs(pipelined), self.outputs(serial))
+        self.assertEqual(len(self.outputs(serial)), 12)
+
+    def test_small_queues_and_streamed_pages(self):
+        serial, pipelined = self.root / "serial", self.root / "pipelined"
+        build_content(self.content, serial, MarkdownParser(), "/site/")
+        large = self.content / "section-0" / "page-0" / "index.md"
+        threshold = max(source.stat().st_size for source in self.content.rglob("*.md")) + 1
+        large.write_text(large.read_text() + "\nMore text.\n" * 20)
+        build_content(self.content, serial, MarkdownParser(), "/site/")
+
+        stats = self.pipeline(MarkdownParser(), stream_threshold=threshold, queue_size=1, write_batch=2, io_threads=2).run(self.pages(pipelined))
+
+        self.assertEqual(self.outputs(pipelined), self.outputs(serial))
+        self.assertEqual((stats.read, stats.rendered, stats.streamed, stats.written), (12, 11, 1, 11))
+        self.assertEqual(stats.directories, 11)
+
+    def test_render_error_stops_the_pipeline(self):
+        (self.content / "section-1" / "page-1" / "index.md").write_text("---\ntitle: unclosed\n")
+        with self.assertRaises(ValueError):
+            self.pipeline(MarkdownParser(), stream_threshold=1 << 20, queue_size=2).run(self.pages(self.root / "out"))
+
+    def test_write_error_stops_the_pipeline(self):
+        pages = self.pages(self.root / "out")
+        pages[5][1].mkdir(parents=True)
+        with self.assertRaises(OSError):
+            self.pipeline(MarkdownParser(), stream_threshold=1 << 20, queue_size=2).run(pages)
+
+    def test_read_error_stops_the_pipeline(self):
+        pages = self.pages(self.root / "out")
+        pages[3] = (self.content / "missing.md", pages[3][1])
+        with self.assertRaises(FileNotFoundError):
+            self.pipeline(MarkdownParser(), stream_threshold=1 << 20).run(pages)
@@ -0,0 +1,81 @@
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from src.main import generate_html_file
+from src.parsers.markdown import MarkdownParser
+from src.profiler import NULL_PROFILER, BuildProfiler
+
+class ProfilerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.page = self.root / "index.md"
+        self.page.write_text("# Title\n\nSome **bold** text.\n\n- one\n- two\n\n```\ncode\n```")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_null_profiler_leaves_functions_alone(self):
+        parser = MarkdownParser()
+
+        self.assertIs(NULL_PROFILER.wrap("stage", len), len)
+        self.assertIs(parser.profiler, NULL_PROFILER)
+        self.assertNotIn("text_to_textnodes", vars(parser))
+
+    def test_nested_stages_record_self_time(self):
+        profiler = BuildProfiler()
+        profiler.start()
+        profiler.call("inner", time.sleep, 0.02)
+        profiler.stop("outer")
+
+        self.assertGreaterEqual(profiler.seconds["inner"], 0.02)
+        self.assertLess(profiler.seconds["outer"], 0.02)
+        self.assertEqual(profiler.calls, {"inner": 1, "outer": 1})
+
+    def test_profiled_page(self):
+        profiler = BuildProfiler()
+        parser = MarkdownParser(profiler=profiler)
+        generate_html_file(self.page, self.root / "index.html", parser, "/site/")
+
+        self.assertEqual(len(profiler.pages), 1)
+        page = profiler.pages[0]
+        self.assertEqual(page.path, str(self.page))
+        # div, h1, its text, p with three children, ul with two li and their text, pre and code.
+        self.assertEqual(page.nodes, 14)
+        for stage in ("read", "open", "blocks", "inline", "block:heading", "block:paragraph", "block:unordered_list", "block:code", "template", "render", "write"):
+            self.assertIn(stage, page.stages)
+        self.assertEqual(profiler.calls["inline"], 4)
+        self.assertAlmostEqual(page.seconds, sum(profiler.seconds.values()))
+
+    def test_profiled_output_matches_unprofiled(self):
+        generate_html_file(self.page, self.root / "plain.html", MarkdownParser(), "/site/")
+        generate_html_file(self.page, self.root / "profiled.html", MarkdownParser(profiler=BuildProfiler()), "/site/")
+        self.assertEqual((self.root / "plain.html").read_text(), (self.root / "profiled.html").read_text())
+
+    def test_drain_and_merge(self):
+        worker = BuildProfiler()
+        parser = MarkdownParser(profiler=worker)
+        for name in ("a", "b"):
+            generate_html_file(self.page, self.root / f"{name}.html", parser, "/")
+        drained = worker.drain()
+
+        self.assertEqual((len(drained.pages), len(worker.pages), worker.seconds), (2, 0, {}))
+
+        profiler = BuildProfiler()
+        profiler.merge(drained)
+        profiler.merge(drained)
+        self.assertEqual(len(profiler.pages), 4)
+        self.assertEqual(profiler.calls["read"], 4)
+
+    def test_report_and_json(self):
+        profiler = BuildProfiler()
+        parser = MarkdownParser(profiler=profiler)
+        generate_html_file(self.page, self.root / "index.html", parser, "/")
+
+        summary = profiler.to_json(slowest=5)
+        self.assertEqual((summary["pages"], summary["nodes"]), (1, 14))
+        self.assertEqual(summary["slowest"][0]["path"], str(self.page))
+        self.assertIn("block:paragraph", summary["stages"])
+        self.assertIn("Slowest 1 pages:", profiler.format_report())
@@ -0,0 +1,95 @@
+import tempfile
+import unittest
+from pathlib import Path
+from src.main import cache_namespace, parse_args
+from src.parsers.markdown import MarkdownParser
+from src.render_cache import RenderCache, fragment_sources_hash
+
+MARKDOWN = """# Title
+
+Shared **footer** with a [link](/about).
+
+- one
+- two
+
+Shared **footer** with a [link](/about)."""
+
+class RenderCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.disk_path = Path(self.tmp.name) / "cache" / "render-cache.sqlite"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_lru_eviction(self):
+        cache = RenderCache(max_entries=2)
+        cache.put("block:paragraph", "a", "<p>a</p>")
+        cache.put("block:paragraph", "b", "<p>b</p>")
+        cache.get("block:paragraph", "a")
+        cache.put("block:paragraph", "c", "<p>c</p>")
+
+        self.assertEqual(cache.get("block:paragraph", "a"), "<p>a</p>")
+        self.assertIsNone(cache.get("block:paragraph", "b"))
+        self.assertEqual((cache.stats.hits, cache.stats.misses, cache.stats.evictions), (2, 1, 1))
+
+    def test_key_includes_block_type(self):
+        cache = RenderCache()
+        cache.put("block:paragraph", "text", "<p>text</p>")
+        self.assertIsNone(cache.get("block:quote", "text"))
+
+    def test_cached_parse_renders_the_same_html(self):
+        cache = RenderCache()
+        parser = MarkdownParser(cache=cache)
+
+        expected = MarkdownParser().markdown_to_html_code(MARKDOWN).to_html()
+        self.assertEqual(parser.markdown_to_html_code(MARKDOWN).to_html(), expected)
+        self.assertEqual(parser.markdown_to_html_code(MARKDOWN).to_html(), expected)
+        self.assertEqual((cache.stats.hits, cache.stats.misses), (1 + 4, 3))
+
+    def test_disk_tier_is_shared_across_instances(self):
+        first = RenderCache(disk_path=self.disk_path, namespace="v1")
+        MarkdownParser(cache=first).markdown_to_html_code(MARKDOWN)
+        first.close()
+
+        second = RenderCache(disk_path=self.disk_path, namespace="v1")
+        html = MarkdownParser(cache=second).markdown_to_html_code(MARKDOWN).to_html()
+        second.close()
+
+        self.assertEqual(html, MarkdownParser().markdown_to_html_code(MARKDOWN).to_html())
+        self.assertEqual((second.stats.disk_hits, second.stats.misses), (3, 0))
+
+    def test_other_namespace_is_dropped(self):
+        first = RenderCache(disk_path=self.disk_path, namespace="v1")
+        first.put("block:paragraph", "a", "<p>a</p>")
+        first.close()
+
+        second = RenderCache(disk_path=self.disk_path, namespace="v2")
+        self.assertIsNone(second.get("block:paragraph", "a"))
+        second.close()
+
+        third = RenderCache(disk_path=self.disk_path, namespace="v1")
+        self.assertIsNone(third.get("block:paragraph", "a"))
+        third.close()
+
+    def test_memory_tier_can_be_disabled(self):
+        cache = RenderCache(max_entries=0, disk_path=self.disk_path)
+        cache.put("block:paragraph", "a", "<p>a</p>")
+        cache.flush()
+
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.get("block:paragraph", "a"), "<p>a</p>")
+        self.assertEqual(cache.stats.disk_hits, 1)
+        cache.close()
+
+    def test_namespace_includes_parser_mode(self):
+        self.assertNotEqual(cache_namespace("/"), cache_namespace("/", single_pass=False))
+        self.assertEqual(cache_namespace("/"), cache_namespace("/", single_pass=True))
+
+    def test_cache_is_off_by_default(self):
+        self.assertEqual(parse_args([]).cache_size, 0)
+
+    def test_fragment_sources_hash_is_stable(self):
+        self.assertEqual(fragment_sources_hash(), fragment_sources_hash())
+        self.assertEqual(len(fragment_sources_hash()), 64)
@@ -0,0 +1,127 @@
+import os
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from pathlib import Path
+from string import Template
+from src.server import LIVE_RELOAD_SCRIPT, PageRenderer, ReloadNotifier, create_server
+
+class PageRendererTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = Path(self.tmp.name)
+        (self.content / "blog" / "post").mkdir(parents=True)
+        (self.content / "index.md").write_text("# Home\n\nWelcome")
+        (self.content / "about.md").write_text("# About\n\nUs")
+        (self.content / "blog" / "post" / "index.md").write_text("# Post\n\nBody")
+        self.renderer = PageRenderer(self.content)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_source_for_request_paths(self):
+        root = self.content.resolve()
+        self.assertEqual(self.renderer.source_for("/"), root / "index.md")
+        self.assertEqual(self.renderer.source_for("/index.html?x=1"), root / "index.md")
+        self.assertEqual(self.renderer.source_for("/about.html"), root / "about.md")
+        self.assertEqual(self.renderer.source_for("/about"), root / "about.md")
+        self.assertEqual(self.renderer.source_for("/blog/post"), root / "blog" / "post" / "index.md")
+        self.assertEqual(self.renderer.source_for("/blog/post/"), root / "blog" / "post" / "index.md")
+        self.assertIsNone(self.renderer.source_for("/index.css"))
+        self.assertIsNone(self.renderer.source_for("/../index.md"))
+
+    def test_render_injects_live_reload(self):
+        page = self.renderer.render(self.content / "index.md").decode()
+        self.assertIn("<h1>Home</h1>", page)
+        self.assertIn(LIVE_RELOAD_SCRIPT + "</body>", page)
+
+    def test_render_is_cached_until_mtime_changes(self):
+        source = self.content / "index.md"
+        first = self.renderer.render(source)
+        self.assertIs(self.renderer.render(source), first)
+
+        source.write_text("# Home\n\nChanged")
+        stat = source.stat()
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000))
+        self.assertIn(b"Changed", self.renderer.render(source))
+
+    def test_render_listing(self):
+        (self.content / "blog" / "draft.md").write_text("---\ndate: 2024-02-01\ndraft: true\ntags: [C++]\n---\n# Draft\n")
+        self.assertEqual(self.renderer.listing_output("/blog"), "blog/index.html")
+        self.assertEqual(self.renderer.listing_output("/tags/c/index.html"), "tags/c/index.html")
+        self.assertIsNone(self.renderer.listing_output("/index.css"))
+        self.assertIsNone(self.renderer.listing_output("/blog/image.png"))
+        self.assertIsNone(self.renderer.listing_output("/about/"))
+        # Other requests never build the listings.
+        self.assertIsNone(self.renderer.render_listing("/index.css"))
+        self.assertIsNone(self.renderer.listings)
+
+        page = self.renderer.render_listing("/blog/").decode()
+        self.assertIn("<a href='/blog/draft.html'>Draft</a>", page)
+        self.assertIn("<a href='/blog/post/'>Post</a>", page)
+        self.assertIn(LIVE_RELOAD_SCRIPT + "</body>", page)
+        self.assertIn(b"Posts tagged C++", self.renderer.render_listing("/tags/c/"))
+        self.assertIsNone(self.renderer.render_listing("/missing/"))
+
+        # Listings are kept until the watcher reports a content change.
+        (self.content / "blog" / "draft.md").unlink()
+        self.assertIsNotNone(self.renderer.render_listing("/tags/c/"))
+        self.renderer.refresh_listings()
+        self.assertIsNone(self.renderer.render_listing("/tags/c/"))
+
+    def test_set_template_clears_cache(self):
+        source = self.content / "index.md"
+        self.renderer.render(source)
+        self.renderer.set_template(Template("<body>$title</body>"))
+        self.assertEqual(self.renderer.render(source).decode(), f"<body>Home{LIVE_RELOAD_SCRIPT}</body>")
+
+class ReloadNotifierTestCase(unittest.TestCase):
+
+    def test_wait_returns_new_version(self):
+        notifier = ReloadNotifier()
+        threading.Timer(0.01, notifier.notify).start()
+        self.assertEqual(notifier.wait(0, timeout=2), 1)
+
+    def test_wait_times_out(self):
+        self.assertEqual(ReloadNotifier().wait(0, timeout=0.01), 0)
+
+class DevServerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        (root / "content").mkdir()
+        (root / "static").mkdir()
+        (root / "content" / "index.md").write_text("# Home\n\nWelcome")
+        (root / "content" / "blog").mkdir()
+        (root / "content" / "blog" / "post.md").write_text("---\ndate: 2024-01-01\n---\n# Post\n")
+        (root / "static" / "index.css").write_text("body {}")
+
+        self.server, _, _ = create_server("127.0.0.1", 0, root / "content", root / "static")
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def test_serves_rendered_page_and_static_file(self):
+        with urllib.request.urlopen(f"{self.url}/") as response:
+            self.assertEqual(response.headers["Content-Type"], "text/html; charset=utf-8")
+            self.assertIn(b"<h1>Home</h1>", response.read())
+
+        with urllib.request.urlopen(f"{self.url}/index.css") as response:
+            self.assertEqual(response.read(), b"body {}")
+
+    def test_serves_listing_page(self):
+        with urllib.request.urlopen(f"{self.url}/blog/") as response:
+            self.assertIn(b"<a href='/blog/post.html'>Post</a>", response.read())
+
+    def test_missing_path_is_not_found(self):
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            urllib.request.urlopen(f"{self.url}/missing.css")
+        self.assertEqual(context.exception.code, 404)
@@ -0,0 +1,89 @@
+import io
+import tempfile
+import unittest
+import xml.etree.ElementTree as ElementTree
+from datetime import datetime, timezone
+from pathlib import Path
+from src.main import write_site_files
+from src.manifest import BuildManifest
+from src.page_index import PageIndex
+from src.sitemap import XmlWriter, sitemap_entries, write_sitemaps
+from src.urls import using_base_path
+
+NAMESPACE = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+class SitemapTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.docs = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def locations(self, path: Path, tag: str):
+        return [element.text for element in ElementTree.parse(path).getroot().iter(f"{NAMESPACE}{tag}")]
+
+    def test_xml_writer_escapes(self):
+        sink = io.StringIO()
+        writer = XmlWriter(sink)
+        writer.start("a", {"title": 'say "hi"'})
+        writer.element("b", "x < y & z")
+        writer.close()
+
+        self.assertEqual(sink.getvalue(), '<a title=\'say "hi"\'>\n  <b>x &lt; y &amp; z</b>\n</a>\n')
+        self.assertEqual(writer.written, len(sink.getvalue()))
+
+    def test_single_sitemap(self):
+        modified = datetime(2024, 1, 2, 3, 4, 5)
+        with using_base_path("/site/"):
+            written = write_sitemaps(self.docs, "https://example.com/", [("/", modified), ("/blog/a&b/", None)])
+
+        self.assertEqual(written, [self.docs / "sitemap.xml"])
+        self.assertEqual(self.locations(written[0], "loc"), ["https://example.com/site/", "https://example.com/site/blog/a&b/"])
+        self.assertEqual(self.locations(written[0], "lastmod"), ["2024-01-02T03:04:05+00:00"])
+
+    def test_split_into_sitemap_index(self):
+        entries = [(f"/page-{number}/", None) for number in range(5)]
+        written = write_sitemaps(self.docs, "https://example.com", entries, max_urls=2)
+
+        self.assertEqual([path.name for path in written], ["sitemap.xml", "sitemap-1.xml", "sitemap-2.xml", "sitemap-3.xml"])
+        self.assertEqual(self.locations(written[0], "loc"), [f"https://example.com/sitemap-{number}.xml" for number in (1, 2, 3)])
+        self.assertEqual(self.locations(written[3], "loc"), ["https://example.com/page-4/"])
+
+        # Only parts written before are removed; other sitemap files in the output stay.
+        (self.docs / "sitemap-news.xml").write_text("<urlset/>")
+        write_sitemaps(self.docs, "https://example.com", entries[:1], previous=[path.name for path in written])
+        self.assertEqual(sorted(path.name for path in self.docs.iterdir()), ["sitemap-news.xml", "sitemap.xml"])
+
+    def test_written_sitemaps_are_recorded(self):
+        manifest = BuildManifest(self.docs / "manifest.json", "t", "/")
+        (self.docs / "sitemap-1.xml").write_text("<urlset/>")
+        manifest.sitemaps = ["sitemap-1.xml", "sitemap-2.xml"]
+        write_site_files(self.docs, "https://example.com", PageIndex(), manifest)
+        manifest.save()
+
+        self.assertFalse((self.docs / "sitemap-1.xml").exists())
+        self.assertEqual(BuildManifest.load(manifest.path, "t", "/").sitemaps, ["sitemap.xml"])
+
+    def test_split_by_size(self):
+        entries = [(f"/{'x' * 100}-{number}/", None) for number in range(10)]
+        written = write_sitemaps(self.docs, "https://example.com", entries, max_bytes=600)
+
+        for part in written[1:]:
+            self.assertLessEqual(part.stat().st_size, 600)
+        self.assertEqual(sum(len(self.locations(part, "loc")) for part in written[1:]), 10)
+
+    def test_entries_come_from_the_index(self):
+        content = self.docs / "content"
+        (content / "blog").mkdir(parents=True)
+        (content / "index.md").write_text("# Home")
+        (content / "blog" / "draft.md").write_text("---\ndraft: true\n---\n")
+        index = PageIndex()
+        for source in sorted(content.rglob("*.md")):
+            index.update(source, source.relative_to(content))
+
+        entries = list(sitemap_entries(index, ["blog/index.html"]))
+        modified = datetime.fromtimestamp((content / "index.md").stat().st_mtime_ns / 1e9, timezone.utc)
+        self.assertEqual(entries, [("/", modified), ("/blog/", None)])
+        self.assertEqual([url for url, _ in sitemap_entries(index, [], drafts=True)], ["/blog/draft.html", "/"])
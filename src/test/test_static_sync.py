@@ -0,0 +1,111 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from src.static_sync import format_bytes, link_or_copy, sync_static
+
+class SyncStaticTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.static = root / "static"
+        self.docs = root / "docs"
+        (self.static / "images").mkdir(parents=True)
+        (self.static / "index.css").write_text("body {}")
+        (self.static / "images" / "a.png").write_bytes(b"\x89PNG" + bytes(2048))
+        self.state = {}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def sync(self, **kwargs):
+        return sync_static(self.static, self.docs, self.state, **kwargs)
+
+    def test_first_sync_transfers_everything(self):
+        stats = self.sync()
+
+        self.assertEqual(stats.linked_files + stats.copied_files, 2)
+        self.assertEqual(stats.linked_bytes + stats.copied_bytes, 7 + 2052)
+        self.assertEqual((self.docs / "index.css").read_text(), "body {}")
+        self.assertEqual((self.docs / "images" / "a.png").read_bytes(), (self.static / "images" / "a.png").read_bytes())
+        self.assertEqual(sorted(self.state), ["images/a.png", "index.css"])
+
+    def test_second_sync_skips_unchanged(self):
+        self.sync()
+        stats = self.sync()
+
+        self.assertEqual((stats.copied_files, stats.linked_files, stats.skipped_files), (0, 0, 2))
+        self.assertEqual(stats.skipped_bytes, 7 + 2052)
+
+    def test_unchanged_output_without_state_is_skipped(self):
+        self.sync(hardlink=False)
+        self.state.clear()
+        self.assertEqual(self.sync().skipped_files, 2)
+
+    def test_changed_file_is_transferred(self):
+        self.sync(hardlink=False)
+        css = self.static / "index.css"
+        css.write_text("body { color: red }")
+        stat = css.stat()
+        os.utime(css, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000))
+
+        stats = self.sync(hardlink=False)
+        self.assertEqual((stats.copied_files, stats.skipped_files), (1, 1))
+        self.assertEqual((self.docs / "index.css").read_text(), "body { color: red }")
+
+    def test_checksum_skips_touched_file(self):
+        self.sync(hardlink=False)
+        css = self.static / "index.css"
+        stat = css.stat()
+        os.utime(css, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000))
+
+        self.assertEqual(self.sync(hardlink=False, checksum=True).skipped_files, 2)
+
+    def test_transformed_files_are_rewritten(self):
+        self.sync(transforms={".css": str.upper})
+        stats = self.sync(transforms={".css": str.upper})
+        self.assertEqual((self.docs / "index.css").read_text(), "BODY {}")
+        self.assertEqual((stats.transformed_files, stats.skipped_files), (0, 2))
+        self.assertNotEqual(os.stat(self.static / "index.css").st_ino, os.stat(self.docs / "index.css").st_ino)
+
+        # Turning the transform off brings the plain asset back.
+        stats = self.sync()
+        self.assertEqual((stats.linked_files + stats.copied_files, stats.skipped_files), (1, 1))
+        self.assertEqual((self.docs / "index.css").read_text(), "body {}")
+
+    def test_removed_file_is_deleted(self):
+        self.sync()
+        (self.static / "images" / "a.png").unlink()
+        stats = self.sync()
+
+        self.assertEqual(stats.removed_files, 1)
+        self.assertFalse((self.docs / "images").exists())
+        self.assertEqual(list(self.state), ["index.css"])
+
+    def test_files_not_from_static_are_kept(self):
+        self.sync()
+        (self.docs / "index.html").write_text("page")
+        self.sync()
+        self.assertTrue((self.docs / "index.html").exists())
+
+    def test_hardlink_shares_inode(self):
+        stats = self.sync(hardlink=True)
+        self.assertEqual(stats.linked_files, 2)
+        self.assertTrue(os.path.samefile(self.static / "index.css", self.docs / "index.css"))
+
+    def test_copy_preserves_mtime(self):
+        self.docs.mkdir()
+        link_or_copy(self.static / "index.css", self.docs / "index.css", hardlink=False)
+
+        self.assertFalse(os.path.samefile(self.static / "index.css", self.docs / "index.css"))
+        self.assertEqual((self.docs / "index.css").stat().st_mtime_ns, (self.static / "index.css").stat().st_mtime_ns)
+
+    def test_missing_static_dir_raises(self):
+        with self.assertRaises(FileNotFoundError):
+            sync_static(self.static / "missing", self.docs, {})
+
+    def test_format_bytes(self):
+        self.assertEqual(format_bytes(12), "12 B")
+        self.assertEqual(format_bytes(2048), "2.0 KiB")
+        self.assertEqual(format_bytes(3 * 1024 ** 3), "3.0 GiB")
@@ -95,3 +95,10 @@ class TestTextNode(unittest.TestCase):
         with self.assertRaises(ValueError):
             text_node_to_html_node(node)
 
+
+    def test_has_no_instance_dict(self):
+        node = TextNode("text", TextType.TEXT)
+        self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_not_eq_other_type(self):
+        self.assertNotEqual(TextNode("text", TextType.TEXT), "text")
@@ -0,0 +1,60 @@
+import unittest
+from src.htmlnode import LeafNode
+from src.page_templates import compile_template
+from src.urls import UrlResolver, get_resolver, resolve_url, rewrite_urls, use_assets, use_base_path, using_base_path
+
+class UrlResolverTestCase(unittest.TestCase):
+
+    def test_resolves_root_relative_urls(self):
+        resolver = UrlResolver("/site/")
+
+        self.assertEqual(resolver.resolve("/"), "/site/")
+        self.assertEqual(resolver.resolve("/images/a.png"), "/site/images/a.png")
+        self.assertEqual(resolver.resolve("https://example.com/a"), "https://example.com/a")
+        self.assertEqual(resolver.resolve("//cdn.example.com/a.js"), "//cdn.example.com/a.js")
+        self.assertEqual(resolver.resolve("relative/page"), "relative/page")
+        self.assertEqual(resolver.resolve("#top"), "#top")
+
+    def test_results_are_cached(self):
+        resolver = UrlResolver("/site/")
+        resolver.resolve("/a")
+        resolver.resolve("/a")
+        self.assertEqual(resolver.resolved, {"/a": "/site/a"})
+
+    def test_root_base_path_keeps_urls(self):
+        self.assertEqual(UrlResolver().resolve("/a"), "/a")
+
+    def test_scoped_base_path(self):
+        previous = get_resolver()
+        with using_base_path("/site/") as resolver:
+            self.assertIs(get_resolver(), resolver)
+            self.assertEqual(resolve_url("/a"), "/site/a")
+            self.assertEqual(LeafNode(tag="a", value="a", props={"href": "/a", "title": "/a"}).to_html(), "<a href='/site/a' title='/a'>a</a>")
+
+        self.assertIs(get_resolver(), previous)
+        self.assertIs(use_base_path("/site/"), resolver)
+        use_base_path(previous.base_path)
+
+    def test_fingerprinted_assets(self):
+        resolver = UrlResolver("/site/", {"/index.css": "/index.0123456789.css"})
+
+        self.assertEqual(resolver.resolve("/index.css"), "/site/index.0123456789.css")
+        self.assertEqual(resolver.resolve("/index.css?v=1#top"), "/site/index.0123456789.css?v=1#top")
+        self.assertEqual(resolver.resolve("/other.css"), "/site/other.css")
+
+    def test_rewrite_urls(self):
+        resolver = UrlResolver("/site/", {"/a.png": "/a.1.png"})
+        html = rewrite_urls("<img src='/a.png' /><a href=\"/b\">b</a><a href='//cdn/x'>x</a><a data-href='/c'>c</a>", resolver)
+        self.assertEqual(html, "<img src='/site/a.1.png' /><a href=\"/site/b\">b</a><a href='//cdn/x'>x</a><a data-href='/c'>c</a>")
+
+    def test_use_assets_recompiles_templates(self):
+        try:
+            use_assets({"/index.css": "/index.1.css"})
+            self.assertEqual(resolve_url("/index.css"), "/index.1.css")
+            self.assertEqual(compile_template("<link href='/index.css' />$content", "/site/").chunks[0], "<link href='/site/index.1.css' />")
+
+            use_assets({"/index.css": "/index.2.css"})
+            self.assertEqual(compile_template("<link href='/index.css' />$content", "/site/").chunks[0], "<link href='/site/index.2.css' />")
+        finally:
+            use_assets({})
+        self.assertEqual(resolve_url("/index.css"), "/index.css")
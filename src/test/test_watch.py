@@ -0,0 +1,113 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from src.main import HTML_TEMPLATE, TEMPLATE_SOURCE, build_content, read_html_template, rebuild_changes
+from src.manifest import BuildManifest
+from src.parsers.markdown import MarkdownParser
+from src.watch import Change, ChangeType, PollingWatcher
+
+def bump_mtime(path: Path) -> None:
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000))
+
+class PollingWatcherTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        (self.root / "nested").mkdir()
+        (self.root / "a.md").write_text("a")
+        (self.root / "nested" / "b.md").write_text("b")
+        self.watcher = PollingWatcher([self.root])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_no_changes(self):
+        self.assertEqual(self.watcher.poll(), [])
+
+    def test_detects_added_modified_and_removed(self):
+        (self.root / "c.md").write_text("c")
+        (self.root / "a.md").write_text("changed")
+        bump_mtime(self.root / "a.md")
+        (self.root / "nested" / "b.md").unlink()
+
+        self.assertEqual(self.watcher.poll(), [
+            Change(ChangeType.MODIFIED, self.root / "a.md", self.root),
+            Change(ChangeType.ADDED, self.root / "c.md", self.root),
+            Change(ChangeType.REMOVED, self.root / "nested" / "b.md", self.root),
+        ])
+        self.assertEqual(self.watcher.poll(), [])
+
+    def test_watches_single_file(self):
+        path = self.root / "a.md"
+        watcher = PollingWatcher([path])
+        bump_mtime(path)
+
+        self.assertEqual(watcher.poll(), [Change(ChangeType.MODIFIED, path, path)])
+
+class RebuildChangesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.static = self.root / "static"
+        self.content = self.root / "content"
+        self.docs = self.root / "docs"
+        self.static.mkdir()
+        self.content.mkdir()
+        (self.content / "index.md").write_text("# Home\n\nWelcome")
+        (self.content / "other.md").write_text("# Other\n\nPage")
+        (self.static / "index.css").write_text("body {}")
+
+        self.parser = MarkdownParser()
+        self.manifest = BuildManifest(self.root / "manifest.json", "t", "/")
+        build_content(self.content, self.docs, self.parser, "/", self.manifest)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def rebuild(self, changes):
+        rebuilt, _ = rebuild_changes(changes, self.static, self.content, self.docs, self.parser, self.manifest, HTML_TEMPLATE)
+        return rebuilt
+
+    def test_read_html_template_matches_module(self):
+        self.assertEqual(TEMPLATE_SOURCE.parent.name, "templates")
+        self.assertEqual(read_html_template(TEMPLATE_SOURCE).template, HTML_TEMPLATE.template)
+
+    def test_rebuilds_only_changed_page(self):
+        (self.content / "index.md").write_text("# Home\n\nWelcome back")
+        other_mtime = (self.docs / "other.html").stat().st_mtime_ns
+
+        rebuilt = self.rebuild([Change(ChangeType.MODIFIED, self.content / "index.md", self.content)])
+
+        self.assertEqual(rebuilt, [self.docs / "index.html"])
+        self.assertIn("Welcome back", (self.docs / "index.html").read_text())
+        self.assertEqual((self.docs / "other.html").stat().st_mtime_ns, other_mtime)
+
+    def test_removed_page_deletes_output(self):
+        (self.content / "other.md").unlink()
+        self.rebuild([Change(ChangeType.REMOVED, self.content / "other.md", self.content)])
+
+        self.assertFalse((self.docs / "other.html").exists())
+        self.assertNotIn("other.md", self.manifest.pages)
+
+    def test_static_changes_are_copied_and_removed(self):
+        self.rebuild([Change(ChangeType.ADDED, self.static / "index.css", self.static)])
+        self.assertEqual((self.docs / "index.css").read_text(), "body {}")
+
+        (self.static / "index.css").unlink()
+        self.rebuild([Change(ChangeType.REMOVED, self.static / "index.css", self.static)])
+        self.assertFalse((self.docs / "index.css").exists())
+
+    def test_template_change_renders_everything(self):
+        template_source = self.root / "default.html"
+        template_source.write_text("<main>$title|$content</main>")
+
+        changes = [Change(ChangeType.MODIFIED, template_source, template_source)]
+        rebuilt, template = rebuild_changes(changes, self.static, self.content, self.docs, self.parser, self.manifest, HTML_TEMPLATE, template_source)
+
+        self.assertEqual(template.template, "<main>$title|$content</main>")
+        self.assertEqual(sorted(rebuilt), [self.docs / "index.html", self.docs / "other.html"])
+        self.assertEqual((self.docs / "index.html").read_text(), "<main>Home|<div><h1>Home</h1><p>Welcome</p></div></main>")
@@ -1,5 +1,6 @@
 from enum import Enum
 from src.htmlnode import HTMLNode, LeafNode
+from src.urls import image_attributes
 
 class TextType(Enum):
     TEXT = 'text'
@@ -10,12 +11,16 @@ class TextType(Enum):
     IMAGE = 'image'
 
 class TextNode:
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         self.text = text
         self.text_type = text_type
         self.url = url
 
     def __eq__(self, node):
+        if not isinstance(node, TextNode):
+            return NotImplemented
         return self.text == node.text and self.text_type == node.text_type and self.url == node.url
 
     def __repr__(self) -> str:
@@ -31,6 +36,7 @@ def text_node_to_html_node(text_node: TextNode) -> HTMLNode:
             return LeafNode(tag="i", value=text_node.text)
         case TextType.CODE:
             return LeafNode(tag="code", value=text_node.text)
+        # Root-relative link and image URLs are resolved against the base path when the node is rendered.
         case TextType.LINK:
             if text_node.url is None:
                 raise ValueError(f"{text_node.__class__} of type image must have url string")
@@ -38,6 +44,7 @@ def text_node_to_html_node(text_node: TextNode) -> HTMLNode:
         case TextType.IMAGE:
             if text_node.url is None:
                 raise ValueError(f"{text_node.__class__} of type image must have url string")
-            return LeafNode(tag="img", value="", props={"src": text_node.url, "alt": text_node.text})
+            # Images processed by the image stage also get their dimensions, variants and lazy loading.
+            return LeafNode(tag="img", value="", props={"src": text_node.url, "alt": text_node.text, **image_attributes(text_node.url)})
         case _:
             raise ValueError(f"Unknown {text_node.__class__} text type value")
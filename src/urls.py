@@ -0,0 +1,111 @@
+from __future__ import annotations
+import re
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+# Attributes whose root-relative values are resolved against the base path when a node is rendered.
+URL_ATTRIBUTES = frozenset(("href", "src"))
+# Attributes holding a list of URLs with descriptors ("/a-480w.png 480w, /a.png 960w").
+URL_LIST_ATTRIBUTES = frozenset(("srcset",))
+# The same attributes written out in static HTML, such as the chunks of a page template.
+URL_ATTRIBUTE_PATTERN = re.compile(rf"(?<![\w-])({'|'.join(sorted(URL_ATTRIBUTES))})=(['\"])(/[^'\"]*)\2")
+
+class UrlResolver:
+    # Maps root-relative URLs ("/blog/") onto the site's base path ("/site/blog/"). Sites link to the
+    # same few URLs over and over, so every result is cached. Asset URLs ("/index.css") are first
+    # mapped to their fingerprinted names ("/index.1a2b3c4d5e.css") when an asset map is given.
+    def __init__(self, base_path: str = "/", assets: Optional[Dict[str, str]] = None):
+        self.base_path = base_path
+        self.assets: Dict[str, str] = {} if assets is None else assets
+        self.resolved: Dict[str, str] = {}
+
+    def resolve(self, url: str) -> str:
+        resolved = self.resolved.get(url)
+        if resolved is None:
+            resolved = self.__resolve(url)
+            self.resolved[url] = resolved
+
+        return resolved
+
+    def __resolve(self, url: str) -> str:
+        # Protocol-relative URLs ("//cdn.example.com/a.js") point at other hosts and are left alone.
+        if not url.startswith("/") or url.startswith("//"):
+            return url
+
+        if len(self.assets) > 0:
+            path, query = self.__split(url)
+            url = self.assets.get(path, path) + query
+        if self.base_path == "/":
+            return url
+        return self.base_path + url[1:]
+
+    def __split(self, url: str) -> Tuple[str, str]:
+        end = len(url)
+        for separator in "?#":
+            position = url.find(separator)
+            if position != -1:
+                end = min(end, position)
+        return url[:end], url[end:]
+
+    def __repr__(self) -> str:
+        return f'UrlResolver({self.base_path}, {len(self.assets)}, {len(self.resolved)})'
+
+# One resolver per base path, so switching back and forth keeps each one's cache.
+_resolvers: Dict[str, UrlResolver] = {}
+_assets: Dict[str, str] = {}
+_active = UrlResolver()
+
+def use_base_path(base_path: str) -> UrlResolver:
+    global _active
+    if _active.base_path != base_path:
+        _resolvers.setdefault(_active.base_path, _active)
+        _active = _resolvers.setdefault(base_path, UrlResolver(base_path, _assets))
+
+    return _active
+
+def use_assets(assets: Dict[str, str]) -> UrlResolver:
+    # Resolved URLs depend on the asset map, so every resolver starts over with the new one.
+    global _active, _assets
+    _assets = dict(assets)
+    _resolvers.clear()
+    _active = UrlResolver(_active.base_path, _assets)
+
+    return _active
+
+def get_assets() -> Dict[str, str]:
+    return _assets
+
+# Attributes of the site's processed images by root-relative URL, added to image nodes when they are created.
+_image_attributes: Dict[str, Dict[str, str]] = {}
+
+def use_image_attributes(attributes: Dict[str, Dict[str, str]]) -> None:
+    global _image_attributes
+    _image_attributes = dict(attributes)
+
+def image_attributes(url: str) -> Dict[str, str]:
+    return _image_attributes.get(url, {})
+
+@contextmanager
+def using_base_path(base_path: str) -> Iterator[UrlResolver]:
+    # Pages rendered for one site do not leave their base path behind for whatever is rendered next.
+    previous = _active.base_path
+    try:
+        yield use_base_path(base_path)
+    finally:
+        use_base_path(previous)
+
+def get_resolver() -> UrlResolver:
+    return _active
+
+def resolve_url(url: str) -> str:
+    return _active.resolve(url)
+
+def resolve_srcset(value: str) -> str:
+    candidates = []
+    for candidate in value.split(","):
+        url, _, descriptor = candidate.strip().partition(" ")
+        candidates.append(f"{resolve_url(url)} {descriptor}".rstrip())
+    return ", ".join(candidates)
+
+def rewrite_urls(text: str, resolver: UrlResolver) -> str:
+    return URL_ATTRIBUTE_PATTERN.sub(lambda match: f"{match[1]}={match[2]}{resolver.resolve(match[3])}{match[2]}", text)